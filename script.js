@@ -1,5 +1,56 @@
 document.addEventListener('DOMContentLoaded', () => {
-    let activeTooltip = null; // 現在表示中のツールチップを追跡
+    // カレンダー本体は calendar_renderer.py で index.html にプリレンダリング済み。
+    // ここではツールチップ用の詳細テーブルを必要になった時点で読み込み、
+    // コンテナに1つだけ登録したイベントリスナーで全ての日付セルを扱う。
+    const calendarContainer = document.getElementById('calendar-container');
+    const DETAILS_URL = 'data/processed/calendar_details.json';
+    const DAY_MS = 24 * 60 * 60 * 1000;
+
+    // publish ステージ（asset_publisher.py）が出力する manifest から内容ハッシュ付きのファイル名を引く。
+    // manifest が無い場合（publish 前のローカル環境など）は data/processed/ の元のファイルを読む。
+    const manifestMeta = document.querySelector('meta[name="asset-manifest"]');
+    const MANIFEST_URL = manifestMeta ? manifestMeta.content : 'data/published/manifest.json';
+    let manifestPromise = null;
+
+    function loadManifest() {
+        if (!manifestPromise) {
+            manifestPromise = fetch(MANIFEST_URL)
+                .then(response => (response.ok ? response.json() : null))
+                .catch(() => null);
+        }
+        return manifestPromise;
+    }
+
+    // gzip 版があればそれを取得してブラウザ内で展開する（静的ホスティングでも転送量を減らせる）
+    function fetchAsset(name, fallbackUrl) {
+        return loadManifest().then(manifest => {
+            const asset = manifest && manifest.assets[name];
+            if (!asset) {
+                return fetch(fallbackUrl).then(response => response.json());
+            }
+            if (!asset.gz_bytes || !('DecompressionStream' in window)) {
+                return fetch(asset.path).then(response => response.json());
+            }
+            return fetch(`${asset.path}.gz`).then(response => {
+                if (!response.ok) {
+                    throw new Error(`${response.status} ${asset.path}.gz`);
+                }
+                // サーバーが Content-Encoding: gzip で返した場合は展開済み
+                if ((response.headers.get('Content-Encoding') || '').includes('gzip')) {
+                    return response.json();
+                }
+                return new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).json();
+            });
+        });
+    }
+
+    const tooltip = document.createElement('div');
+    tooltip.classList.add('tooltip', 'top');
+
+    let activeDay = null; // 現在ツールチップを表示している日付セル
+    let pinned = false; // タップで固定表示しているか
+    let detailsPromise = null;
+    let details = null;
 
     // ツールチップの位置を動的に調整する関数
     function adjustTooltipPosition(dayDiv, tooltip) {
@@ -9,7 +60,6 @@ document.addEventListener('DOMContentLoaded', () => {
         tooltip.style.bottom = '';
 
         const dayRect = dayDiv.getBoundingClientRect();
-        const tooltipRect = tooltip.getBoundingClientRect();
         const viewportWidth = window.innerWidth || document.documentElement.clientWidth;
         const viewportHeight = window.innerHeight || document.documentElement.clientHeight;
 
@@ -58,152 +108,381 @@ document.addEventListener('DOMContentLoaded', () => {
         return position;
     }
 
-    fetch('data/processed/calendar_data.json')
-        .then(response => response.json())
-        .then(data => {
-            const calendarContainer = document.getElementById('calendar-container');
-            const years = {};
+    function escapeHtml(text) {
+        const span = document.createElement('span');
+        span.textContent = text;
+        return span.innerHTML;
+    }
 
-            // Group data by year
-            for (const dateStr in data) {
-                const year = dateStr.substring(0, 4);
-                if (!years[year]) {
-                    years[year] = {};
-                }
-                const month = parseInt(dateStr.substring(5, 7), 10);
-                if (!years[year][month]) {
-                    years[year][month] = [];
+    // 詳細テーブルは最初の操作時に一度だけ取得する
+    function loadDetails() {
+        if (!detailsPromise) {
+            detailsPromise = fetchAsset('calendar_details', DETAILS_URL)
+                .then(data => {
+                    details = data;
+                    details.startTime = Date.parse(`${data.start}T00:00:00Z`);
+                    return details;
+                })
+                .catch(error => {
+                    detailsPromise = null;
+                    console.error('Error fetching calendar details:', error);
+                });
+        }
+        return detailsPromise;
+    }
+
+    function buildTooltipContent(dateStr) {
+        if (!details) {
+            return `<strong>日付: ${dateStr}</strong><br><p>読み込み中...</p>`;
+        }
+        const index = Math.round((Date.parse(`${dateStr}T00:00:00Z`) - details.startTime) / DAY_MS);
+        const day = details.days[index];
+        if (!day) {
+            return `<strong>日付: ${dateStr}</strong>`;
+        }
+        const [demandScore, impactLevel, monthlyTrendScore, holidayName, eventIds, pendingBand] = day;
+
+        let tooltipContent = `<strong>日付: ${dateStr}</strong><br>`;
+        tooltipContent += `<p>需要スコア: ${demandScore.toFixed(2)}</p>`;
+        tooltipContent += `<p>影響度レベル: ${impactLevel}</p>`;
+
+        if (monthlyTrendScore) {
+            tooltipContent += `<p>月間トレンドスコア: ${monthlyTrendScore.toFixed(2)}</p>`;
+        }
+
+        if (holidayName) {
+            tooltipContent += `<p>祝日: ${escapeHtml(holidayName)}</p>`;
+        }
+
+        if (eventIds.length > 0) {
+            tooltipContent += `<p>イベント:</p><ul>`;
+            eventIds.forEach(id => {
+                const [subject, eventType, attendees] = details.events[id];
+                tooltipContent += `<li>${escapeHtml(subject)} (${escapeHtml(eventType)}) - ${attendees}人</li>`;
+            });
+            tooltipContent += `</ul>`;
+        }
+
+        // 日程未定イベントによる上乗せ（期待値とP10〜P90の帯）
+        if (pendingBand && pendingBand[0] > 0) {
+            const [expected, p10, p90] = pendingBand;
+            tooltipContent += `<p>日程未定イベント期待値: +${expected.toFixed(2)} (P10〜P90: ${p10.toFixed(2)}〜${p90.toFixed(2)})</p>`;
+        }
+        return tooltipContent;
+    }
+
+    function showTooltip(dayDiv) {
+        activeDay = dayDiv;
+        tooltip.innerHTML = buildTooltipContent(dayDiv.dataset.date);
+        dayDiv.appendChild(tooltip);
+        adjustTooltipPosition(dayDiv, tooltip);
+        tooltip.classList.add('tooltip-active');
+
+        if (!details) {
+            loadDetails().then(() => {
+                if (activeDay === dayDiv) {
+                    tooltip.innerHTML = buildTooltipContent(dayDiv.dataset.date);
+                    adjustTooltipPosition(dayDiv, tooltip);
                 }
-                years[year][month].push(data[dateStr]);
-            }
+            });
+        }
+    }
 
-            for (const year in years) {
-                const yearCalendarDiv = document.createElement('div');
-                yearCalendarDiv.classList.add('year-calendar');
-                yearCalendarDiv.innerHTML = `<h2 class="year-title">${year}年</h2>`;
-
-                const monthGridDiv = document.createElement('div');
-                monthGridDiv.classList.add('month-grid');
-
-                for (let month = 1; month <= 12; month++) {
-                    const monthCalendarDiv = document.createElement('div');
-                    monthCalendarDiv.classList.add('month-calendar');
-                    monthCalendarDiv.innerHTML = `<h3 class="month-title">${month}月</h3>`;
-
-                    const weekdaysDiv = document.createElement('div');
-                    weekdaysDiv.classList.add('weekdays');
-                    ['日', '月', '火', '水', '木', '金', '土'].forEach(day => {
-                        const weekdaySpan = document.createElement('span');
-                        weekdaySpan.textContent = day;
-                        weekdaysDiv.appendChild(weekdaySpan);
-                    });
-                    monthCalendarDiv.appendChild(weekdaysDiv);
-
-                    const dayGridDiv = document.createElement('div');
-                    dayGridDiv.classList.add('day-grid');
-
-                    const firstDayOfMonth = new Date(year, month - 1, 1).getDay();
-                    for (let i = 0; i < firstDayOfMonth; i++) {
-                        const emptyDay = document.createElement('div');
-                        emptyDay.classList.add('day', 'empty');
-                        dayGridDiv.appendChild(emptyDay);
-                    }
-
-                    const daysInMonth = new Date(year, month, 0).getDate();
-                    for (let day = 1; day <= daysInMonth; day++) {
-                        const dateStr = `${year}-${String(month).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
-                        const dayData = data[dateStr];
-
-                        const dayDiv = document.createElement('div');
-                        dayDiv.classList.add('day');
-                        dayDiv.textContent = day;
-
-                        if (dayData) {
-                            if (dayData.impact_level === 'High') {
-                                dayDiv.classList.add('high-demand');
-                            } else if (dayData.impact_level === 'Medium') {
-                                dayDiv.classList.add('medium-demand');
-                            } else {
-                                dayDiv.classList.add('low-demand');
-                            }
-
-                            // Tooltip
-                            const tooltip = document.createElement('div');
-                            tooltip.classList.add('tooltip', 'top');
-                            let tooltipContent = `<strong>日付: ${dayData.date}</strong><br>`;
-                            tooltipContent += `<p>需要スコア: ${dayData.demand_score.toFixed(2)}</p>`;
-                            tooltipContent += `<p>影響度レベル: ${dayData.impact_level}</p>`;
-
-                            if (dayData.monthly_trend_score) {
-                                tooltipContent += `<p>月間トレンドスコア: ${dayData.monthly_trend_score.toFixed(2)}</p>`;
-                            }
-
-                            if (dayData.is_holiday) {
-                                tooltipContent += `<p>祝日: ${dayData.holiday_name}</p>`;
-                            }
-
-                            if (dayData.events.length > 0) {
-                                tooltipContent += `<p>イベント:</p><ul>`;
-                                dayData.events.forEach(event => {
-                                    tooltipContent += `<li>${event.subject} (${event.event_type}) - ${event.estimated_attendees}人</li>`;
-                                });
-                                tooltipContent += `</ul>`;
-                            }
-                            tooltip.innerHTML = tooltipContent;
-                            dayDiv.appendChild(tooltip);
-
-                            // ホバーでツールチップ表示（PC）
-                            dayDiv.addEventListener('mouseenter', () => {
-                                if (!activeTooltip) {
-                                    adjustTooltipPosition(dayDiv, tooltip);
-                                    tooltip.classList.add('tooltip-active');
-                                    activeTooltip = tooltip;
-                                }
-                            });
-
-                            dayDiv.addEventListener('mouseleave', () => {
-                                if (activeTooltip === tooltip) {
-                                    tooltip.classList.remove('tooltip-active');
-                                    activeTooltip = null;
-                                }
-                            });
-
-                            // タップでツールチップ表示（スマホ）
-                            dayDiv.addEventListener('click', (e) => {
-                                e.preventDefault();
-                                e.stopPropagation();
-
-                                if (activeTooltip && activeTooltip !== tooltip) {
-                                    activeTooltip.classList.remove('tooltip-active');
-                                }
-
-                                const isActive = tooltip.classList.contains('tooltip-active');
-                                if (isActive) {
-                                    tooltip.classList.remove('tooltip-active');
-                                    activeTooltip = null;
-                                } else {
-                                    adjustTooltipPosition(dayDiv, tooltip);
-                                    tooltip.classList.add('tooltip-active');
-                                    activeTooltip = tooltip;
-                                }
-                            });
-                        }
-                        dayGridDiv.appendChild(dayDiv);
-                    }
-                    monthCalendarDiv.appendChild(dayGridDiv);
-                    monthGridDiv.appendChild(monthCalendarDiv);
+    function hideTooltip() {
+        tooltip.classList.remove('tooltip-active');
+        if (tooltip.parentNode) {
+            tooltip.parentNode.removeChild(tooltip);
+        }
+        activeDay = null;
+        pinned = false;
+    }
+
+    function findDay(target) {
+        const dayDiv = target.closest('.day[data-date]');
+        return dayDiv && calendarContainer.contains(dayDiv) ? dayDiv : null;
+    }
+
+    // ホバーでツールチップ表示（PC）
+    calendarContainer.addEventListener('mouseover', (e) => {
+        const dayDiv = findDay(e.target);
+        if (!dayDiv || pinned || dayDiv === activeDay) {
+            return;
+        }
+        showTooltip(dayDiv);
+    });
+
+    calendarContainer.addEventListener('mouseout', (e) => {
+        if (!activeDay || pinned || activeDay.contains(e.relatedTarget)) {
+            return;
+        }
+        hideTooltip();
+    });
+
+    // タップでツールチップ表示（スマホ）
+    calendarContainer.addEventListener('click', (e) => {
+        const dayDiv = findDay(e.target);
+        if (!dayDiv) {
+            return;
+        }
+        e.preventDefault();
+        e.stopPropagation();
+
+        if (pinned && activeDay === dayDiv) {
+            hideTooltip();
+            return;
+        }
+        showTooltip(dayDiv);
+        pinned = true;
+    });
+
+    // 背景をクリックしたときにツールチップを隠す
+    document.addEventListener('click', (e) => {
+        if (activeDay && !e.target.closest('.day')) {
+            hideTooltip();
+        }
+    });
+
+    // イベント検索（event_search.py が出力する n-gram 転置索引を使う）
+    const SEARCH_INDEX_URL = 'data/processed/search_index.json';
+    const searchInput = document.getElementById('event-search');
+    const searchSummary = document.getElementById('search-summary');
+    const WORD_BOUNDARY = '^|[\\s、。・,/／（）()「」『』～〜\\-]';
+    let searchIndexPromise = null;
+    let searchTimer = null;
+
+    function normalizeText(text) {
+        return (text || '').normalize('NFKC').toLowerCase().replace(/\s+/g, ' ').trim();
+    }
+
+    function escapeRegExp(text) {
+        return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    }
+
+    function loadSearchIndex() {
+        if (!searchIndexPromise) {
+            searchIndexPromise = fetchAsset('search_index', SEARCH_INDEX_URL)
+                .then(data => {
+                    // 検索時の照合用に、各イベントの列を正規化しておく
+                    data.texts = data.events.map(([subject, eventType, location, , , description]) => ({
+                        subject: normalizeText(subject),
+                        type: normalizeText(eventType),
+                        location: normalizeText(location),
+                        description: normalizeText(description),
+                    }));
+                    return data;
+                })
+                .catch(error => {
+                    searchIndexPromise = null;
+                    console.error('Error fetching search index:', error);
+                });
+        }
+        return searchIndexPromise;
+    }
+
+    function candidates(index, field, term) {
+        const postings = index.postings[field];
+        const grams = new Set();
+        if (term.length < 2) {
+            grams.add(term);
+        } else {
+            for (let i = 0; i < term.length - 1; i++) {
+                const gram = term.slice(i, i + 2);
+                if (!gram.includes(' ')) {
+                    grams.add(gram);
                 }
-                yearCalendarDiv.appendChild(monthGridDiv);
-                calendarContainer.appendChild(yearCalendarDiv);
             }
+        }
+        let result = null;
+        for (const gram of grams) {
+            const ids = postings[gram];
+            if (!ids) {
+                return new Set();
+            }
+            result = result ? new Set(ids.filter(id => result.has(id))) : new Set(ids);
+        }
+        return result || new Set();
+    }
 
-            // 背景をクリックしたときにツールチップを隠す
-            document.addEventListener('click', (e) => {
-                if (activeTooltip && !e.target.closest('.day')) {
-                    activeTooltip.classList.remove('tooltip-active');
-                    activeTooltip = null;
+    function matchTerm(index, term, fields, prefix) {
+        term = normalizeText(term);
+        if (!term) {
+            return new Set(index.events.keys());
+        }
+        const pattern = prefix ? new RegExp(`(?:${WORD_BOUNDARY})${escapeRegExp(term)}`) : null;
+        const matched = new Set();
+        (fields || index.fields).forEach(field => {
+            candidates(index, field, term).forEach(id => {
+                const text = index.texts[id][field];
+                if (prefix ? pattern.test(text) : text.includes(term)) {
+                    matched.add(id);
                 }
             });
-        })
-        .catch(error => console.error('Error fetching calendar data:', error));
-});
\ No newline at end of file
+        });
+        return matched;
+    }
+
+    // 空白区切りはAND、"OR" で論理和、先頭の "-" は除外、末尾の "*" は前方一致（event_search.py と同じ）
+    function searchEvents(index, query) {
+        const groups = [];
+        const excluded = new Set();
+        let joinNext = false;
+        const tokens = query.match(/-?(?:\w+:)?"[^"]*"\*?|\S+/g) || [];
+        tokens.forEach(token => {
+            if (token === 'OR') {
+                joinNext = groups.length > 0;
+                return;
+            }
+            const negate = token.startsWith('-') && token.length > 1;
+            if (negate) {
+                token = token.slice(1);
+            }
+            let fields = null;
+            const separator = token.indexOf(':');
+            if (separator > 0 && index.fields.includes(token.slice(0, separator))) {
+                fields = [token.slice(0, separator)];
+                token = token.slice(separator + 1);
+            }
+            const prefix = token.endsWith('*');
+            token = token.replace(/\*+$/, '').replace(/^"+|"+$/g, '');
+            const matched = matchTerm(index, token, fields, prefix);
+
+            if (negate) {
+                matched.forEach(id => excluded.add(id));
+            } else if (joinNext) {
+                matched.forEach(id => groups[groups.length - 1].add(id));
+            } else {
+                groups.push(matched);
+            }
+            joinNext = false;
+        });
+
+        let result = groups.length ? groups[0] : new Set(index.events.keys());
+        groups.slice(1).forEach(group => {
+            result = new Set([...result].filter(id => group.has(id)));
+        });
+        return [...result].filter(id => !excluded.has(id)).sort((a, b) => a - b);
+    }
+
+    function highlightDays(index, eventIds) {
+        const hitDays = new Set();
+        eventIds.forEach(id => {
+            const [, , , start, end] = index.events[id];
+            const last = Date.parse(`${end}T00:00:00Z`);
+            for (let time = Date.parse(`${start}T00:00:00Z`); time <= last; time += DAY_MS) {
+                hitDays.add(new Date(time).toISOString().slice(0, 10));
+            }
+        });
+        calendarContainer.querySelectorAll('.day[data-date]').forEach(dayDiv => {
+            dayDiv.classList.toggle('search-hit', hitDays.has(dayDiv.dataset.date));
+        });
+        return hitDays.size;
+    }
+
+    function clearSearch() {
+        calendarContainer.classList.remove('search-active');
+        calendarContainer.querySelectorAll('.day.search-hit').forEach(dayDiv => {
+            dayDiv.classList.remove('search-hit');
+        });
+        searchSummary.textContent = '';
+    }
+
+    function runSearch() {
+        const query = searchInput.value.trim();
+        if (!query) {
+            clearSearch();
+            return;
+        }
+        loadSearchIndex().then(index => {
+            if (!index || searchInput.value.trim() !== query) {
+                return;
+            }
+            const eventIds = searchEvents(index, query);
+            const dayCount = highlightDays(index, eventIds);
+            calendarContainer.classList.add('search-active');
+            searchSummary.textContent = `${eventIds.length}件のイベント（${dayCount}日）が見つかりました。`;
+        });
+    }
+
+    if (searchInput) {
+        searchInput.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(runSearch, 150);
+        });
+    }
+
+    // 需要ピーク期間（peak_periods.py の出力）は開いたときに一度だけ読み込む
+    const PEAKS_URL = 'data/processed/peak_periods.json';
+    const peakBox = document.getElementById('peak-periods');
+    const peakContent = document.getElementById('peak-periods-content');
+    let peaksLoaded = false;
+
+    function formatPeriod(period) {
+        const range = period.days > 1 ? `${period.start}〜${period.end}` : period.start;
+        return `${range}（${period.days}日, 合計 ${period.total.toFixed(0)}, 最大 ${period.max.toFixed(0)}）`;
+    }
+
+    function renderPeriodList(title, periods) {
+        if (!periods.length) {
+            return `<h4>${escapeHtml(title)}</h4><p>該当なし</p>`;
+        }
+        const items = periods.map(period =>
+            `<li data-start="${period.start}" data-end="${period.end}">${escapeHtml(formatPeriod(period))}</li>`
+        ).join('');
+        return `<h4>${escapeHtml(title)}</h4><ol>${items}</ol>`;
+    }
+
+    function highlightPeriod(item) {
+        const selected = !item.classList.contains('selected');
+        peakContent.querySelectorAll('li.selected').forEach(li => li.classList.remove('selected'));
+        calendarContainer.querySelectorAll('.day.peak-hit').forEach(dayDiv => dayDiv.classList.remove('peak-hit'));
+        if (!selected) {
+            return;
+        }
+        item.classList.add('selected');
+        const { start, end } = item.dataset;
+        calendarContainer.querySelectorAll('.day[data-date]').forEach(dayDiv => {
+            const date = dayDiv.dataset.date;
+            dayDiv.classList.toggle('peak-hit', date >= start && date <= end);
+        });
+        const first = calendarContainer.querySelector(`.day[data-date="${start}"]`);
+        if (first) {
+            first.scrollIntoView({ behavior: 'smooth', block: 'center' });
+        }
+    }
+
+    if (peakBox) {
+        peakBox.addEventListener('toggle', () => {
+            if (!peakBox.open || peaksLoaded) {
+                return;
+            }
+            peaksLoaded = true;
+            fetchAsset('peak_periods', PEAKS_URL)
+                .then(peaks => {
+                    let html = '';
+                    Object.entries(peaks.windows).forEach(([days, periods]) => {
+                        html += renderPeriodList(`${days}日間の需要合計 上位`, periods);
+                    });
+                    html += renderPeriodList('High日の連続', peaks.high_runs);
+                    peakContent.innerHTML = html;
+                })
+                .catch(error => {
+                    peaksLoaded = false;
+                    peakContent.innerHTML = '<p>読み込みに失敗しました。</p>';
+                    console.error('Error fetching peak periods:', error);
+                });
+        });
+        peakContent.addEventListener('click', (e) => {
+            const item = e.target.closest('li[data-start]');
+            if (item) {
+                highlightPeriod(item);
+            }
+        });
+    }
+
+    // 内容ハッシュ付きのデータは Service Worker (sw.js) がキャッシュし、再訪時は通信せずに返す
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('sw.js').catch(error => {
+            console.error('Service worker registration failed:', error);
+        });
+    }
+});
@@ -1,7 +1,13 @@
 import pandas as pd
 import re
+import sys
+import os
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_processing'))
+from capacity_registry import get_default_registry
+from event_loader import carry_last_updated, load_last_updated
+
 def parse_date_str(date_str):
     """日付文字列を YYYY-MM-DD 形式に変換"""
     if not date_str:
@@ -14,14 +20,9 @@ def parse_date_str(date_str):
         return f"{year}-{month:02d}-{day:02d}"
     return date_str
 
-def estimate_attendees_from_venue(venue_name):
-    """会場名から推定集客数を返す"""
-    if "コーチャンフォー釧路文化ホール" in venue_name or "釧路市民文化会館" in venue_name:
-        return 1500  # 大ホールを想定
-    elif "北海道立釧路芸術館" in venue_name:
-        return 100  # アートホールを想定
-    else:
-        return 0
+def estimate_attendees_from_venue(venue_name, registry=None):
+    """会場名から推定集客数（会場の収容人数）を返す"""
+    return (registry or get_default_registry()).venue_capacity(venue_name)
 
 def get_impact_level(attendees):
     """集客数から影響度レベルを判定する"""
@@ -32,47 +33,108 @@ def get_impact_level(attendees):
     else:
         return "Low"
 
-def process_concert_data(raw_data_path):
+# 生データの区切りとなる行
+CATEGORY_MARKERS = ("コンサート", "演劇・ステージ・舞台")
+DATE_MARKER = "公演日："
+VENUE_MARKER = "会場："
+SALES_MARKER = "販売方法"
+
+def _build_concert_record(subject_lines, date_lines, venue_lines, registry=None):
+    subject = "\n".join(subject_lines).strip()
+    date_str = "\n".join(date_lines).strip()
+    venue = "\n".join(venue_lines).strip()
+
+    start_date = parse_date_str(date_str.split('～')[0].strip())
+    end_date = parse_date_str(date_str.split('～')[-1].strip()) if '～' in date_str else start_date
+
+    estimated_attendees = estimate_attendees_from_venue(venue, registry)
+    impact_level = get_impact_level(estimated_attendees)
+
+    return {
+        'EventType': 'コンサート',
+        'Subject': subject,
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'EstimatedAttendees': estimated_attendees,
+        'Location': venue,
+        'ImpactLevel': impact_level,
+        'DataSource': 'l-tike.com',
+        'LastUpdated': datetime.now().strftime("%Y-%m-%d")
+    }
+
+def iter_concert_records(lines, registry=None):
+    """行単位の状態機械でコンサート情報を1件ずつ返す（ファイル全体をメモリに載せない）"""
+    state = None  # None: 区切り待ち, 'subject', 'date', 'venue'
+    subject_lines, date_lines, venue_lines = [], [], []
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+
+        if stripped in CATEGORY_MARKERS and state in (None, 'venue'):
+            # 販売方法が見つからないまま次の公演が始まった場合も、その時点で確定させる
+            if state == 'venue':
+                yield _build_concert_record(subject_lines, date_lines, venue_lines, registry)
+            state = 'subject'
+            subject_lines, date_lines, venue_lines = [], [], []
+        elif state == 'subject':
+            if stripped == DATE_MARKER:
+                state = 'date'
+            else:
+                subject_lines.append(line)
+        elif state == 'date':
+            if stripped == VENUE_MARKER:
+                state = 'venue'
+            else:
+                date_lines.append(line)
+        elif state == 'venue':
+            if stripped.startswith(SALES_MARKER):
+                yield _build_concert_record(subject_lines, date_lines, venue_lines, registry)
+                state = None
+            else:
+                venue_lines.append(line)
+
+    if state == 'venue':
+        yield _build_concert_record(subject_lines, date_lines, venue_lines, registry)
+
+def process_concert_data(raw_data_path, registry=None):
     """手動でコピーしたコンサート情報を処理し、DataFrameを返す"""
     with open(raw_data_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        return pd.DataFrame(list(iter_concert_records(f, registry)))
 
-    # 各コンサート情報をブロックに分割
-    # 「コンサート」または「演劇・ステージ・舞台」で始まる行を区切りとする
-    concert_blocks = re.split(r'(コンサート|演劇・ステージ・舞台)\n', content)[1:]
-    
-    concerts = []
-    for i in range(0, len(concert_blocks), 2):
-        event_type_raw = concert_blocks[i].strip()
-        block_content = concert_blocks[i+1].strip()
-
-        subject_match = re.match(r'(.+?)\n公演日：', block_content, re.DOTALL)
-        subject = subject_match.group(1).strip() if subject_match else ""
-
-        date_match = re.search(r'公演日：\n(.+?)\n会場：', block_content, re.DOTALL)
-        date_str = date_match.group(1).strip() if date_match else ""
-        
-        venue_match = re.search(r'会場：\n(.+?)\n販売方法', block_content, re.DOTALL)
-        venue = venue_match.group(1).strip() if venue_match else ""
-
-        start_date = parse_date_str(date_str.split('～')[0].strip())
-        end_date = parse_date_str(date_str.split('～')[-1].strip()) if '～' in date_str else start_date
-
-        estimated_attendees = estimate_attendees_from_venue(venue)
-        impact_level = get_impact_level(estimated_attendees)
-
-        concerts.append({
-            'EventType': 'コンサート',
-            'Subject': subject,
-            'StartDate': start_date,
-            'EndDate': end_date,
-            'EstimatedAttendees': estimated_attendees,
-            'Location': venue,
-            'ImpactLevel': impact_level,
-            'DataSource': 'l-tike.com',
-            'LastUpdated': datetime.now().strftime("%Y-%m-%d")
-        })
-    return pd.DataFrame(concerts)
+def write_concert_csv(raw_data_path, output_csv_file, chunk_size=1000, registry=None):
+    """コンサート情報を一定件数ごとにCSVへ書き出す（メモリ使用量は chunk_size 件分で一定）"""
+    columns = ['EventType', 'Subject', 'StartDate', 'EndDate', 'EstimatedAttendees',
+               'Location', 'ImpactLevel', 'DataSource', 'LastUpdated']
+    total = 0
+    # 出力先を開く前に前回の LastUpdated を読み、内容の変わらない公演は実行日で上書きしない
+    last_updated = load_last_updated(output_csv_file)
+    with open(raw_data_path, 'r', encoding='utf-8') as src, \
+            open(output_csv_file, 'w', encoding='utf-8-sig', newline='') as dst:
+        chunk = []
+        header = True
+        for record in iter_concert_records(src, registry):
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                carry_last_updated(pd.DataFrame(chunk, columns=columns), last_updated).to_csv(
+                    dst, index=False, header=header
+                )
+                total += len(chunk)
+                header = False
+                chunk = []
+        if chunk or header:
+            carry_last_updated(pd.DataFrame(chunk, columns=columns), last_updated).to_csv(
+                dst, index=False, header=header
+            )
+            total += len(chunk)
+    return total
+
+def run_concert_processor(raw_data_path='data/raw/concert_raw_data.txt',
+                          output_csv_file='data/processed/r7-concert_converted.csv'):
+    """生データを処理してコンサートCSVを出力する（パイプライン用）"""
+    count = write_concert_csv(raw_data_path, output_csv_file)
+    print(f"✅ コンサート情報を処理し、{output_csv_file} を作成しました。({count}件)")
+    return output_csv_file
 
 if __name__ == "__main__":
     raw_data_file = 'data/raw/concert_raw_data.txt'
@@ -140,7 +202,4 @@ if __name__ == "__main__":
     with open(raw_data_file, 'w', encoding='utf-8') as f:
         f.write(dummy_content)
 
-    df_concert = process_concert_data(raw_data_file)
-    df_concert.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
-
-    print(f"✅ コンサート情報を処理し、{output_csv_file} を作成しました。")
+    run_concert_processor(raw_data_file, output_csv_file)
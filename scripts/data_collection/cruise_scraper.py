@@ -1,12 +1,38 @@
-
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def estimate_attendees(tonnage_str):
-    """トン数から乗客数を推定する"""
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data_processing'))
+from capacity_registry import get_default_registry
+from event_loader import CRUISE_STATUS_CANCELLED, CRUISE_STATUS_SCHEDULED
+
+try:
+    import lxml.html  # Cで実装されたHTMLパーサ（無ければ BeautifulSoup の html.parser を使う）
+except ImportError:
+    lxml = None
+
+CRUISE_URL = "https://www.city.kushiro.lg.jp/sangyou/umisora/1006541/1006592/1006593.html"
+CRUISE_COLUMNS = [
+    'EventType', 'Subject', 'StartDate', 'EndDate',
+    'EstimatedAttendees', 'Location', 'ImpactLevel',
+    'DataSource', 'LastUpdated', 'Status'
+]
+# 同じ寄港かどうかを判定するキー（船名・入港日）
+CRUISE_KEY = ['Subject', 'StartDate']
+CANCELLED_PATTERN = re.compile(r'[【\[（(]?\s*(?:寄港中止|CANCELLED)\s*[】\]）)]?')
+
+def estimate_attendees(tonnage_str, ship_name=None, registry=None):
+    """船名（登録簿の乗客定員）またはトン数から乗客数を推定する"""
+    if ship_name:
+        capacity = (registry or get_default_registry()).ship_capacity(ship_name)
+        if capacity:
+            return capacity
+
     if not tonnage_str or not isinstance(tonnage_str, str):
         return 0
     
@@ -30,125 +56,173 @@ def get_impact_level(attendees):
     else:
         return "Low"
 
-def parse_cruise_schedule(url):
-    """クルーズ客船の入港予定ページをスクレイピングしてCSVに変換する"""
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        response.encoding = response.apparent_encoding
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL: {e}")
-        return
+def extract_cruise_row(cells, fiscal_year_start, today=None):
+    """入港予定表の1行（セルの文字列）から統合CSV形式の行を作る（対象外の行は None）"""
+    if len(cells) < 8:
+        return None
+
+    # 1. 日付と時刻の解析
+    arrival_date_match = re.search(r'(\d+)月(\d+)日', cells[1].strip())
+    if not arrival_date_match:
+        return None
+
+    month = int(arrival_date_match.group(1))
+    day = int(arrival_date_match.group(2))
+
+    # 年度に基づいて年を決定 (4月始まり)
+    year = fiscal_year_start if month >= 4 else fiscal_year_start + 1
+
+    start_date = f"{year}-{month:02d}-{day:02d}"
+    end_date = start_date # クルーズ船は同日出港が基本
+
+    # 2. 船名とトン数の抽出（中止された寄港も、予定と同じキーで記録するため表記を取り除く）
+    ship_info = cells[3].strip()
+    cancelled = CANCELLED_PATTERN.search(ship_info) is not None
+    ship_info = CANCELLED_PATTERN.sub('', ship_info).strip()
+    ship_name_match = re.match(r'([^\(]+)', ship_info)
+    ship_name = ship_name_match.group(1).strip() if ship_name_match else ""
+
+    tonnage_str = ""
+    tonnage_match = re.search(r'\((.*t)\)', ship_info)
+    if tonnage_match:
+        tonnage_str = tonnage_match.group(1)
+
+    # 3. その他の情報
+    berth = cells[6].strip().replace('\n', ' ')
+
+    # 4. 乗客数と影響レベルの推定
+    attendees = estimate_attendees(tonnage_str, ship_name)
+
+    return {
+        'EventType': 'クルーズ',
+        'Subject': f"{ship_name}入港",
+        'StartDate': start_date,
+        'EndDate': end_date,
+        'EstimatedAttendees': attendees,
+        'Location': berth,
+        'ImpactLevel': get_impact_level(attendees),
+        'DataSource': 'city.kushiro.lg.jp',
+        'LastUpdated': today or datetime.now().strftime("%Y-%m-%d"),
+        'Status': CRUISE_STATUS_CANCELLED if cancelled else CRUISE_STATUS_SCHEDULED,
+    }
+
+def _page_cells_lxml(html):
+    doc = lxml.html.document_fromstring(html)
+    title_tag = doc.find('.//h1')
+    title = title_tag.text_content() if title_tag is not None else ''
+    tables = doc.xpath('//table[contains(concat(" ", normalize-space(@class), " "), " w100 ")]')
+    tbody = tables[0].find('.//tbody') if tables else None
+    if tbody is None:
+        return title, None
+    return title, [[td.text_content() for td in tr.iter('td')] for tr in tbody.iter('tr')]
+
+def _page_cells_bs4(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('h1')
+    title = title_tag.text if title_tag else ''
+    table = soup.find('table', class_='w100')
+    tbody = table.find('tbody') if table else None
+    if tbody is None:
+        return title, None
+    return title, [[td.text for td in row.find_all('td')] for row in tbody.find_all('tr')]
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+def parse_schedule_html(html, today=None):
+    """入港予定ページのHTMLから行のリストを作る（年度・表が見つからなければ None）"""
+    title, rows = (_page_cells_lxml if lxml is not None else _page_cells_bs4)(html)
 
-    # ページのタイトルから年を取得
-    title_tag = soup.find('h1')
-    year_match = re.search(r'(\d{4})年度', title_tag.text if title_tag else '')
+    # ページのタイトルから年度を取得
+    year_match = re.search(r'(\d{4})年度', title)
     if not year_match:
         print("Error: Could not determine the year from the page title.")
-        return
-    
-    fiscal_year_start = int(year_match.group(1))
-
-    table = soup.find('table', class_='w100')
-    if not table:
+        return None
+    if rows is None:
         print("Error: Could not find the schedule table.")
-        return
-
-    rows = table.find('tbody').find_all('tr')
-    
-    cruise_data = []
+        return None
 
+    fiscal_year_start = int(year_match.group(1))
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    return [row for row in (extract_cruise_row(cells, fiscal_year_start, today) for cells in rows) if row]
+
+def fetch_schedule_html(source):
+    """入港予定ページのHTMLを取得する（保存済みのHTMLファイルのパスも指定できる）"""
+    if os.path.exists(source):
+        with open(source, encoding='utf-8') as f:
+            return f.read()
+    try:
+        response = requests.get(source, timeout=30)
+        response.raise_for_status()
+        response.encoding = response.apparent_encoding
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching URL: {e}")
+        return None
+    return response.text
+
+def merge_cruise_rows(existing_df, rows, today=None):
+    """取得した行を (船名, 入港日) ごとに既存の行へ反映する
+
+    内容が変わった行・寄港中止になった行は LastUpdated を更新し、
+    ページから消えた過去の寄港はそのまま残す。戻り値は (DataFrame, 件数の辞書)。
+    """
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    content_columns = [c for c in CRUISE_COLUMNS if c != 'LastUpdated']
+    merged = {}
+    for record in existing_df.to_dict('records'):
+        record = {column: str(record.get(column, '')) for column in CRUISE_COLUMNS}
+        record['Status'] = record['Status'] or CRUISE_STATUS_SCHEDULED
+        merged[(record['Subject'], record['StartDate'])] = record
+
+    counts = {'added': 0, 'updated': 0, 'cancelled': 0}
     for row in rows:
-        cols = row.find_all('td')
-        if len(cols) < 8:
+        row = {column: str(row[column]) for column in CRUISE_COLUMNS}
+        key = (row['Subject'], row['StartDate'])
+        current = merged.get(key)
+        if current is not None and all(current[c] == row[c] for c in content_columns):
             continue
-
-        # 中止された寄港はスキップ
-        if '寄港中止' in cols[3].text or 'CANCELLED' in cols[3].text:
+        if row['Status'] == CRUISE_STATUS_CANCELLED and (current is None or current['Status'] != row['Status']):
+            counts['cancelled'] += 1
+        elif current is None:
+            counts['added'] += 1
+        else:
+            counts['updated'] += 1
+        merged[key] = {**row, 'LastUpdated': today}
+
+    df = pd.DataFrame(list(merged.values()), columns=CRUISE_COLUMNS)
+    return df.sort_values('StartDate', kind='stable').reset_index(drop=True), counts
+
+def crawl_cruise_schedules(sources, output_filename='data/processed/r7-cruise_converted.csv', max_workers=4):
+    """複数年度の入港予定ページを取得し、既存のCSVに差分だけ反映する（成功時は出力パスを返す）"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = list(executor.map(fetch_schedule_html, sources))
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    rows = []
+    for source, html in zip(sources, pages):
+        page_rows = parse_schedule_html(html, today) if html is not None else None
+        if page_rows is None:
+            print(f"❌ {source} から入港予定を取得できませんでした。")
             continue
+        rows.extend(page_rows)
 
-        # 1. 日付と時刻の解析
-        arrival_text = cols[1].text.strip()
-        departure_text = cols[2].text.strip()
-
-        arrival_date_match = re.search(r'(\d+)月(\d+)日', arrival_text)
-        departure_date_match = re.search(r'(\d+)月(\d+)日', departure_text)
-
-        if not arrival_date_match:
-            continue
-
-        month = int(arrival_date_match.group(1))
-        day = int(arrival_date_match.group(2))
-        
-        # 年度に基づいて年を決定 (4月始まり)
-        year = fiscal_year_start if month >= 4 else fiscal_year_start + 1
-        
-        start_date = f"{year}-{month:02d}-{day:02d}"
-        end_date = start_date # クルーズ船は同日出港が基本
-
-        # 2. 船名とトン数の抽出
-        ship_info = cols[3].text.strip()
-        ship_name_match = re.match(r'([^\(]+)', ship_info)
-        ship_name = ship_name_match.group(1).strip() if ship_name_match else ""
-        
-        tonnage_str = ""
-        tonnage_match = re.search(r'\((.*t)\)', ship_info)
-        if tonnage_match:
-            tonnage_str = tonnage_match.group(1)
-
-        # 3. その他の情報
-        last_port = cols[4].text.strip().replace('\n', ' ')
-        next_port = cols[5].text.strip().replace('\n', ' ')
-        berth = cols[6].text.strip().replace('\n', ' ')
-        notes = cols[7].text.strip().replace('\n', ' ')
-
-        # 4. 乗客数と影響レベルの推定
-        attendees = estimate_attendees(tonnage_str)
-        impact_level = get_impact_level(attendees)
-
-        # 5. 統合データ作成
-        description_parts = [
-            f"トン数: {tonnage_str}" if tonnage_str else "",
-            f"前港: {last_port}",
-            f"次港: {next_port}",
-            f"備考: {notes}" if notes else ""
-        ]
-        description = "\n".join(filter(None, description_parts))
-
-        cruise_data.append({
-            'EventType': 'クルーズ',
-            'Subject': f"{ship_name}入港",
-            'StartDate': start_date,
-            'EndDate': end_date,
-            'EstimatedAttendees': attendees,
-            'Location': berth,
-            'ImpactLevel': impact_level,
-            'DataSource': 'city.kushiro.lg.jp',
-            'LastUpdated': datetime.now().strftime("%Y-%m-%d"),
-            'Description': description
-        })
-
-    if not cruise_data:
+    if not rows:
         print("No cruise data extracted.")
         return
 
-    # DataFrameに変換
-    df = pd.DataFrame(cruise_data)
-    
-    # 統合CSVのフォーマットに合わせる
-    output_df = df[[ 
-        'EventType', 'Subject', 'StartDate', 'EndDate', 
-        'EstimatedAttendees', 'Location', 'ImpactLevel', 
-        'DataSource', 'LastUpdated'
-    ]]
-
-    output_filename = 'data/processed/r7-cruise_converted.csv'
+    if os.path.exists(output_filename):
+        existing_df = pd.read_csv(output_filename, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    else:
+        existing_df = pd.DataFrame(columns=CRUISE_COLUMNS)
+    output_df, counts = merge_cruise_rows(existing_df, rows, today)
+
     output_df.to_csv(output_filename, index=False, encoding='utf-8-sig')
-    print(f"✅ 変換完了: {output_filename}")
+    print(f"✅ 変換完了: {output_filename}（追加 {counts['added']}件・更新 {counts['updated']}件・"
+          f"寄港中止 {counts['cancelled']}件）")
+    return output_filename
+
+def parse_cruise_schedule(url, output_filename='data/processed/r7-cruise_converted.csv'):
+    """クルーズ客船の入港予定ページをスクレイピングしてCSVに変換する（成功時は出力パスを返す）"""
+    return crawl_cruise_schedules([url], output_filename)
 
 
 if __name__ == "__main__":
-    target_url = "https://www.city.kushiro.lg.jp/sangyou/umisora/1006541/1006592/1006593.html"
-    parse_cruise_schedule(target_url)
+    # 年度ごとのページのURL（または保存済みHTMLのパス）を複数指定できる
+    crawl_cruise_schedules(sys.argv[1:] or [CRUISE_URL])
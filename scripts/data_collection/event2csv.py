@@ -1,4 +1,7 @@
+import hashlib
+import json
 import pdfplumber
+import numpy as np
 import pandas as pd
 import sys
 import os
@@ -6,6 +9,11 @@ import requests
 from io import BytesIO
 import re
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from glob import glob
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
 
 
 # 日付文字列を可能な限り YYYY-MM-DD に変換（和暦Rを西暦に変換、曖昧表現も仮日付に変換）
@@ -124,29 +132,134 @@ def parse_date_str(date_str, start_date=None, reiwa_year_context=None):
     return date_str
 
 
+PDF_TABLE_CACHE_DIR = "data/processed/.pdf_cache"
+# 抽出方法を変えたときは上げる（古いキャッシュを使わないため）
+PDF_TABLE_CACHE_VERSION = 2
+
+
+def _update_digest(digest, obj, seen):
+    """PDFオブジェクト（辞書・配列・ストリーム）をたどってハッシュに加える"""
+    if isinstance(obj, PDFObjRef):
+        # 同じオブジェクトを複数回参照していても（循環していても）1回だけ読む
+        if obj.objid in seen:
+            digest.update(f"R{obj.objid}".encode())
+            return
+        seen.add(obj.objid)
+        obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        digest.update(b"S")
+        _update_digest(digest, obj.attrs, seen)
+        digest.update(obj.get_rawdata() or b"")
+    elif isinstance(obj, dict):
+        digest.update(b"D")
+        for key in sorted(obj):
+            digest.update(str(key).encode())
+            _update_digest(digest, obj[key], seen)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"A")
+        for item in obj:
+            _update_digest(digest, item, seen)
+    elif isinstance(obj, PSLiteral):
+        digest.update(f"/{obj.name}".encode())
+    else:
+        digest.update(repr(obj).encode())
+
+
+def page_fingerprint(page):
+    """ページの内容ストリーム・ページサイズ・リソースのハッシュ（版が変わっても同じページなら同じ値）
+
+    フォント・画像・Form XObject が差し替えられると同じ内容ストリームでも抽出結果が変わるため、
+    ページが参照するリソースもたどってハッシュに含める。
+    """
+    digest = hashlib.sha256(repr(page.bbox).encode())
+    for stream in page.page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    _update_digest(digest, page.page_obj.resources, set())
+    return digest.hexdigest()
+
+
+def table_region(page, padding=1):
+    """罫線（線・矩形）の範囲。罫線の無いページは表が無いので None"""
+    edges = page.edges
+    if not edges:
+        return None
+    x0, top, x1, bottom = page.bbox
+    return (
+        max(x0, min(edge["x0"] for edge in edges) - padding),
+        max(top, min(edge["top"] for edge in edges) - padding),
+        min(x1, max(edge["x1"] for edge in edges) + padding),
+        min(bottom, max(edge["bottom"] for edge in edges) + padding),
+    )
+
+
+def extract_page_tables(page):
+    """表のある範囲だけを切り出してテーブルを抽出する"""
+    region = table_region(page)
+    if region is None:
+        return []
+    return page.crop(region).extract_tables()
+
+
+def _load_page_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    return cache.get("pages", {}) if cache.get("version") == PDF_TABLE_CACHE_VERSION else {}
+
+
+def _save_page_cache(cache_path, pages):
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"version": PDF_TABLE_CACHE_VERSION, "pages": pages}, f, ensure_ascii=False)
+
+
 # PDFからテーブル抽出（ヘッダー重複除去）
-def extract_tables_from_pdf(pdf_stream):
-    all_rows = []
+def extract_tables_from_pdf(pdf_stream, cache_path=None):
+    """全ページのテーブルを1つの DataFrame にする
+
+    cache_path を指定すると、ページ内容のハッシュごとに抽出結果を保存し、
+    前回から変わっていないページは pdfplumber で解析し直さない。
+    繰り返し現れるヘッダー行と重複行はページを走査しながら取り除く。
+    """
+    cache = _load_page_cache(cache_path)
+    pages = {}
+    all_rows, seen = [], set()
     header = None
+    n_pages = n_extracted = 0
 
     with pdfplumber.open(pdf_stream) as pdf:
         for page in pdf.pages:
-            tables = page.extract_tables()
+            n_pages += 1
+            key = page_fingerprint(page)
+            tables = cache.get(key)
+            if tables is None:
+                tables = extract_page_tables(page)
+                n_extracted += 1
+            pages[key] = tables
+            page.close()
+
             for table in tables:
                 if not table or len(table) < 2:
                     continue
                 if header is None:
                     header = table[0]
-                data_rows = table[1:] if table[0] == header else table
-                all_rows.extend(data_rows)
+                for row in table:
+                    row_key = tuple(row)
+                    if row == header or row_key in seen:
+                        continue
+                    seen.add(row_key)
+                    all_rows.append(row)
+
+    if cache_path:
+        # 今回のPDFに含まれるページだけを残す
+        _save_page_cache(cache_path, pages)
+        print(f"📄 {n_pages}ページ中 {n_extracted}ページを抽出しました（他はキャッシュを使用）。")
 
     if not header:
         raise ValueError("⚠️ ヘッダーが見つかりませんでした。")
 
-    df = pd.DataFrame(all_rows, columns=header)
-    df = df[~(df == pd.Series(header, index=df.columns)).all(axis=1)]
-    df = df.drop_duplicates()
-    return df
+    return pd.DataFrame(all_rows, columns=header)
 
 
 # 大会 or イベント判定
@@ -387,47 +500,107 @@ def download_pdf(url):
     return BytesIO(r.content)
 
 
-# 既存のCSVファイルを修正する関数
-def fix_existing_csv(csv_file):
-    df = pd.read_csv(csv_file)
+FIX_CHUNKSIZE = 50000
 
-    for index, row in df.iterrows():
-        start_date = row["Start Date"]
-        end_date = row["End Date"]
 
-        # Start Dateを修正
-        fixed_start = parse_date_str(start_date)
+def _parse_unique(values, start_dates=None, cache=None):
+    """重複のない値（End Dateは開始日との組）ごとに1回だけ parse_date_str を呼び、結果を各行に戻す
 
-        # End Dateを修正（Start Dateの情報を使用）
-        if pd.notna(end_date) and end_date != "":
-            fixed_end = parse_date_str(end_date, fixed_start)
-        else:
-            fixed_end = end_date
+    cache を渡すと、前のチャンクで解析済みの組は再解析しない。
+    """
+    cache = {} if cache is None else cache
+    value_codes, unique_values = pd.factorize(values)
+    if start_dates is None:
+        start_codes, unique_starts = np.zeros(len(values), dtype=np.int64), [None]
+    else:
+        start_codes, unique_starts = pd.factorize(start_dates)
+    # End Date の「2025年13日」のような表記は開始日の月で補うため、開始日との組で重複を除く
+    # 空欄（NaN）の行は factorize のコードが -1 になるため、解析せずそのまま残す
+    result = values.to_numpy(dtype=object).copy()
+    if len(unique_values) == 0:
+        return result
+    valid = value_codes >= 0
+    pair_codes = value_codes[valid] * (len(unique_starts) + 1) + (start_codes[valid] + 1)
+    unique_pairs, inverse = np.unique(pair_codes, return_inverse=True)
+
+    parsed = np.empty(len(unique_pairs), dtype=object)
+    for i, pair in enumerate(unique_pairs):
+        value_code, start_code = divmod(int(pair), len(unique_starts) + 1)
+        start = unique_starts[start_code - 1] if start_code else None
+        key = (unique_values[value_code], start)
+        if key not in cache:
+            cache[key] = parse_date_str(*key)
+        parsed[i] = cache[key]
+
+    result[valid] = parsed[inverse]
+    return result
+
+
+def fix_date_columns(df, cache=None):
+    """Start Date / End Date を YYYY-MM-DD に修正する（End Date は修正後の Start Date を参照）"""
+    cache = {} if cache is None else cache
+    df["Start Date"] = _parse_unique(df["Start Date"], cache=cache)
+    end_dates = df["End Date"].where(df["End Date"] != "")
+    fixed_end = _parse_unique(end_dates, df["Start Date"], cache)
+    df["End Date"] = np.where(end_dates.notna(), fixed_end, df["End Date"].to_numpy(dtype=object))
+    return df
 
-        df.at[index, "Start Date"] = fixed_start
-        df.at[index, "End Date"] = fixed_end
 
-    # 修正されたCSVを保存
-    output_file = csv_file.replace(".csv", "_fixed.csv")
-    df.to_csv(output_file, index=False, encoding="utf-8-sig")
-    print(f"✅ 修正完了: {output_file}")
+# 既存のCSVファイルを修正する関数
+def fix_existing_csv(csv_file, output_file=None, chunksize=FIX_CHUNKSIZE):
+    """CSVをチャンクごとに読み込んで日付を修正し、修正済みの行を順に *_fixed.csv へ書き出す"""
+    output_file = output_file or csv_file.replace(".csv", "_fixed.csv")
+    n_rows = 0
+    cache = {}
+    # BOMを先頭に1回だけ書くため、ファイルは開いたままチャンクを追記する
+    with open(output_file, "w", encoding="utf-8-sig", newline="") as f:
+        # 数値の列も元の表記のまま書き戻せるよう、全列を文字列として読む
+        for i, chunk in enumerate(pd.read_csv(csv_file, dtype=str, chunksize=chunksize)):
+            fix_date_columns(chunk, cache).to_csv(f, index=False, header=(i == 0))
+            n_rows += len(chunk)
+
+    print(f"✅ 修正完了: {output_file} ({n_rows}行)")
     return output_file
 
 
+def fix_csv_directory(directory, pattern="*.csv", chunksize=FIX_CHUNKSIZE, max_workers=None):
+    """ディレクトリ内の変換済みCSVをワーカープロセスで並列に修正する
+
+    *_fixed.csv と、Start Date / End Date 列の無いCSV（クルーズ・コンサートなど）は対象外。
+    """
+    csv_files = sorted(
+        path
+        for path in glob(os.path.join(directory, pattern))
+        if not path.endswith("_fixed.csv")
+        and {"Start Date", "End Date"} <= set(pd.read_csv(path, nrows=0).columns)
+    )
+    if not csv_files:
+        print(f"⚠️ 修正対象のCSVがありません: {directory}")
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        outputs = list(executor.map(partial(fix_existing_csv, chunksize=chunksize), csv_files))
+    print(f"✅ {len(outputs)}ファイルの修正が完了しました。")
+    return outputs
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("使い方: python event2csv.py <PDFのURL または CSVファイル>")
+        print("使い方: python event2csv.py <PDFのURL または CSVファイル または CSVのディレクトリ>")
         sys.exit(1)
 
     input_path = sys.argv[1]
 
-    # CSVファイルの場合は修正処理
-    if input_path.endswith(".csv"):
+    # CSVファイル・ディレクトリの場合は修正処理
+    if os.path.isdir(input_path):
+        fix_csv_directory(input_path)
+    elif input_path.endswith(".csv"):
         fix_existing_csv(input_path)
     else:
         # PDFの場合は従来の処理
         pdf_stream = download_pdf(input_path)
-        df = extract_tables_from_pdf(pdf_stream)
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        cache_path = os.path.join(PDF_TABLE_CACHE_DIR, f"{base}_tables.json")
+        df = extract_tables_from_pdf(pdf_stream, cache_path)
         fmt_type = detect_format(df)
         print(f"📄 判定: {fmt_type}")
 
@@ -441,14 +614,11 @@ if __name__ == "__main__":
             df, fmt_type, reiwa_year_context=reiwa_year_context
         )
 
-        base = os.path.splitext(os.path.basename(input_path))[0]
         output_csv = f"data/processed/{base}_converted.csv"
         cal_df.to_csv(output_csv, index=False, encoding="utf-8-sig")
 
         # 日程未定イベントをJSONで保存
         if pending_events:
-            import json
-
             pending_json = f"data/processed/{base}_pending.json"
             with open(pending_json, "w", encoding="utf-8") as f:
                 json.dump(pending_events, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import orjson  # 高速なJSONシリアライザ（無ければ標準の json を使う）
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # brotli が無ければ .br は出力しない
+except ImportError:
+    brotli = None
+
+PUBLISH_DIR = "data/published"
+MANIFEST_PATH = os.path.join(PUBLISH_DIR, "manifest.json")
+
+# 公開する名前 -> 元のJSONファイル（ブラウザは manifest.json から内容ハッシュ付きのファイル名を引く）
+PUBLISHED_ASSETS = {
+    "calendar_data": "data/processed/calendar_data.json",
+    "calendar_details": "data/processed/calendar_details.json",
+    "search_index": "data/processed/search_index.json",
+    "peak_periods": "data/processed/peak_periods.json",
+}
+HASH_LENGTH = 12
+
+
+def minify_json(path):
+    """JSONファイルを読み込み、空白なしのUTF-8バイト列にする"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if orjson is not None:
+        return orjson.dumps(orjson.loads(raw))
+    return json.dumps(json.loads(raw), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compressed_variants(data):
+    """(拡張子, 圧縮後のバイト列) の一覧。gzip は mtime=0 で内容が同じなら同じバイト列になる"""
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    return variants
+
+
+def _write_if_missing(path, data):
+    # ファイル名に内容のハッシュを含むため、既にあれば同じ内容
+    if os.path.exists(path):
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def publish_assets(assets=PUBLISHED_ASSETS, directory=PUBLISH_DIR, manifest_path=MANIFEST_PATH):
+    """JSONを最小化・圧縮し、内容ハッシュ付きのファイル名で書き出して manifest.json を更新する"""
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"assets": {}}
+    published = {os.path.basename(manifest_path)}
+    total_source = total_gzip = 0
+    for name, source_path in assets.items():
+        if not os.path.exists(source_path):
+            print(f"⚠️ {source_path} が無いため、{name} は公開しません。")
+            continue
+        data = minify_json(source_path)
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        filename = f"{name}.{digest}.json"
+        path = os.path.join(directory, filename)
+        _write_if_missing(path, data)
+        published.add(filename)
+
+        entry = {"path": path.replace(os.sep, "/"), "bytes": len(data)}
+        for extension, compressed in compressed_variants(data):
+            _write_if_missing(path + extension, compressed)
+            published.add(filename + extension)
+            entry[f"{extension[1:]}_bytes"] = len(compressed)
+        manifest["assets"][name] = entry
+        total_source += os.path.getsize(source_path)
+        total_gzip += entry["gz_bytes"]
+
+    # 参照されなくなった古い版を削除する
+    for filename in os.listdir(directory):
+        if filename not in published:
+            os.remove(os.path.join(directory, filename))
+
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+    print(
+        f"✅ {len(manifest['assets'])}件のデータを {directory} に公開しました"
+        f"（{total_source:,} バイト → gzip {total_gzip:,} バイト）。"
+    )
+    return manifest
+
+
+if __name__ == "__main__":
+    publish_assets()
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from pipeline import file_fingerprint
+from calendar_generator import build_scoring_inputs, filter_region, load_monthly_trends
+from event_loader import COMBINED_EVENT_SCHEMA, EVENT_KEY_COLUMNS, load_csv
+from holiday_parser import HolidayParser
+from scoring import EVENT_FEATURE_NAMES, FEATURE_NAMES, load_scoring_config, weight_vector
+from weight_calibrator import load_occupancy
+
+SNAPSHOT_DIR = "data/snapshots"
+SNAPSHOT_INDEX = os.path.join(SNAPSHOT_DIR, "index.json")
+EVENTS_CSV = "data/processed/combined_events.csv"
+DEFAULT_REPORT_PATH = "data/processed/backtest_report.json"
+
+FAR_FUTURE = np.datetime64("9999-12-31")
+
+
+def load_snapshot_index(index_path=SNAPSHOT_INDEX):
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def take_snapshot(paths, snapshot_dir=SNAPSHOT_DIR, taken_at=None):
+    """入力ファイルの版を内容ハッシュで保存する（前回から変化が無ければ何もしない）"""
+    index_path = os.path.join(snapshot_dir, "index.json")
+    snapshots = load_snapshot_index(index_path)
+    files = {path: file_fingerprint(path) for path in paths if os.path.exists(path)}
+    if snapshots and snapshots[-1]["files"] == files:
+        print("✅ 入力に変更が無いため、スナップショットは追加しませんでした。")
+        return snapshots[-1]
+
+    # 内容ハッシュをファイル名にして保存するため、変化の無いファイルは重複しない
+    objects_dir = os.path.join(snapshot_dir, "objects")
+    os.makedirs(objects_dir, exist_ok=True)
+    for path, digest in files.items():
+        object_path = os.path.join(objects_dir, digest)
+        if not os.path.exists(object_path):
+            shutil.copyfile(path, object_path)
+
+    snapshot = {
+        "taken_at": (taken_at or datetime.now()).strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": files,
+    }
+    snapshots.append(snapshot)
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(snapshots, f, ensure_ascii=False, indent=4)
+    print(f"✅ スナップショットを保存しました（{snapshot['taken_at']}, {len(files)}ファイル）。")
+    return snapshot
+
+
+def _read_events(path):
+    # 過去のスナップショットは除外行を書き出さずに読み込む
+    df, _ = load_csv(path, COMBINED_EVENT_SCHEMA)
+    return df
+
+
+def load_event_history(snapshot_dir=SNAPSHOT_DIR, events_csv_path=EVENTS_CSV):
+    """全スナップショットのイベント行を統合し、各行が既知だった期間 [KnownFrom, KnownUntil) を付ける
+
+    KnownFrom は LastUpdated（無ければ初めて現れたスナップショットの日付）、
+    KnownUntil はその行が消えた（中止・日程変更された）最初のスナップショットの日付。
+    スナップショットが無い場合は現在のCSVを LastUpdated だけで扱う。
+    """
+    versions = []
+    for snapshot in load_snapshot_index(os.path.join(snapshot_dir, "index.json")):
+        digest = snapshot["files"].get(events_csv_path)
+        if digest:
+            versions.append((snapshot["taken_at"], os.path.join(snapshot_dir, "objects", digest)))
+    if not versions:
+        versions = [(None, events_csv_path)]
+
+    frames = []
+    for version, (taken_at, path) in enumerate(versions):
+        df = _read_events(path)
+        taken = pd.Timestamp(taken_at).normalize() if taken_at else pd.NaT
+        df["KnownFrom"] = df["LastUpdated"].fillna(taken)
+        df["Version"] = version
+        frames.append(df)
+    history = pd.concat(frames, ignore_index=True)
+    history["EventType"] = history["EventType"].astype(object)
+    history[EVENT_KEY_COLUMNS] = history[EVENT_KEY_COLUMNS].fillna("")
+
+    grouped = history.groupby(EVENT_KEY_COLUMNS, sort=False)
+    events = grouped.first()
+    events["KnownFrom"] = grouped["KnownFrom"].min()
+    last_version = grouped["Version"].max()
+    # 最後の版にも残っている行は現在も有効
+    retired_dates = [
+        pd.Timestamp(versions[v + 1][0]).normalize() if v + 1 < len(versions) else pd.NaT
+        for v in range(len(versions))
+    ]
+    events["KnownUntil"] = [retired_dates[v] for v in last_version]
+    events = events.reset_index()
+    events["EstimatedAttendees"] = pd.to_numeric(events["EstimatedAttendees"], errors="coerce")
+    return events.drop(columns=["Version"])
+
+
+class AsOfReplay:
+    """1つのイベント区間インデックスを共有し、任意の時点で既知だったイベントだけのスコアを求める"""
+
+    def __init__(self, events, start_year, end_year, holiday_parser=None, monthly_trends=None, config=None):
+        self.config = config or load_scoring_config()
+        self.event_index, _, _, features = build_scoring_inputs(
+            events,
+            start_year,
+            end_year,
+            holiday_parser or HolidayParser(),
+            monthly_trends if monthly_trends is not None else load_monthly_trends(),
+        )
+        self.horizon_start = self.event_index.horizon_start
+        self.n_days = self.event_index.n_days
+
+        # イベント由来以外（祝日・土日・トレンド・連休）の部分は時点によらない
+        is_event_feature = np.isin(FEATURE_NAMES, EVENT_FEATURE_NAMES)
+        weights = weight_vector(self.config)
+        self.base_scores = features[:, ~is_event_feature] @ weights[~is_event_feature]
+        self.base_scores += self.config.get("intercept", 0)
+        self.event_scores = self.event_index.components @ weight_vector(self.config, EVENT_FEATURE_NAMES)
+
+        # いつ判明したか分からない行は最初から既知として扱う
+        known_from = self.event_index.events["KnownFrom"].to_numpy("datetime64[D]")
+        self.known_from = np.where(np.isnat(known_from), np.datetime64("1970-01-01"), known_from)
+        known_until = self.event_index.events["KnownUntil"].to_numpy("datetime64[D]")
+        self.known_until = np.where(np.isnat(known_until), FAR_FUTURE, known_until)
+
+    def mask(self, as_of):
+        """as_of 時点で既知だったイベントのマスク"""
+        as_of = np.datetime64(as_of, "D")
+        return (self.known_from <= as_of) & (as_of < self.known_until)
+
+    def scores(self, as_of):
+        """as_of 時点のカレンダーの日別スコア"""
+        daily = self.event_index.daily_components(self.mask(as_of))
+        weights = weight_vector(self.config, EVENT_FEATURE_NAMES)
+        return self.base_scores + daily @ weights
+
+    def score_matrix(self, as_of_dates):
+        """全時点の日別スコア [時点 × 日] を一度に求める
+
+        イベントが既知になった時点・消えた時点と開催期間の2次元差分配列を作り、
+        時点方向と日方向の累積和をとる。
+        """
+        as_of_dates = np.asarray(as_of_dates, dtype="datetime64[D]")
+        n_as_of = len(as_of_dates)
+        first = np.searchsorted(as_of_dates, self.known_from, side="left")
+        last = np.searchsorted(as_of_dates, self.known_until, side="left")
+        valid = first < last
+
+        start = np.clip(self.event_index.start, 0, self.n_days)[valid]
+        end = np.clip(self.event_index.end + 1, 0, self.n_days)[valid]
+        first, last, values = first[valid], last[valid], self.event_scores[valid]
+
+        diff = np.zeros((n_as_of + 1, self.n_days + 1))
+        np.add.at(diff, (first, start), values)
+        np.add.at(diff, (first, end), -values)
+        np.add.at(diff, (last, start), -values)
+        np.add.at(diff, (last, end), values)
+        event_part = diff.cumsum(axis=0).cumsum(axis=1)[:n_as_of, : self.n_days]
+        return self.base_scores[None, :] + event_part
+
+
+def _spearman(a, b):
+    if len(a) < 2:
+        return np.nan
+    rank_a = pd.Series(a).rank().to_numpy()
+    rank_b = pd.Series(b).rank().to_numpy()
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return np.nan
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def evaluate(replay, as_of_dates, actuals, lead_days=90, high_quantile=0.9):
+    """各時点のカレンダーを、その翌日から lead_days 日先までの実績と比較する"""
+    scores = replay.score_matrix(as_of_dates)
+    offsets = np.array([(d - replay.horizon_start).days for d in actuals.index])
+    in_horizon = (offsets >= 0) & (offsets < replay.n_days)
+    actual = np.full(replay.n_days, np.nan)
+    actual[offsets[in_horizon]] = actuals.to_numpy()[in_horizon]
+
+    high_threshold = replay.config["thresholds"]["high"]
+    actual_high = actual >= np.nanquantile(actual, high_quantile)
+    has_actual = ~np.isnan(actual)
+
+    rows = []
+    total_predicted = total_hits = total_high = 0
+    for i, as_of in enumerate(as_of_dates):
+        first = (as_of - replay.horizon_start).days + 1
+        window = slice(max(first, 0), max(min(first + lead_days, replay.n_days), 0))
+        observed = has_actual[window]
+        predicted = scores[i, window][observed]
+        realized = actual[window][observed]
+        is_high = actual_high[window][observed]
+        predicted_high = predicted >= high_threshold
+
+        hits = int((predicted_high & is_high).sum())
+        total_predicted += int(predicted_high.sum())
+        total_hits += hits
+        total_high += int(is_high.sum())
+        rows.append(
+            {
+                "as_of": as_of.strftime("%Y-%m-%d"),
+                "n_days": int(observed.sum()),
+                "spearman": _spearman(predicted, realized),
+                "high_days": int(predicted_high.sum()),
+                "high_hit_rate": hits / predicted_high.sum() if predicted_high.any() else None,
+            }
+        )
+
+    correlations = np.array([row["spearman"] for row in rows], dtype=np.float64)
+    summary = {
+        "n_as_of": len(rows),
+        "lead_days": lead_days,
+        "mean_spearman": float(np.nanmean(correlations)) if np.isfinite(correlations).any() else None,
+        "high_hit_rate": total_hits / total_predicted if total_predicted else None,
+        "high_recall": total_hits / total_high if total_high else None,
+    }
+    for row in rows:
+        if np.isnan(row["spearman"]):
+            row["spearman"] = None
+    return summary, rows
+
+
+def run_backtest(
+    occupancy_csv_path,
+    start_date,
+    end_date,
+    lead_days=90,
+    step_days=1,
+    target_column="occupancy",
+    report_path=DEFAULT_REPORT_PATH,
+):
+    """過去の各時点のカレンダーを再現し、実績との順位相関・High日的中率をレポートする"""
+    started = time.perf_counter()
+    actuals = load_occupancy(occupancy_csv_path, target_column)
+    if actuals.empty:
+        print("❌ 実績データがありません。")
+        return None
+
+    events = filter_region(load_event_history())
+    as_of_dates = []
+    current = start_date
+    while current <= end_date:
+        as_of_dates.append(current)
+        current += timedelta(days=step_days)
+
+    # 再現する全時点と実績をカバーする期間でインデックスを1度だけ作る
+    start_year = min(start_date.year, min(actuals.index).year)
+    end_year = max((end_date + timedelta(days=lead_days)).year, max(actuals.index).year)
+    replay = AsOfReplay(events, start_year, end_year)
+    summary, rows = evaluate(replay, as_of_dates, actuals, lead_days)
+    summary["n_events"] = len(events)
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "as_of": rows}, f, ensure_ascii=False, indent=4)
+    print(
+        f"✅ バックテスト完了: {summary['n_as_of']}時点, 平均順位相関={summary['mean_spearman']}, "
+        f"High的中率={summary['high_hit_rate']}（{summary['elapsed_seconds']}秒）"
+    )
+    print(f"   レポート: {report_path}")
+    return summary
+
+
+def _parse_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="過去のカレンダーを実績と突き合わせるバックテスト")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="現在の入力ファイルのスナップショットを保存する")
+    snapshot_parser.add_argument("paths", nargs="*", default=[EVENTS_CSV])
+
+    run_parser = subparsers.add_parser("run", help="指定期間の各日時点のカレンダーを再現して評価する")
+    run_parser.add_argument("occupancy_csv", help="date, occupancy[, adr] 列を持つ日別実績CSV")
+    run_parser.add_argument("--start", type=_parse_date, required=True, help="最初の時点 (YYYY-MM-DD)")
+    run_parser.add_argument("--end", type=_parse_date, required=True, help="最後の時点 (YYYY-MM-DD)")
+    run_parser.add_argument("--lead", type=int, default=90, help="各時点から何日先までを評価するか")
+    run_parser.add_argument("--step", type=int, default=1, help="時点の間隔（日）")
+    run_parser.add_argument("--target", default="occupancy")
+    run_parser.add_argument("--report", default=DEFAULT_REPORT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        take_snapshot(args.paths)
+    else:
+        run_backtest(
+            args.occupancy_csv, args.start, args.end, args.lead, args.step, args.target, args.report
+        )
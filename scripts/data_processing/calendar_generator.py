@@ -1,180 +1,161 @@
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import timedelta
+from calendar_records import CompactCalendar
+from event_loader import load_combined_events
 from holiday_parser import HolidayParser
+from offday_runs import OffDayRunIndex
+from region_index import get_default_region_index
+from scoring import (
+    EVENT_FEATURE_NAMES,
+    FEATURE_NAMES,
+    EventIntervalIndex,
+    build_calendar_features,
+    classify_impact,
+    horizon_dates,
+    load_scoring_config,
+    weight_vector,
+)
 import json
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
+EVENT_EMOJIS = {"大会": "🏆 ", "クルーズ": "🚢 ", "イベント": "🎉 ", "コンサート": "🎤 "}
 
-def generate_calendar_data(events_csv_path, start_year, end_year):
-    # イベントデータを読み込む
-    df_events = pd.read_csv(events_csv_path)
-    # 日付カラムをdatetimeに変換。エラーはNaTに変換する
-    df_events["StartDate"] = pd.to_datetime(df_events["StartDate"], errors="coerce")
-    df_events["EndDate"] = pd.to_datetime(df_events["EndDate"], errors="coerce")
 
-    # 無効な日付を持つ行を削除
-    df_events.dropna(subset=["StartDate", "EndDate"], inplace=True)
+def load_events(events_csv_path):
+    """統合イベントCSVをスキーマに従って読み込む
 
-    # 祝日パーサーを初期化
-    holiday_parser = HolidayParser()
+    日付が空・不正な行は除外する。除外した行と理由は結合時に *_quarantine.csv に書き出される。
+    """
+    return load_combined_events(events_csv_path)
 
-    # 月ごとのトレンドデータを読み込む
-    monthly_trends_path = "data/processed/monthly_tourism_trends.json"
-    monthly_trends = {}
+
+def filter_region(df_events, region_id=None, region_index=None):
+    """指定地域（省略時は既定の地域）で開催されるイベントだけを残す"""
+    region_index = region_index or get_default_region_index()
+    region_id = region_id or region_index.default.id
+    mask = [
+        region_index.in_region(region_id, location, subject)
+        for location, subject in zip(df_events["Location"], df_events["Subject"])
+    ]
+    return df_events[np.array(mask, dtype=bool)]
+
+
+def load_monthly_trends(monthly_trends_path="data/processed/monthly_tourism_trends.json"):
+    """月ごとのトレンドデータを読み込む"""
     try:
         with open(monthly_trends_path, "r", encoding="utf-8") as f:
-            monthly_trends = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
         print(
             f"Warning: {monthly_trends_path} not found. Monthly tourism trends will not be applied."
         )
+        return {}
 
-    # イベントタイプごとのデフォルトスコア（参加者数0の場合）
-    default_scores = {
-        "大会": 200,
-        "クルーズ": 50,
-        "コンサート": 100,
-        "イベント": 300,  # 霧フェスのような大規模イベント向け
+
+def load_holidays(holiday_parser, start_date, end_date):
+    """期間内の祝日を {日付: 祝日名} の辞書にする"""
+    return {
+        pd.Timestamp(holiday["Date"]).date(): holiday["Name"]
+        for holiday in holiday_parser.get_holidays_in_range(start_date, end_date)
     }
 
-    calendar_data = {}
-    current_date = datetime(start_year, 1, 1).date()
-    end_date = datetime(end_year, 12, 31).date()
-
-    while current_date <= end_date:
-        date_str = current_date.strftime("%Y-%m-%d")
-        daily_data = {
-            "date": date_str,
-            "is_holiday": False,
-            "holiday_name": None,
-            "events": [],
-            "demand_score": 0,
-            "monthly_trend_score": 0,
-            "impact_level": "Low",
-        }
-
-        # 祝日情報を追加
-        if holiday_parser.is_holiday(current_date):
-            daily_data["is_holiday"] = True
-            daily_data["holiday_name"] = holiday_parser.get_holiday_name(current_date)
-            daily_data["demand_score"] += 50  # 祝日は固定で50点
-
-        # 月ごとのトレンドスコアを加算
-        month_key = current_date.strftime("%Y-%m")
-        if month_key in monthly_trends:
-            daily_data["monthly_trend_score"] = monthly_trends[month_key]
-            daily_data["demand_score"] += daily_data["monthly_trend_score"] * 2
-
-        # イベント情報を追加
-        for _, event in df_events.iterrows():
-            if event["StartDate"].date() <= current_date <= event["EndDate"].date():
-                subject_with_emoji = event["Subject"]
-                if event["EventType"] == "大会":
-                    subject_with_emoji = "🏆 " + subject_with_emoji
-                elif event["EventType"] == "クルーズ":
-                    subject_with_emoji = "🚢 " + subject_with_emoji
-                elif event["EventType"] == "イベント":
-                    subject_with_emoji = "🎉 " + subject_with_emoji
-                elif event["EventType"] == "コンサート":
-                    subject_with_emoji = "🎤 " + subject_with_emoji
-
-                daily_data["events"].append(
-                    {
-                        "subject": subject_with_emoji,
-                        "event_type": event["EventType"],
-                        "estimated_attendees": event["EstimatedAttendees"],
-                        "location": event["Location"],
-                        "impact_level": event["ImpactLevel"],
-                    }
-                )
-
-                # イベントの推定参加者数に基づいてスコアを加算
-                duration = (
-                    event["EndDate"].date() - event["StartDate"].date()
-                ).days + 1
-                score_to_add = 0
-                if event["EstimatedAttendees"] > 0:
-                    score_to_add = (event["EstimatedAttendees"] / duration) / 5
-                else:
-                    score_to_add = (
-                        default_scores.get(event["EventType"], 100) / duration
-                    )
-
-                if event["EventType"] == "クルーズ":
-                    score_to_add /= (
-                        10  # クルーズ船のウェイトを1/10に（宿泊客への影響少ない）
-                    )
-
-                if event["EventType"] == "大会":
-                    if duration > 1:
-                        score_to_add += (event["EstimatedAttendees"] / 10) * (
-                            duration - 1
-                        )
-                    if "全国" in event["Subject"] or event["EstimatedAttendees"] >= 500:
-                        score_to_add += 50 / duration
-
-                # 霧フェス専用のボーナス点
-                if (
-                    "霧フェス" in event["Subject"]
-                    or "KUSHIRO KIRI FESTIVAL" in event["Subject"]
-                ):
-                    score_to_add += 200 / duration  # 霧フェスは特別に200点を日割り加算
-
-                daily_data["demand_score"] += score_to_add
-
-        # 曜日効果
-        if current_date.weekday() >= 5:  # 土日
-            daily_data["demand_score"] += 20
-
-        # 固定の閾値で影響度を判定
-        daily_data["impact_level"] = (
-            "High"
-            if daily_data["demand_score"] >= 1000
-            else "Medium" if daily_data["demand_score"] >= 300 else "Low"
-        )
 
-        # スコア計算のログ出力
-        event_scores = []
-        for _, event in df_events.iterrows():
-            if event["StartDate"].date() <= current_date <= event["EndDate"].date():
-                duration = (
-                    event["EndDate"].date() - event["StartDate"].date()
-                ).days + 1
-                if event["EstimatedAttendees"] > 0:
-                    base_score = (event["EstimatedAttendees"] / duration) / 5
-                else:
-                    base_score = default_scores.get(event["EventType"], 100) / duration
-
-                if event["EventType"] == "クルーズ":
-                    base_score /= 10
-
-                if event["EventType"] == "大会":
-                    if duration > 1:
-                        base_score += (event["EstimatedAttendees"] / 10) * (
-                            duration - 1
-                        )
-                    if "全国" in event["Subject"] or event["EstimatedAttendees"] >= 500:
-                        base_score += 50 / duration
-
-                if (
-                    "霧フェス" in event["Subject"]
-                    or "KUSHIRO KIRI FESTIVAL" in event["Subject"]
-                ):
-                    base_score += 200 / duration
-
-                event_scores.append(f"{event['Subject']}({base_score:.2f})")
+def build_scoring_inputs(df_events, start_year, end_year, holiday_parser, monthly_trends):
+    """イベント区間インデックス・祝日・連休インデックスから日×特徴量の設計行列を作る"""
+    horizon_start, n_days = horizon_dates(start_year, end_year)
+    end_date = horizon_start + timedelta(days=n_days - 1)
+
+    holidays = load_holidays(holiday_parser, horizon_start, end_date)
+    is_holiday = [horizon_start + timedelta(days=i) in holidays for i in range(n_days)]
+    offday_index = OffDayRunIndex(horizon_start, is_holiday)
+    event_index = EventIntervalIndex(df_events, horizon_start, n_days)
+    features = build_calendar_features(event_index, holidays, monthly_trends, offday_index)
+    return event_index, holidays, offday_index, features
+
+
+def generate_calendar_data(
+    events_csv_path, start_year, end_year, scoring_config=None, holiday_parser=None, region=None
+):
+    # イベントデータを読み込み、対象地域（省略時は釧路市）のイベントに絞る
+    df_events = filter_region(load_events(events_csv_path), region)
 
+    # 祝日パーサーを初期化
+    holiday_parser = holiday_parser or HolidayParser()
+
+    # 月ごとのトレンドデータを読み込む
+    monthly_trends = load_monthly_trends()
+
+    # スコアの重みと閾値（調整済みの設定があればそれを使う）
+    config = scoring_config or load_scoring_config()
+
+    return build_calendar(df_events, start_year, end_year, config, holiday_parser, monthly_trends)
+
+
+def build_calendar(df_events, start_year, end_year, config, holiday_parser, monthly_trends, verbose=True):
+    """イベント・祝日・トレンドから日別のカレンダーデータ（CompactCalendar）を作る"""
+    event_index, holidays, offday_index, features = build_scoring_inputs(
+        df_events, start_year, end_year, holiday_parser, monthly_trends
+    )
+    weights = weight_vector(config)
+    scores = features @ weights + config.get("intercept", 0)
+    impact_levels = classify_impact(scores, config)
+    event_scores = event_index.components @ weight_vector(config, EVENT_FEATURE_NAMES)
+
+    n_days = event_index.n_days
+    calendar = CompactCalendar(event_index.horizon_start, n_days)
+    strings = calendar.strings
+    dates = [calendar.date_at(offset) for offset in range(n_days)]
+
+    # 月ごとのトレンド値は月の数だけ持ち、各日は月の添字で参照する
+    months = {}
+    trend_month = np.array(
+        [months.setdefault(day.strftime("%Y-%m"), len(months)) for day in dates], dtype=np.int32
+    )
+    calendar.monthly_trends = [monthly_trends.get(month, 0) for month in months]
+    calendar.days = {
+        "demand_score": np.asarray(scores, dtype=np.float64),
+        "is_holiday": np.array([day in holidays for day in dates], dtype=bool),
+        "holiday_name": strings.intern_many([holidays.get(day) for day in dates]),
+        "trend_month": trend_month,
+        "offday_run_length": np.asarray(offday_index.run_length, dtype=np.int32),
+        "offday_run_position": np.asarray(offday_index.run_position, dtype=np.int32),
+        "is_bridge_day": np.asarray(offday_index.is_bridge, dtype=bool),
+        "impact_level": strings.intern_many([str(level) for level in impact_levels]),
+    }
+
+    events = event_index.events
+    event_types = events["EventType"].astype(object).tolist()
+    subjects = events["Subject"].astype(object).tolist()
+    calendar.events = {
+        "subject": strings.intern_many(
+            [EVENT_EMOJIS.get(event_type, "") + subject for event_type, subject in zip(event_types, subjects)]
+        ),
+        "event_type": strings.intern_many(event_types),
+        "estimated_attendees": events["EstimatedAttendees"].to_numpy(dtype=np.int64),
+        "location": strings.intern_many(events["Location"].astype(object).tolist()),
+        "impact_level": strings.intern_many(events["ImpactLevel"].astype(object).tolist()),
+    }
+    # 日ごとの開催イベント（CSVの行順）
+    calendar.set_day_events(*event_index.event_day_pairs())
+
+    if not verbose:
+        return calendar
+
+    # スコア計算のログ出力
+    offday_columns = [FEATURE_NAMES.index("long_weekend"), FEATURE_NAMES.index("bridge_day")]
+    for offset in range(n_days):
+        contributions = features[offset] * weights
+        event_log = [f"{subjects[event_id]}({event_scores[event_id]:.2f})" for event_id in calendar.events_on(offset)]
+        offday_bonus = contributions[offday_columns[0]] + contributions[offday_columns[1]]
         print(
-            f"{date_str}: DemandScore={daily_data['demand_score']:.2f}, Holiday={50 if daily_data['is_holiday'] else 0}, Weekend={20 if current_date.weekday() >= 5 else 0}, Trend={daily_data['monthly_trend_score'] * 2}, Events={event_scores}, Impact={daily_data['impact_level']}"
+            f"{dates[offset].strftime('%Y-%m-%d')}: DemandScore={scores[offset]:.2f}, Holiday={contributions[0]:g}, Weekend={contributions[1]:g}, Trend={contributions[2]}, OffDayRun={offday_bonus:g}, Events={event_log}, Impact={impact_levels[offset]}"
         )
 
-        calendar_data[date_str] = daily_data
-        current_date += timedelta(days=1)
-
-    return calendar_data
+    return calendar
 
 
 if __name__ == "__main__":
@@ -185,7 +166,11 @@ if __name__ == "__main__":
 
     calendar_output = generate_calendar_data(events_csv, start_year, end_year)
 
-    with open(output_json_file, "w", encoding="utf-8") as f:
-        json.dump(calendar_output, f, ensure_ascii=False, indent=4)
+    # 日程未定イベントの期待スコアとP10/P90の帯を各日に追加
+    from pending_demand import apply_pending_demand
+
+    apply_pending_demand(calendar_output)
+
+    calendar_output.write_json(output_json_file)
 
     print(f"✅ カレンダーデータを {output_json_file} に生成しました。")
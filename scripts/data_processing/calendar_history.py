@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime
+
+HISTORY_DIR = "data/history"
+CALENDAR_JSON = "data/processed/calendar_data.json"
+
+# 日ごとに履歴として残す項目（記録は [スコア, 影響度, イベント一覧] の順）
+DAY_FIELDS = ["score", "impact", "events"]
+
+
+def day_record(day):
+    """カレンダーの1日分から履歴に残す値を取り出す"""
+    return [
+        round(float(day["demand_score"]), 2),
+        day["impact_level"],
+        sorted(event["subject"] for event in day.get("events", [])),
+    ]
+
+
+class CalendarHistory:
+    """カレンダーの版を追記専用のログに、前の版からの日別差分として保存する
+
+    各行は1つの版で、変化した日の値だけを持つ。読み込み時に日ごとの
+    (版番号, 値) の列を作るため、任意の版の値は二分探索で、2つの版の差分は
+    その間に変化した日だけを調べて求められる。
+    """
+
+    def __init__(self, history_dir=HISTORY_DIR):
+        self.log_path = os.path.join(history_dir, "versions.jsonl")
+        self.versions = []  # 各版のメタデータ
+        self.changed_dates = []  # 各版で変化した日付
+        self.timeline = {}  # 日付 -> ([版番号...], [値...])
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._apply(json.loads(line))
+
+    def _apply(self, entry):
+        version = entry["version"]
+        changes = entry.pop("changes")
+        self.versions.append(entry)
+        self.changed_dates.append(sorted(changes))
+        for date_str, record in changes.items():
+            versions, values = self.timeline.setdefault(date_str, ([], []))
+            versions.append(version)
+            values.append(record)
+
+    @property
+    def latest(self):
+        return len(self.versions)
+
+    def value_at(self, date_str, version):
+        """指定した版での日付の値（その版で存在しなければNone）"""
+        versions, values = self.timeline.get(date_str, ((), ()))
+        position = bisect_right(versions, version)
+        return values[position - 1] if position else None
+
+    def state(self, version=None):
+        """指定した版のカレンダー全体 {日付: 値}"""
+        version = self.latest if version is None else version
+        state = {}
+        for date_str in self.timeline:
+            value = self.value_at(date_str, version)
+            if value is not None:
+                state[date_str] = value
+        return state
+
+    def append(self, calendar_data, source=None):
+        """新しい版を追加する。前の版から変化が無ければ追加せずNoneを返す"""
+        changes = {}
+        for date_str, day in calendar_data.items():
+            record = day_record(day)
+            if self.value_at(date_str, self.latest) != record:
+                changes[date_str] = record
+        # 前の版にあって今回のカレンダーに無い日は削除として記録する
+        for date_str, (_, values) in self.timeline.items():
+            if date_str not in calendar_data and values[-1] is not None:
+                changes[date_str] = None
+        if not changes:
+            return None
+
+        entry = {
+            "version": self.latest + 1,
+            "created_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": source,
+            "n_changed": len(changes),
+            "changes": changes,
+        }
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._apply(entry)
+        return entry["version"]
+
+    def diff(self, from_version, to_version, fields=None):
+        """2つの版の間で値が変わった日付の一覧（fields で比較する項目を絞れる）"""
+        if from_version > to_version:
+            from_version, to_version = to_version, from_version
+        field_indices = [DAY_FIELDS.index(field) for field in (fields or DAY_FIELDS)]
+
+        candidates = set()
+        for version in range(from_version + 1, to_version + 1):
+            candidates.update(self.changed_dates[version - 1])
+
+        differences = []
+        for date_str in sorted(candidates):
+            before = self.value_at(date_str, from_version)
+            after = self.value_at(date_str, to_version)
+            if before is None or after is None:
+                if before != after:
+                    differences.append({"date": date_str, "before": before, "after": after})
+                continue
+            if any(before[i] != after[i] for i in field_indices):
+                differences.append({"date": date_str, "before": before, "after": after})
+        return differences
+
+
+def record_calendar_version(calendar_json_path=CALENDAR_JSON, history_dir=HISTORY_DIR):
+    """生成済みのカレンダーを履歴に追加する"""
+    with open(calendar_json_path, "r", encoding="utf-8") as f:
+        calendar_data = json.load(f)
+    history = CalendarHistory(history_dir)
+    version = history.append(calendar_data, source=calendar_json_path)
+    if version is None:
+        print(f"✅ カレンダーに変更が無いため、履歴は追加しませんでした（最新 v{history.latest}）。")
+    else:
+        print(
+            f"✅ カレンダー履歴 v{version} を追加しました"
+            f"（変更 {history.versions[-1]['n_changed']}日）。"
+        )
+    return version
+
+
+def _format_record(record):
+    if record is None:
+        return "（なし）"
+    score, impact, events = record
+    return f"{score:.2f} {impact} [{', '.join(events)}]"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="カレンダーの版の履歴と差分")
+    parser.add_argument("--dir", default=HISTORY_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    append_parser = subparsers.add_parser("append", help="カレンダーを新しい版として追加する")
+    append_parser.add_argument("calendar_json", nargs="?", default=CALENDAR_JSON)
+
+    subparsers.add_parser("log", help="版の一覧を表示する")
+
+    diff_parser = subparsers.add_parser("diff", help="2つの版の差分を表示する")
+    diff_parser.add_argument("from_version", type=int)
+    diff_parser.add_argument("to_version", type=int, nargs="?", help="省略時は最新版")
+    diff_parser.add_argument("--field", choices=DAY_FIELDS, action="append", help="比較する項目")
+    args = parser.parse_args()
+
+    if args.command == "append":
+        record_calendar_version(args.calendar_json, args.dir)
+    elif args.command == "log":
+        history = CalendarHistory(args.dir)
+        for entry in history.versions:
+            print(f"v{entry['version']}  {entry['created_at']}  変更 {entry['n_changed']}日")
+    else:
+        history = CalendarHistory(args.dir)
+        to_version = args.to_version or history.latest
+        differences = history.diff(args.from_version, to_version, args.field)
+        print(f"v{args.from_version} → v{to_version}: {len(differences)}日が変化しました。")
+        for difference in differences:
+            print(
+                f"{difference['date']}: {_format_record(difference['before'])}"
+                f" → {_format_record(difference['after'])}"
+            )
@@ -0,0 +1,127 @@
+import json
+from collections.abc import Mapping
+from datetime import date, timedelta
+
+import numpy as np
+
+
+class StringPool:
+    """同じ文字列を1つだけ保持し、整数IDで参照する（文字列以外は -1 = None）"""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def intern(self, value):
+        if not isinstance(value, str):
+            return -1
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+    def intern_many(self, values):
+        return np.fromiter((self.intern(value) for value in values), dtype=np.int32, count=len(values))
+
+    def get(self, string_id):
+        return self.values[string_id] if string_id >= 0 else None
+
+
+class CompactCalendar(Mapping):
+    """日別カレンダーを型付き配列で保持する
+
+    日ごとの値は長さ n_days の配列、文字列は StringPool のID、
+    日→イベントの対応は CSR 形式（day_ptr[d]:day_ptr[d+1] の範囲の day_events）で持つ。
+    calendar[date_str] で従来と同じ形の辞書を返すが、辞書はアクセスされたときにだけ作る。
+    """
+
+    def __init__(self, horizon_start, n_days, strings=None):
+        self.horizon_start = horizon_start
+        self.n_days = n_days
+        self.strings = strings or StringPool()
+        self.days = {}  # 列名 -> 長さ n_days の配列
+        self.monthly_trends = []  # 月ごとのトレンド値（days["trend_month"] が添字）
+        self.events = {}  # 列名 -> 長さ n_events の配列
+        self.day_ptr = np.zeros(n_days + 1, dtype=np.int64)
+        self.day_events = np.zeros(0, dtype=np.int32)
+        self.extra_columns = {}  # 後から追加する日別の列: 列名 -> (配列, 小数点以下の桁数)
+
+    def set_day_events(self, day_offsets, event_ids):
+        """(日, イベント番号) の組（日の昇順）から CSR の隣接リストを作る"""
+        self.day_ptr = np.searchsorted(day_offsets, np.arange(self.n_days + 1)).astype(np.int64)
+        self.day_events = np.asarray(event_ids, dtype=np.int32)
+
+    def add_column(self, name, values, digits=None):
+        """日別の列を追加する（出力時に round(値, digits) する）"""
+        self.extra_columns[name] = (np.asarray(values, dtype=np.float64), digits)
+
+    def date_at(self, offset):
+        return self.horizon_start + timedelta(days=offset)
+
+    def offset_of(self, date_str):
+        return (date.fromisoformat(date_str) - self.horizon_start).days
+
+    def events_on(self, offset):
+        return self.day_events[self.day_ptr[offset] : self.day_ptr[offset + 1]]
+
+    def _event(self, event_id):
+        events, strings = self.events, self.strings
+        return {
+            "subject": strings.get(events["subject"][event_id]),
+            "event_type": strings.get(events["event_type"][event_id]),
+            "estimated_attendees": int(events["estimated_attendees"][event_id]),
+            "location": strings.get(events["location"][event_id]),
+            "impact_level": strings.get(events["impact_level"][event_id]),
+        }
+
+    def day(self, offset):
+        """1日分の辞書を組み立てる（キーの順序は従来の calendar_data.json と同じ）"""
+        days, strings = self.days, self.strings
+        daily_data = {
+            "date": self.date_at(offset).strftime("%Y-%m-%d"),
+            "is_holiday": bool(days["is_holiday"][offset]),
+            "holiday_name": strings.get(days["holiday_name"][offset]),
+            "events": [self._event(event_id) for event_id in self.events_on(offset)],
+            "demand_score": float(days["demand_score"][offset]),
+            "monthly_trend_score": self.monthly_trends[days["trend_month"][offset]],
+            "offday_run_length": int(days["offday_run_length"][offset]),
+            "offday_run_position": int(days["offday_run_position"][offset]),
+            "is_bridge_day": bool(days["is_bridge_day"][offset]),
+            "impact_level": strings.get(days["impact_level"][offset]),
+        }
+        for name, (values, digits) in self.extra_columns.items():
+            daily_data[name] = round(float(values[offset]), digits) if digits is not None else float(values[offset])
+        return daily_data
+
+    def __getitem__(self, date_str):
+        # Mapping として使えるよう、日付でないキーも KeyError にする（`"x" in calendar` が False になる）
+        try:
+            offset = self.offset_of(date_str)
+        except (ValueError, TypeError):
+            raise KeyError(date_str) from None
+        if not 0 <= offset < self.n_days:
+            raise KeyError(date_str)
+        return self.day(offset)
+
+    def __iter__(self):
+        for offset in range(self.n_days):
+            yield self.date_at(offset).strftime("%Y-%m-%d")
+
+    def __len__(self):
+        return self.n_days
+
+    def write_json(self, path, indent=4):
+        """1日ずつ辞書を作って書き出す（json.dump(dict(self), indent=indent) と同じ出力）"""
+        encoder = json.JSONEncoder(ensure_ascii=False, indent=indent)
+        pad = " " * indent
+        with open(path, "w", encoding="utf-8") as f:
+            if not self.n_days:
+                f.write("{}")
+                return
+            f.write("{")
+            for offset in range(self.n_days):
+                daily_data = self.day(offset)
+                body = encoder.encode(daily_data).replace("\n", "\n" + pad)
+                f.write(("," if offset else "") + f"\n{pad}{encoder.encode(daily_data['date'])}: {body}")
+            f.write("\n}")
@@ -0,0 +1,128 @@
+import calendar
+import json
+import re
+from datetime import date
+
+INDEX_HTML_PATH = "index.html"
+CALENDAR_DETAILS_PATH = "data/processed/calendar_details.json"
+
+# index.html 内でプリレンダリング結果を差し込む位置
+RENDER_START_MARKER = "<!-- calendar:start -->"
+RENDER_END_MARKER = "<!-- calendar:end -->"
+
+IMPACT_CLASSES = {"High": "high-demand", "Medium": "medium-demand", "Low": "low-demand"}
+WEEKDAY_LABELS = ["日", "月", "火", "水", "木", "金", "土"]
+
+
+def render_calendar_html(calendar_data):
+    """年→月→日のグリッドを影響度クラス付きの静的HTMLとして組み立てる"""
+    years = sorted({int(key[:4]) for key in calendar_data})
+    weekdays_html = (
+        '<div class="weekdays">'
+        + "".join(f"<span>{label}</span>" for label in WEEKDAY_LABELS)
+        + "</div>"
+    )
+
+    parts = []
+    for year in years:
+        parts.append(f'<div class="year-calendar"><h2 class="year-title">{year}年</h2>')
+        parts.append('<div class="month-grid">')
+        for month in range(1, 13):
+            parts.append(
+                f'<div class="month-calendar"><h3 class="month-title">{month}月</h3>'
+            )
+            parts.append(weekdays_html)
+            parts.append('<div class="day-grid">')
+            # 日曜始まりのグリッドにするため、月初の曜日分だけ空セルを置く
+            leading_blanks = (date(year, month, 1).weekday() + 1) % 7
+            parts.append('<div class="day empty"></div>' * leading_blanks)
+            for day in range(1, calendar.monthrange(year, month)[1] + 1):
+                date_str = f"{year}-{month:02d}-{day:02d}"
+                day_data = calendar_data.get(date_str)
+                if day_data is None:
+                    parts.append(f'<div class="day">{day}</div>')
+                    continue
+                impact_class = IMPACT_CLASSES.get(day_data["impact_level"], "low-demand")
+                parts.append(
+                    f'<div class="day {impact_class}" data-date="{date_str}">{day}</div>'
+                )
+            parts.append("</div></div>\n")
+        parts.append("</div></div>\n")
+    return "".join(parts)
+
+
+def build_detail_table(calendar_data):
+    """ツールチップ用の日別詳細テーブル（イベントは重複を除いて番号で参照する）"""
+    event_ids = {}
+    events = []
+    dates = sorted(calendar_data)
+    days = []
+    for date_str in dates:
+        day_data = calendar_data[date_str]
+        ids = []
+        for event in day_data["events"]:
+            key = (event["subject"], event["event_type"], event["estimated_attendees"])
+            if key not in event_ids:
+                event_ids[key] = len(events)
+                events.append(list(key))
+            ids.append(event_ids[key])
+        days.append(
+            [
+                round(day_data["demand_score"], 2),
+                day_data["impact_level"],
+                round(day_data["monthly_trend_score"] or 0, 2),
+                day_data["holiday_name"] if day_data["is_holiday"] else None,
+                ids,
+                [
+                    round(day_data.get(key, 0), 2)
+                    for key in ("pending_expected_score", "pending_p10", "pending_p90")
+                ],
+            ]
+        )
+    return {
+        "start": dates[0] if dates else None,
+        "fields": [
+            "demand_score",
+            "impact_level",
+            "monthly_trend_score",
+            "holiday_name",
+            "events",
+            "pending_band",
+        ],
+        "events": events,
+        "days": days,
+    }
+
+
+def inject_into_index(index_path, rendered_html):
+    """index.html のマーカー間をプリレンダリング結果で置き換える"""
+    with open(index_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    pattern = re.compile(
+        re.escape(RENDER_START_MARKER) + ".*?" + re.escape(RENDER_END_MARKER), re.DOTALL
+    )
+    if not pattern.search(content):
+        raise ValueError(f"{index_path} に {RENDER_START_MARKER} が見つかりません。")
+    replacement = f"{RENDER_START_MARKER}\n{rendered_html}{RENDER_END_MARKER}"
+    content = pattern.sub(lambda _: replacement, content, count=1)
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def run_calendar_renderer(
+    calendar_json_path, index_path=INDEX_HTML_PATH, details_path=CALENDAR_DETAILS_PATH
+):
+    """calendar_data.json から静的カレンダーと詳細テーブルを書き出す"""
+    with open(calendar_json_path, "r", encoding="utf-8") as f:
+        calendar_data = json.load(f)
+
+    inject_into_index(index_path, render_calendar_html(calendar_data))
+    with open(details_path, "w", encoding="utf-8") as f:
+        json.dump(
+            build_detail_table(calendar_data), f, ensure_ascii=False, separators=(",", ":")
+        )
+    print(f"✅ 静的カレンダーを {index_path} に、詳細テーブルを {details_path} に出力しました。")
+
+
+if __name__ == "__main__":
+    run_calendar_renderer("data/processed/calendar_data.json")
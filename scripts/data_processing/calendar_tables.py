@@ -0,0 +1,361 @@
+import argparse
+import json
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow が無ければ Arrow IPC ファイルは書き出さない（共有メモリは NumPy だけで扱う）
+    pa = None
+
+ARROW_DIR = "data/processed/arrow"
+DAYS_ARROW_PATH = os.path.join(ARROW_DIR, "calendar_days.arrow")
+EVENTS_ARROW_PATH = os.path.join(ARROW_DIR, "calendar_events.arrow")
+SHARED_CALENDAR_NAME = "kushiro_calendar"
+
+# 文字列は StringPool のID（-1 = None）で持ち、Arrow では辞書型の列にする
+STRING_COLUMNS = {
+    "days": ["holiday_name", "impact_level"],
+    "events": ["subject", "event_type", "location", "impact_level"],
+}
+DAY_COLUMNS = [
+    "demand_score",
+    "impact_level",
+    "is_holiday",
+    "holiday_name",
+    "offday_run_length",
+    "offday_run_position",
+    "is_bridge_day",
+]
+
+# 共有メモリの配置: ヘッダ（識別子・版・メタデータ長）→ 配列の目録（JSON）→ 64バイト境界に揃えた配列
+SHM_MAGIC = b"KCALSHM1"
+SHM_HEADER = struct.Struct("<8sQQ")
+VERSION_COUNTER = struct.Struct("<Q")
+ALIGNMENT = 64
+ATTACH_RETRIES = 5
+
+
+def has_pyarrow():
+    return pa is not None
+
+
+def arrow_table_paths(directory=ARROW_DIR):
+    return [os.path.join(directory, os.path.basename(path)) for path in (DAYS_ARROW_PATH, EVENTS_ARROW_PATH)]
+
+
+def string_buffers(values):
+    """文字列の一覧を Arrow の large_string と同じ (オフセット, UTF-8バイト列) の2つの配列にする"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def calendar_arrays(calendar):
+    """CompactCalendar から日テーブル・イベントテーブルなどの配列を取り出す（キーは "表/列"）"""
+    arrays = {"days/date": np.datetime64(calendar.horizon_start, "D") + np.arange(calendar.n_days)}
+    for name in DAY_COLUMNS:
+        arrays[f"days/{name}"] = np.asarray(calendar.days[name])
+    arrays["days/monthly_trend_score"] = np.asarray(calendar.monthly_trends, dtype=np.float64)[
+        calendar.days["trend_month"]
+    ]
+    for name, (values, _) in calendar.extra_columns.items():
+        arrays[f"days/{name}"] = values
+    for name, values in calendar.events.items():
+        arrays[f"events/{name}"] = np.asarray(values)
+    # 日→イベントの対応（CSR）は Arrow では日テーブルの list 列になる
+    arrays["day_events/offsets"] = np.asarray(calendar.day_ptr, dtype=np.int64)
+    arrays["day_events/values"] = np.asarray(calendar.day_events, dtype=np.int32)
+    arrays["strings/offsets"], arrays["strings/data"] = string_buffers(calendar.strings.values)
+    return arrays
+
+
+def _table_columns(arrays, table):
+    prefix = f"{table}/"
+    return {key[len(prefix) :]: values for key, values in arrays.items() if key.startswith(prefix)}
+
+
+def to_arrow_tables(arrays):
+    """配列から (日テーブル, イベントテーブル) の pyarrow.Table を作る（数値列はコピーしない）"""
+    n_strings = len(arrays["strings/offsets"]) - 1
+    dictionary = pa.LargeStringArray.from_buffers(
+        n_strings, pa.py_buffer(arrays["strings/offsets"]), pa.py_buffer(arrays["strings/data"])
+    )
+
+    def column(table, name, values):
+        if name in STRING_COLUMNS[table]:
+            return pa.DictionaryArray.from_arrays(pa.array(values, mask=values < 0), dictionary)
+        return pa.array(values)
+
+    days = {name: column("days", name, values) for name, values in _table_columns(arrays, "days").items()}
+    days["events"] = pa.LargeListArray.from_arrays(
+        pa.array(arrays["day_events/offsets"]), pa.array(arrays["day_events/values"])
+    )
+    events = {name: column("events", name, values) for name, values in _table_columns(arrays, "events").items()}
+    return pa.table(days), pa.table(events)
+
+
+def _write_ipc(table, path):
+    # 書き出し中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def write_arrow_tables(arrays, directory=ARROW_DIR):
+    os.makedirs(directory, exist_ok=True)
+    days_path, events_path = arrow_table_paths(directory)
+    days, events = to_arrow_tables(arrays)
+    _write_ipc(days, days_path)
+    _write_ipc(events, events_path)
+    return days_path, events_path
+
+
+def read_arrow_tables(directory=ARROW_DIR):
+    """Arrow IPC ファイルをメモリマップで読み込む（解析・コピーなし）。戻り値は (日テーブル, イベントテーブル)"""
+    return tuple(pa.ipc.open_file(pa.memory_map(path, "r")).read_all() for path in arrow_table_paths(directory))
+
+
+def _untrack(segment):
+    # Python 3.11 の resource_tracker はプロセス終了時に共有メモリを削除してしまうため、登録を外す
+    resource_tracker.unregister(segment._name, "shared_memory")
+
+
+def _unlink(segment):
+    # unlink() は resource_tracker の登録も外そうとするため、登録し直してから削除する
+    resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _segment_name(name, version):
+    return f"{name}_{version}"
+
+
+class SharedCalendarPublisher:
+    """配列を版ごとの共有メモリに書き込み、書き終えてから版カウンタを進める
+
+    版カウンタは名前 name の小さな共有メモリに置き、各版の配列は name_<版> に置く。
+    読み手が切り替え中の版を使い終えられるよう、1つ前の版までは残して古い版から削除する。
+    """
+
+    def __init__(self, name=SHARED_CALENDAR_NAME):
+        self.name = name
+        try:
+            self._counter = shared_memory.SharedMemory(name, create=True, size=VERSION_COUNTER.size)
+            VERSION_COUNTER.pack_into(self._counter.buf, 0, 0)
+        except FileExistsError:
+            self._counter = shared_memory.SharedMemory(name)
+        _untrack(self._counter)
+        self._segments = {}
+
+    @property
+    def version(self):
+        return VERSION_COUNTER.unpack_from(self._counter.buf, 0)[0]
+
+    def publish(self, arrays):
+        version = self.version + 1
+        directory = {}
+        offset = 0
+        for key, values in arrays.items():
+            directory[key] = {"dtype": values.dtype.str, "length": len(values), "offset": offset}
+            offset = _align(offset + values.nbytes)
+        meta = json.dumps({"version": version, "arrays": directory}).encode("utf-8")
+        data_start = _align(SHM_HEADER.size + len(meta))
+
+        segment = shared_memory.SharedMemory(
+            _segment_name(self.name, version), create=True, size=max(data_start + offset, 1)
+        )
+        _untrack(segment)
+        SHM_HEADER.pack_into(segment.buf, 0, SHM_MAGIC, version, len(meta))
+        segment.buf[SHM_HEADER.size : SHM_HEADER.size + len(meta)] = meta
+        for key, values in arrays.items():
+            target = np.frombuffer(
+                segment.buf, dtype=values.dtype, count=len(values), offset=data_start + directory[key]["offset"]
+            )
+            target[...] = values
+            del target
+        self._segments[version] = segment
+
+        # 書き終えてから版を進める（読み手は版カウンタを見て新しい版に切り替える）
+        VERSION_COUNTER.pack_into(self._counter.buf, 0, version)
+        self._unlink_versions_before(version - 1)
+        return version
+
+    def _unlink_versions_before(self, keep_from):
+        for version in [v for v in self._segments if v < keep_from]:
+            segment = self._segments.pop(version)
+            segment.close()
+            _unlink(segment)
+        # 前回のプロセスが公開した版も削除する
+        stale = keep_from - 1
+        if stale > 0 and stale not in self._segments:
+            try:
+                segment = shared_memory.SharedMemory(_segment_name(self.name, stale))
+            except FileNotFoundError:
+                return
+            segment.close()
+            _unlink(segment)
+
+    def close(self, unlink=False):
+        """共有メモリを閉じる（unlink=True なら公開している版と版カウンタも削除する）"""
+        if unlink:
+            # 別のプロセスが公開した版（最新とその1つ前）も削除する
+            for version in (self.version - 1, self.version):
+                if version > 0 and version not in self._segments:
+                    try:
+                        self._segments[version] = shared_memory.SharedMemory(_segment_name(self.name, version))
+                    except FileNotFoundError:
+                        pass
+        for segment in self._segments.values():
+            segment.close()
+            if unlink:
+                _unlink(segment)
+        self._segments = {}
+        self._counter.close()
+        if unlink:
+            _unlink(self._counter)
+
+
+class SharedCalendarReader:
+    """共有メモリに公開されたカレンダーの配列を、コピーせず読み取り専用の NumPy 配列として参照する
+
+    refresh() で新しい版が公開されていれば切り替える。切り替え前に取得した配列は
+    そのまま使い続けられ、古い版は参照がなくなってから閉じる。
+    """
+
+    def __init__(self, name=SHARED_CALENDAR_NAME):
+        self.name = name
+        self._counter = shared_memory.SharedMemory(name)
+        _untrack(self._counter)
+        self.version = 0
+        self.arrays = {}
+        self._segment = None
+        self._retired = []
+        if not self.refresh():
+            raise FileNotFoundError(f"共有メモリ {name} にはまだ版が公開されていません")
+
+    @property
+    def published_version(self):
+        return VERSION_COUNTER.unpack_from(self._counter.buf, 0)[0]
+
+    def refresh(self):
+        """新しい版が公開されていれば、その版の配列に切り替える（切り替えたら True）"""
+        for _ in range(ATTACH_RETRIES):
+            version = self.published_version
+            if version == 0 or version == self.version:
+                return False
+            try:
+                segment = shared_memory.SharedMemory(_segment_name(self.name, version))
+            except FileNotFoundError:
+                continue  # 読み込む前に次の版が公開され、この版が削除された
+            _untrack(segment)
+            magic, segment_version, meta_length = SHM_HEADER.unpack_from(segment.buf, 0)
+            if magic != SHM_MAGIC or segment_version != version:
+                segment.close()
+                continue
+            meta = json.loads(bytes(segment.buf[SHM_HEADER.size : SHM_HEADER.size + meta_length]))
+            data_start = _align(SHM_HEADER.size + meta_length)
+            arrays = {}
+            for key, spec in meta["arrays"].items():
+                # np.frombuffer の配列は共有メモリへの参照を保持するため、使用中の版は閉じられない
+                values = np.frombuffer(
+                    segment.buf, dtype=np.dtype(spec["dtype"]), count=spec["length"],
+                    offset=data_start + spec["offset"],
+                )
+                values.flags.writeable = False
+                arrays[key] = values
+            self._swap(segment, version, arrays)
+            return True
+        return False
+
+    def _swap(self, segment, version, arrays):
+        if self._segment is not None:
+            self._retired.append(self._segment)
+        self._segment, self.version, self.arrays = segment, version, arrays
+        self._close_retired()
+
+    def _close_retired(self):
+        still_used = []
+        for segment in self._retired:
+            try:
+                segment.close()
+            except BufferError:  # 古い版の配列がまだ参照されている
+                still_used.append(segment)
+        self._retired = still_used
+
+    @property
+    def days(self):
+        return _table_columns(self.arrays, "days")
+
+    @property
+    def events(self):
+        return _table_columns(self.arrays, "events")
+
+    def events_on(self, day_offset):
+        offsets = self.arrays["day_events/offsets"]
+        return self.arrays["day_events/values"][offsets[day_offset] : offsets[day_offset + 1]]
+
+    def string(self, string_id):
+        if string_id < 0:
+            return None
+        offsets = self.arrays["strings/offsets"]
+        return bytes(self.arrays["strings/data"][offsets[string_id] : offsets[string_id + 1]]).decode("utf-8")
+
+    def to_arrow(self):
+        """現在の版を (日テーブル, イベントテーブル) の pyarrow.Table として返す"""
+        return to_arrow_tables(self.arrays)
+
+    def close(self):
+        self.arrays = {}
+        if self._segment is not None:
+            self._retired.append(self._segment)
+            self._segment = None
+        self._close_retired()
+        self._counter.close()
+
+
+_publishers = {}
+
+
+def export_calendar_tables(calendar, directory=ARROW_DIR, shm_name=None):
+    """カレンダーを Arrow IPC ファイル（pyarrow がある場合）と共有メモリ（shm_name を指定した場合）に書き出す"""
+    arrays = calendar_arrays(calendar)
+    if pa is not None:
+        days_path, events_path = write_arrow_tables(arrays, directory)
+        print(f"✅ 日テーブルを {days_path} に、イベントテーブルを {events_path} に出力しました。")
+    else:
+        print("⚠️ pyarrow がインストールされていないため、Arrow IPC ファイルは出力しません。")
+    if shm_name:
+        # 同じプロセスで再生成したとき（--watch）は版カウンタの共有メモリを使い回す
+        if shm_name not in _publishers:
+            _publishers[shm_name] = SharedCalendarPublisher(shm_name)
+        publisher = _publishers[shm_name]
+        version = publisher.publish(arrays)
+        print(f"✅ カレンダーを共有メモリ {shm_name} に版 {version} として公開しました。")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="共有メモリに公開されたカレンダーの版と件数を表示する")
+    parser.add_argument("--name", default=SHARED_CALENDAR_NAME)
+    parser.add_argument("--unlink", action="store_true", help="公開している版と版カウンタを削除する")
+    args = parser.parse_args()
+
+    if args.unlink:
+        SharedCalendarPublisher(args.name).close(unlink=True)
+        print(f"✅ 共有メモリ {args.name} を削除しました。")
+    else:
+        reader = SharedCalendarReader(args.name)
+        print(f"版 {reader.version}: {len(reader.arrays['days/date'])}日・"
+              f"{len(reader.arrays['events/subject'])}件のイベント")
+        reader.close()
@@ -0,0 +1,130 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import pandas as pd
+
+DEFAULT_REGISTRY_PATH = 'data/master/capacity_registry.csv'
+
+# 括弧書き（「（北海道）」「(釧路市民文化会館)」など）と記号類は照合前に取り除く
+_BRACKETS_PATTERN = re.compile(r'[（(][^（()）]*[)）]')
+_SYMBOLS_PATTERN = re.compile(r'[\s・･.,、。\-ー－—&＆/／「」『』]')
+
+
+def normalize_name(name):
+    """会場名・船名を照合用に正規化する（全角半角の統一、括弧書き・空白・記号の除去）"""
+    if not isinstance(name, str):
+        return ''
+    text = unicodedata.normalize('NFKC', name).lower()
+    text = _BRACKETS_PATTERN.sub('', text)
+    text = text.replace('入港', '')
+    return _SYMBOLS_PATTERN.sub('', text)
+
+
+def _ngrams(text, n=2):
+    if len(text) < n:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class CapacityRegistry:
+    """会場・客船の収容人数を正規化名のハッシュ索引で引く。未登録名はn-gram索引で近似照合する"""
+
+    def __init__(self, entries, min_similarity=0.6):
+        # entries: (kind, name, aliases, capacity) の列
+        self.min_similarity = min_similarity
+        self.names = []
+        self.capacities = []
+        self._exact = {}  # (kind, 正規化名) -> エントリ番号
+        self._gram_index = defaultdict(list)  # (kind, n-gram) -> [(エントリ番号, 正規化名, 出現数)]
+        self._gram_totals = {}  # (kind, 正規化名) -> n-gram総数
+        self._cache = {}
+
+        for kind, name, aliases, capacity in entries:
+            entry_id = len(self.names)
+            self.names.append(name)
+            self.capacities.append(int(capacity))
+            for key in [name] + list(aliases):
+                normalized = normalize_name(key)
+                if not normalized or (kind, normalized) in self._exact:
+                    continue
+                self._exact[(kind, normalized)] = entry_id
+                grams = _ngrams(normalized)
+                self._gram_totals[(kind, normalized)] = sum(grams.values())
+                for gram, count in grams.items():
+                    self._gram_index[(kind, gram)].append((entry_id, normalized, count))
+
+    @classmethod
+    def from_csv(cls, csv_path=DEFAULT_REGISTRY_PATH, **kwargs):
+        """Kind,Name,Aliases,Capacity 形式のCSVから読み込む（Aliasesは | 区切り）"""
+        df = pd.read_csv(csv_path, dtype={'Aliases': str}).fillna({'Aliases': ''})
+        entries = [
+            (row.Kind, row.Name, [a for a in row.Aliases.split('|') if a], row.Capacity)
+            for row in df.itertuples(index=False)
+        ]
+        return cls(entries, **kwargs)
+
+    def _fuzzy_match(self, kind, normalized):
+        """n-gram索引から候補を集め、Dice係数が最も高いエントリを返す"""
+        query_grams = _ngrams(normalized)
+        query_total = sum(query_grams.values())
+        if not query_total:
+            return None
+
+        overlaps = Counter()
+        for gram, count in query_grams.items():
+            for entry_id, key, entry_count in self._gram_index.get((kind, gram), ()):
+                overlaps[(entry_id, key)] += min(count, entry_count)
+
+        best_id, best_score = None, 0.0
+        for (entry_id, key), overlap in overlaps.items():
+            score = 2.0 * overlap / (query_total + self._gram_totals[(kind, key)])
+            # 登録名を丸ごと含む場合（「○○ 他」など）は一致とみなし、長い登録名を優先する
+            if key in normalized:
+                score = max(score, 0.99 + 0.01 * len(key) / len(normalized))
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        if best_score >= self.min_similarity:
+            return best_id
+        return None
+
+    def match(self, kind, name):
+        """名称に対応するエントリ番号を返す（見つからなければNone）。結果はメモ化する"""
+        cache_key = (kind, name)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+        normalized = normalize_name(name)
+        entry_id = self._exact.get((kind, normalized))
+        if entry_id is None and normalized:
+            entry_id = self._fuzzy_match(kind, normalized)
+        self._cache[cache_key] = entry_id
+        return entry_id
+
+    def capacity(self, kind, name, default=0):
+        entry_id = self.match(kind, name)
+        return self.capacities[entry_id] if entry_id is not None else default
+
+    def venue_capacity(self, venue_name, default=0):
+        """会場名から収容人数を返す"""
+        return self.capacity('venue', venue_name, default)
+
+    def ship_capacity(self, ship_name, default=0):
+        """船名（日本語名・英語名のどちらか、または改行区切りの両方）から乗客定員を返す"""
+        if not isinstance(ship_name, str):
+            return default
+        for part in ship_name.splitlines():
+            entry_id = self.match('ship', part)
+            if entry_id is not None:
+                return self.capacities[entry_id]
+        return default
+
+
+@lru_cache(maxsize=None)
+def get_default_registry(csv_path=DEFAULT_REGISTRY_PATH):
+    """既定の登録簿を一度だけ読み込んで返す（ファイルがなければ空の登録簿）"""
+    try:
+        return CapacityRegistry.from_csv(csv_path)
+    except FileNotFoundError:
+        print(f"Warning: {csv_path} not found. Capacity lookups will fall back to heuristics.")
+        return CapacityRegistry([])
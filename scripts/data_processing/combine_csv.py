@@ -1,6 +1,45 @@
 import pandas as pd
 import re
 from datetime import datetime
+from capacity_registry import get_default_registry
+from event_loader import (
+    CONVERTED_EVENT_SCHEMA,
+    carry_last_updated,
+    default_quarantine_path,
+    load_combined_events,
+    load_cruise_events,
+    load_csv,
+    load_last_updated,
+)
+
+def get_impact_level(attendees):
+    """集客数から影響度レベルを判定する"""
+    if attendees >= 1000:
+        return "High"
+    elif 300 <= attendees < 1000:
+        return "Medium"
+    else:
+        return "Low"
+
+def fill_missing_attendees(df, registry=None):
+    """推定参加者数が0のコンサート・クルーズを会場・客船の登録簿から補完する"""
+    if df.empty:
+        return df
+    registry = registry or get_default_registry()
+    missing = df['EstimatedAttendees'].fillna(0) <= 0
+    concert_rows = missing & (df['EventType'] == 'コンサート')
+    cruise_rows = missing & (df['EventType'] == 'クルーズ')
+
+    # 同じ会場・船名は一度だけ照合する
+    df.loc[concert_rows, 'EstimatedAttendees'] = df.loc[concert_rows, 'Location'].map(
+        {name: registry.venue_capacity(name) for name in df.loc[concert_rows, 'Location'].unique()}
+    )
+    df.loc[cruise_rows, 'EstimatedAttendees'] = df.loc[cruise_rows, 'Subject'].map(
+        {name: registry.ship_capacity(name) for name in df.loc[cruise_rows, 'Subject'].unique()}
+    )
+    filled = concert_rows | cruise_rows
+    df.loc[filled, 'ImpactLevel'] = df.loc[filled, 'EstimatedAttendees'].map(get_impact_level)
+    return df
 
 def process_event_data(df, event_type, data_source):
     processed_rows = []
@@ -28,10 +67,7 @@ def process_event_data(df, event_type, data_source):
         elif 300 <= estimated_attendees < 1000: # HighAttendanceFlagがNoでも300人以上ならMedium
             impact_level = "Medium"
 
-        # 阿寒地域のイベントを除外
-        if isinstance(location, str) and "阿寒" in location:
-            continue
-
+        # 阿寒・弟子屈など釧路市以外のイベントも残し、地域の振り分けはカレンダー生成時に行う
         processed_rows.append({
             'EventType': event_type,
             'Subject': subject,
@@ -41,10 +77,18 @@ def process_event_data(df, event_type, data_source):
             'Location': location,
             'ImpactLevel': impact_level,
             'DataSource': data_source,
-            'LastUpdated': datetime.now().strftime("%Y-%m-%d")
+            'LastUpdated': datetime.now().strftime("%Y-%m-%d"),
+            # 全文検索の索引対象にするため、元の説明文も残す
+            'Description': description
         })
     return pd.DataFrame(processed_rows)
 
+def format_dates(df):
+    """型付きで読み込んだ日付列を yyyy-mm-dd の文字列に戻す（変換済みCSVの日付列と揃える）"""
+    for column in ('StartDate', 'EndDate', 'LastUpdated'):
+        df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return df
+
 def run_combine_csv():
     # ファイルパス
     cruise_file = 'data/processed/r7-cruise_converted.csv'
@@ -53,27 +97,39 @@ def run_combine_csv():
     concert_file = 'data/processed/r7-concert_converted.csv'
     output_file = 'data/processed/combined_events.csv'
 
-    # クルーズデータを読み込み
-    df_cruise = pd.read_csv(cruise_file)
+    # 前回の結合結果の LastUpdated（内容の変わらない行は引き継ぎ、実行日で上書きしない）
+    last_updated = load_last_updated(output_file)
+
+    # クルーズデータを読み込み（寄港中止の行は除く）
+    df_cruise = load_cruise_events(cruise_file, default_quarantine_path(cruise_file))
 
     # 大会データを読み込み、処理
-    df_con_raw = pd.read_csv(con_file)
-    df_con = process_event_data(df_con_raw, '大会', 'kushiro-lakeakan.com')
+    df_con_raw, _ = load_csv(con_file, CONVERTED_EVENT_SCHEMA, default_quarantine_path(con_file))
+    df_con = carry_last_updated(process_event_data(df_con_raw, '大会', 'kushiro-lakeakan.com'), last_updated)
 
     # イベントデータを読み込み、処理
-    df_ev_raw = pd.read_csv(ev_file)
-    df_ev = process_event_data(df_ev_raw, 'イベント', 'kushiro-lakeakan.com')
+    df_ev_raw, _ = load_csv(ev_file, CONVERTED_EVENT_SCHEMA, default_quarantine_path(ev_file))
+    df_ev = carry_last_updated(process_event_data(df_ev_raw, 'イベント', 'kushiro-lakeakan.com'), last_updated)
 
     # コンサートデータを読み込み (process_event_dataは不要、既に整形済みのため)
-    df_concert = pd.read_csv(concert_file)
+    df_concert = load_combined_events(concert_file, default_quarantine_path(concert_file))
+
+    # 収集時に推定できなかった参加者数を登録簿から補完
+    df_cruise = fill_missing_attendees(df_cruise)
+    df_concert = fill_missing_attendees(df_concert)
 
     # 全てのDataFrameを結合
-    combined_df = pd.concat([df_cruise, df_con, df_ev, df_concert], ignore_index=True)
+    combined_df = pd.concat(
+        [format_dates(df_cruise), df_con, df_ev, format_dates(df_concert)], ignore_index=True
+    )
 
     # CSVとして出力
     combined_df.to_csv(output_file, index=False, encoding='utf-8-sig')
 
     print(f"✅ 全てのCSVファイルを結合し、{output_file} を作成しました。")
 
+    # カレンダー生成で使えない行（日付が空・不正など）を理由付きで書き出す
+    load_combined_events(output_file, default_quarantine_path(output_file))
+
 if __name__ == "__main__":
     run_combine_csv()
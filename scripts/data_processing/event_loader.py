@@ -0,0 +1,198 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow が無ければ pandas のCエンジンで読み込む
+    pa = None
+
+EVENT_TYPES = ["大会", "イベント", "クルーズ", "コンサート"]
+IMPACT_LEVELS = ["High", "Medium", "Low"]
+DATE_FORMAT = "%Y-%m-%d"
+# クルーズの寄港状況（中止になった寄港も行を残し、カレンダーには含めない）
+CRUISE_STATUS_SCHEDULED = "予定"
+CRUISE_STATUS_CANCELLED = "寄港中止"
+
+# 列ごとの型（string / category / date / int）と必須かどうか
+# fill_from を指定した列は、空欄をその列の値で補ってから検査する
+COMBINED_EVENT_SCHEMA = {
+    "EventType": {"kind": "category", "categories": EVENT_TYPES, "required": True},
+    "Subject": {"kind": "string", "required": True},
+    "StartDate": {"kind": "date", "required": True},
+    # 1日だけのイベントは終了日が空欄のため、開始日で補う
+    "EndDate": {"kind": "date", "required": True, "fill_from": "StartDate"},
+    "EstimatedAttendees": {"kind": "int", "default": 0},
+    "Location": {"kind": "string"},
+    "ImpactLevel": {"kind": "category", "categories": IMPACT_LEVELS},
+    "DataSource": {"kind": "string"},
+    "LastUpdated": {"kind": "date"},
+    "Description": {"kind": "string"},
+}
+
+# 同じイベントかどうかを判定する列（LastUpdated の引き継ぎやバックテストの版の照合に使う）
+EVENT_KEY_COLUMNS = ["EventType", "Subject", "StartDate", "EndDate", "EstimatedAttendees", "Location"]
+
+# cruise_scraper.py が出力するクルーズCSV（Status列が無い古いCSVは全て「予定」として扱う）
+CRUISE_EVENT_SCHEMA = {
+    **COMBINED_EVENT_SCHEMA,
+    "Status": {"kind": "category", "categories": [CRUISE_STATUS_SCHEDULED, CRUISE_STATUS_CANCELLED]},
+}
+
+# event2csv.py が出力する変換済みCSV（日付は曖昧表現を含むため文字列のまま扱う）
+CONVERTED_EVENT_SCHEMA = {
+    "Subject": {"kind": "string", "required": True},
+    "Start Date": {"kind": "string"},
+    "End Date": {"kind": "string"},
+    "Description": {"kind": "string"},
+    "Location": {"kind": "string"},
+    "HighAttendanceFlag": {"kind": "string"},
+    "EstimatedAttendees": {"kind": "string"},
+}
+
+
+def has_pyarrow():
+    return pa is not None
+
+
+def default_quarantine_path(csv_path):
+    base, ext = os.path.splitext(csv_path)
+    return f"{base}_quarantine{ext}"
+
+
+def _read_raw(csv_path, columns):
+    """全列を文字列として読み込む（空欄は空文字列）。pyarrow があればそのCSVリーダーを使う"""
+    if pa is not None:
+        try:
+            table = pa_csv.read_csv(
+                csv_path,
+                # 件名・開催場所には改行を含むセルがある
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={column: pa.string() for column in columns},
+                    strings_can_be_null=False,
+                ),
+            )
+            return table.to_pandas().astype(object).fillna("")
+        except pa.ArrowInvalid as e:
+            print(f"⚠️ pyarrow で {csv_path} を読み込めなかったため、pandas で読み込みます: {e}")
+    return pd.read_csv(csv_path, dtype=object, keep_default_na=False, encoding="utf-8-sig")
+
+
+def load_csv(csv_path, schema, quarantine_path=None):
+    """スキーマに従ってCSVを型付きで読み込む
+
+    型変換できない行・必須列が空の行は取り除き、理由（Reason列）を付けて
+    quarantine_path に書き出す。戻り値は (有効な行の DataFrame, 除外した行の DataFrame)。
+    """
+    raw = _read_raw(csv_path, list(schema))
+    missing = [c for c, spec in schema.items() if spec.get("required") and c not in raw.columns]
+    if missing:
+        raise ValueError(f"{csv_path} に必須列がありません: {missing}")
+
+    n_rows = len(raw)
+    empty = np.full(n_rows, "", dtype=object)
+    checks = []  # (理由, 該当行のマスク)
+    typed = {}
+    for column, spec in schema.items():
+        values = raw[column].to_numpy(dtype=object) if column in raw.columns else empty
+        fill_from = spec.get("fill_from")
+        if fill_from in raw.columns:
+            values = np.where(values != "", values, raw[fill_from].to_numpy(dtype=object))
+        present = values != ""
+        if spec.get("required"):
+            checks.append((f"{column}が空です", ~present))
+
+        kind = spec["kind"]
+        if kind == "date":
+            parsed = pd.to_datetime(np.where(present, values, None), format=DATE_FORMAT, errors="coerce")
+            checks.append((f"{column}の日付が不正です（{DATE_FORMAT}）", present & parsed.isna()))
+            typed[column] = parsed
+        elif kind == "int":
+            numbers = pd.to_numeric(np.where(present, values, np.nan), errors="coerce")
+            invalid = present & (np.isnan(numbers) | (numbers % 1 != 0))
+            checks.append((f"{column}が整数ではありません", invalid))
+            typed[column] = np.where(present & ~invalid, numbers, spec.get("default", 0)).astype(np.int64)
+        elif kind == "category":
+            categories = spec["categories"]
+            typed[column] = pd.Categorical(np.where(present, values, None), categories=categories)
+            invalid = present & (typed[column].codes == -1)
+            checks.append((f"{column}が不明な値です（{' / '.join(categories)}）", invalid))
+        else:
+            typed[column] = np.where(present, values, np.nan)
+
+    if "StartDate" in typed and "EndDate" in typed:
+        checks.append(("EndDateがStartDateより前です", np.asarray(typed["EndDate"] < typed["StartDate"])))
+
+    # 該当した検査の組み合わせをビット列にし、理由の文字列は組み合わせごとに1回だけ作る
+    codes = np.zeros(n_rows, dtype=np.int64)
+    for bit, (_, mask) in enumerate(checks):
+        codes |= mask.astype(np.int64) << bit
+    invalid_rows = codes != 0
+    rejected = np.flatnonzero(invalid_rows)
+    messages = {
+        code: "; ".join(message for bit, (message, _) in enumerate(checks) if code >> bit & 1)
+        for code in np.unique(codes[rejected]).tolist()
+    }
+    reasons = [messages[code] for code in codes[rejected].tolist()]
+    quarantined = raw.iloc[rejected].assign(Reason=reasons).reset_index(drop=True)
+    if quarantine_path:
+        if len(quarantined):
+            quarantined.to_csv(quarantine_path, index=False, encoding="utf-8-sig")
+            print(
+                f"⚠️ {csv_path} の {len(quarantined)}行を除外し、理由を {quarantine_path} に書き出しました。"
+            )
+        elif os.path.exists(quarantine_path):
+            os.remove(quarantine_path)
+    elif len(quarantined):
+        print(f"⚠️ {csv_path} の {len(quarantined)}行を除外しました。")
+
+    valid = ~invalid_rows
+    df = pd.DataFrame({column: values[valid] for column, values in typed.items()})
+    return df, quarantined
+
+
+def load_combined_events(csv_path, quarantine_path=None):
+    """統合イベントCSV（combined_events.csv 形式）を型付きで読み込む"""
+    df, _ = load_csv(csv_path, COMBINED_EVENT_SCHEMA, quarantine_path)
+    return df
+
+
+def load_cruise_events(csv_path, quarantine_path=None):
+    """クルーズCSVを読み込み、寄港中止の行を除いた統合イベント形式で返す"""
+    df, _ = load_csv(csv_path, CRUISE_EVENT_SCHEMA, quarantine_path)
+    df = df[np.asarray(df["Status"] != CRUISE_STATUS_CANCELLED)]
+    return df.drop(columns="Status").reset_index(drop=True)
+
+
+def _event_keys(df):
+    # 読み込み方（型付き・文字列）によらず比べられるよう、CSVに書き出す表記の文字列にする
+    return pd.MultiIndex.from_frame(df[EVENT_KEY_COLUMNS].fillna("").astype(str))
+
+
+def load_last_updated(csv_path):
+    """既存のイベントCSVから、イベントのキーごとの LastUpdated を読み込む（無ければ空）"""
+    if not os.path.exists(csv_path):
+        return pd.Series(dtype=object)
+    previous = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    if not set(EVENT_KEY_COLUMNS + ["LastUpdated"]) <= set(previous.columns):
+        return pd.Series(dtype=object)
+    previous = previous[previous["LastUpdated"] != ""]
+    known = pd.Series(previous["LastUpdated"].to_numpy(), index=_event_keys(previous))
+    # 同じ内容の行が複数あれば最も古い日付を使う
+    return known.groupby(level=list(range(len(EVENT_KEY_COLUMNS)))).min()
+
+
+def carry_last_updated(df, known):
+    """load_last_updated の結果に同じ内容の行があれば、その LastUpdated を引き継ぐ
+
+    毎回の実行日で上書きすると、バックテストでイベントがいつから分かっていたかが失われるため、
+    新しい行・内容の変わった行だけに実行日を残す。
+    """
+    if df.empty or known.empty:
+        return df
+    carried = known.reindex(_event_keys(df)).to_numpy()
+    df["LastUpdated"] = pd.Series(carried, index=df.index).fillna(df["LastUpdated"])
+    return df
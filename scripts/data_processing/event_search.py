@@ -0,0 +1,204 @@
+import argparse
+import json
+import re
+import unicodedata
+from datetime import timedelta
+
+import pandas as pd
+
+from calendar_generator import filter_region, load_events
+
+SEARCH_INDEX_PATH = "data/processed/search_index.json"
+
+# 索引対象の列（クエリでは "location:釧路市民文化会館" のように列を指定できる）
+SEARCH_FIELDS = {
+    "subject": "Subject",
+    "location": "Location",
+    "description": "Description",
+    "type": "EventType",
+}
+FIELD_NAMES = list(SEARCH_FIELDS)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_QUERY_TOKEN_PATTERN = re.compile(r'-?(?:\w+:)?"[^"]*"\*?|\S+')
+# 前方一致（"全道*"）は、列の先頭か区切り文字の直後から始まる場合に一致とする
+_WORD_BOUNDARY = "^|[\\s、。・,/／（）()「」『』～〜\\-]"
+
+
+def normalize_text(text):
+    """全角半角・大文字小文字を揃える（PDF由来の改行は空白1つにする）"""
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def ngrams(text):
+    """検索用の文字1-gramと2-gram（空白をまたぐ2-gramは作らない）"""
+    grams = set()
+    for part in text.split(" "):
+        grams.update(part)
+        grams.update(part[i : i + 2] for i in range(len(part) - 1))
+    return grams
+
+
+class EventSearchIndex:
+    """イベントの件名・開催場所・説明文・種別に対する文字n-gramの転置索引
+
+    postings[列][n-gram] は、その列にn-gramを含むイベント番号の昇順リスト。
+    クエリの語はn-gramの積集合で候補を絞り込み、正規化済みの本文で一致を確認する。
+    """
+
+    def __init__(self, events, postings):
+        # events: [件名, 種別, 開催場所, 開始日, 終了日, 説明文] （文字列は正規化前）
+        self.events = events
+        self.postings = postings
+        self.texts = [
+            {field: normalize_text(self._field_value(event, field)) for field in FIELD_NAMES}
+            for event in events
+        ]
+
+    @staticmethod
+    def _field_value(event, field):
+        subject, event_type, location, _, _, description = event
+        return {"subject": subject, "location": location, "description": description, "type": event_type}[field]
+
+    @classmethod
+    def build(cls, df_events):
+        """イベント（calendar_generator.load_events の形式）から索引を作る"""
+        events = []
+        postings = {field: {} for field in FIELD_NAMES}
+        for event_id, row in enumerate(df_events.itertuples(index=False)):
+            values = {field: getattr(row, column, None) for field, column in SEARCH_FIELDS.items()}
+            values = {field: value if isinstance(value, str) else "" for field, value in values.items()}
+            events.append(
+                [
+                    values["subject"],
+                    values["type"],
+                    values["location"],
+                    row.StartDate.strftime("%Y-%m-%d"),
+                    row.EndDate.strftime("%Y-%m-%d"),
+                    values["description"],
+                ]
+            )
+            for field, value in values.items():
+                # set の順序はハッシュのシードで変わるため、並べ替えて索引（JSON）の内容を毎回同じにする
+                for gram in sorted(ngrams(normalize_text(value))):
+                    postings[field].setdefault(gram, []).append(event_id)
+        return cls(events, postings)
+
+    def save(self, path=SEARCH_INDEX_PATH):
+        """フロントエンドからも読めるよう、区切りを詰めたJSONで保存する"""
+        data = {"fields": FIELD_NAMES, "events": self.events, "postings": self.postings}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["events"], data["postings"])
+
+    def _candidates(self, field, term):
+        """term の全n-gramを含むイベント番号の集合"""
+        postings = self.postings[field]
+        grams = ngrams(term) if len(term) < 2 else {
+            term[i : i + 2] for i in range(len(term) - 1) if " " not in term[i : i + 2]
+        }
+        result = None
+        # 出現数の少ないn-gramから積集合をとる
+        for gram in sorted(grams, key=lambda g: len(postings.get(g, ()))):
+            ids = postings.get(gram)
+            if not ids:
+                return set()
+            result = set(ids) if result is None else result.intersection(ids)
+            if not result:
+                break
+        return result or set()
+
+    def match_term(self, term, fields=None, prefix=False):
+        """1つの語に一致するイベント番号の集合"""
+        term = normalize_text(term)
+        if not term:
+            return set(range(len(self.events)))
+        pattern = re.compile(f"(?:{_WORD_BOUNDARY}){re.escape(term)}") if prefix else None
+        matched = set()
+        for field in fields or FIELD_NAMES:
+            for event_id in self._candidates(field, term):
+                text = self.texts[event_id][field]
+                if pattern.search(text) if prefix else term in text:
+                    matched.add(event_id)
+        return matched
+
+    def search(self, query):
+        """ブール検索。空白区切りの語はAND、"OR" で区切った語はOR、先頭の "-" は除外、末尾の "*" は前方一致"""
+        groups, excluded = [], set()
+        join_next = False
+        for token in _QUERY_TOKEN_PATTERN.findall(query):
+            if token == "OR":
+                join_next = bool(groups)
+                continue
+            negate = token.startswith("-") and len(token) > 1
+            token = token[1:] if negate else token
+            fields = None
+            field, sep, rest = token.partition(":")
+            if sep and field in SEARCH_FIELDS:
+                fields, token = [field], rest
+            prefix = token.endswith("*")
+            token = token.rstrip("*").strip('"')
+            matched = self.match_term(token, fields, prefix)
+
+            if negate:
+                excluded |= matched
+            elif join_next:
+                groups[-1] |= matched
+            else:
+                groups.append(matched)
+            join_next = False
+
+        result = set(range(len(self.events))) if not groups else set.intersection(*groups)
+        return sorted(result - excluded)
+
+    def date_ranges(self, event_ids):
+        """イベント番号ごとの (開始日, 終了日)"""
+        return [(self.events[i][3], self.events[i][4]) for i in event_ids]
+
+    def days(self, query):
+        """クエリに一致するイベントが開催される日付（昇順）"""
+        days = set()
+        for start, end in self.date_ranges(self.search(query)):
+            current, last = pd.Timestamp(start), pd.Timestamp(end)
+            while current <= last:
+                days.add(current.strftime("%Y-%m-%d"))
+                current += timedelta(days=1)
+        return sorted(days)
+
+
+def build_search_index(events_csv_path, output_path=SEARCH_INDEX_PATH, region=None):
+    """カレンダーと同じイベント（対象地域・有効な日付のもの）から索引を作って保存する"""
+    df_events = filter_region(load_events(events_csv_path), region)
+    index = EventSearchIndex.build(df_events)
+    index.save(output_path)
+    n_grams = sum(len(postings) for postings in index.postings.values())
+    print(f"✅ {len(index.events)}件のイベントの検索索引（{n_grams}語）を {output_path} に保存しました。")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="イベントの全文検索（例: '全国 大会 location:釧路市民文化会館'）")
+    parser.add_argument("query", help="空白区切りはAND、OR で論理和、-語 で除外、語* で前方一致")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH)
+    parser.add_argument("--days", action="store_true", help="イベントではなく開催日の一覧を表示する")
+    args = parser.parse_args()
+
+    search_index = EventSearchIndex.load(args.index)
+    if args.days:
+        for day in search_index.days(args.query):
+            print(day)
+    else:
+        event_ids = search_index.search(args.query)
+        for event_id in event_ids:
+            subject, event_type, location, start, end, _ = search_index.events[event_id]
+            subject, location = normalize_text(subject), normalize_text(location)
+            print(f"[{event_id}] {start}〜{end} {event_type} {subject} @ {location}")
+        print(f"{len(event_ids)}件")
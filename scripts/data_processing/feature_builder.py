@@ -0,0 +1,145 @@
+import json
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from offday_runs import compute_offday_runs
+
+EVENT_TYPES = ["大会", "クルーズ", "コンサート", "イベント"]
+EVENT_TYPE_COLUMNS = {
+    "大会": "tournament_count",
+    "クルーズ": "cruise_count",
+    "コンサート": "concert_count",
+    "イベント": "event_count",
+}
+ROLLING_WINDOW = 7
+
+
+def _days_to_next(mask):
+    """次に True となる日までの日数（当日なら0、以降に無ければ-1）"""
+    n = len(mask)
+    positions = np.arange(n)
+    sentinel = np.iinfo(np.int32).max
+    candidate = np.where(mask, positions, sentinel)
+    next_positions = np.minimum.accumulate(candidate[::-1])[::-1]
+    return np.where(next_positions == sentinel, -1, next_positions - positions).astype(np.int16)
+
+
+def _rolling_sum(values, window):
+    """累積和の差分で直近 window 日（当日を含む）の合計を求める"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    return cumulative[upper] - cumulative[lower]
+
+
+def build_feature_table(calendar_data):
+    """カレンダーデータ（日付→日別データ）から予測モデル用の日別特徴量テーブルを作成する"""
+    days = [calendar_data[key] for key in sorted(calendar_data)]
+    dates = pd.to_datetime([day["date"] for day in days], format="%Y-%m-%d")
+
+    is_holiday = np.array([day["is_holiday"] for day in days], dtype=bool)
+    weekday = dates.weekday.to_numpy().astype(np.int8)
+    is_weekend = weekday >= 5
+    demand_score = np.array([day["demand_score"] for day in days], dtype=np.float64)
+    trend_score = np.array([day["monthly_trend_score"] for day in days], dtype=np.float64)
+    run_length, run_position, is_bridge = compute_offday_runs(is_holiday | is_weekend)
+
+    # 日別イベントを一次元に展開し、タイプ別件数を bincount でまとめて集計する
+    event_counts = np.array([len(day["events"]) for day in days], dtype=np.int64)
+    event_day_index = np.repeat(np.arange(len(days)), event_counts)
+    type_codes = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+    event_type_codes = np.array(
+        [type_codes.get(event["event_type"], -1) for day in days for event in day["events"]],
+        dtype=np.int64,
+    )
+
+    features = pd.DataFrame(
+        {
+            "date": dates,
+            "weekday": weekday,
+            "is_weekend": is_weekend,
+            "is_holiday": is_holiday,
+            "days_to_holiday": _days_to_next(is_holiday),
+            "holiday_run_length": run_length,
+            "holiday_run_position": run_position,
+            "is_bridge_day": is_bridge,
+            "monthly_trend_score": trend_score,
+            "demand_score": demand_score,
+            f"rolling_{ROLLING_WINDOW}d_score": _rolling_sum(demand_score, ROLLING_WINDOW),
+            "total_event_count": event_counts.astype(np.int16),
+        }
+    )
+    for event_type, code in type_codes.items():
+        counts = np.bincount(
+            event_day_index[event_type_codes == code], minlength=len(days)
+        )
+        features[EVENT_TYPE_COLUMNS[event_type]] = counts.astype(np.int16)
+
+    features["impact_level"] = pd.Categorical(
+        [day["impact_level"] for day in days], categories=["Low", "Medium", "High"]
+    )
+    return features
+
+
+def has_parquet_support():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def default_feature_table_path(base_path="data/processed/calendar_features"):
+    """pyarrow があれば Parquet、無ければ npz の出力パスを返す"""
+    return base_path + (".parquet" if has_parquet_support() else ".npz")
+
+
+def write_feature_table(features, output_path):
+    """特徴量テーブルを型付きで保存する（拡張子で Parquet / npz を切り替える）"""
+    if output_path.endswith(".parquet"):
+        features.to_parquet(output_path, index=False)
+    else:
+        arrays = {
+            column: (
+                features[column].to_numpy(dtype="datetime64[D]")
+                if column == "date"
+                else features[column].cat.codes.to_numpy()
+                if isinstance(features[column].dtype, pd.CategoricalDtype)
+                else features[column].to_numpy()
+            )
+            for column in features.columns
+        }
+        with open(output_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+    return output_path
+
+
+def load_feature_table(path):
+    """write_feature_table で保存した特徴量テーブルを読み込む"""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    with np.load(path) as data:
+        features = pd.DataFrame({column: data[column] for column in data.files})
+    features["date"] = pd.to_datetime(features["date"])
+    features["impact_level"] = pd.Categorical.from_codes(
+        features["impact_level"], categories=["Low", "Medium", "High"]
+    )
+    return features
+
+
+def run_feature_builder(calendar_json_path, output_path=None):
+    """calendar_data.json から特徴量テーブルを作成して保存する"""
+    with open(calendar_json_path, "r", encoding="utf-8") as f:
+        calendar_data = json.load(f)
+    features = build_feature_table(calendar_data)
+    output_path = write_feature_table(features, output_path or default_feature_table_path())
+    print(f"✅ 日別特徴量テーブル（{len(features)}日分）を {output_path} に保存しました。")
+    return output_path
+
+
+if __name__ == "__main__":
+    run_feature_builder("data/processed/calendar_data.json")
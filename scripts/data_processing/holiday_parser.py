@@ -1,53 +1,266 @@
+import argparse
+import os
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import requests
-from io import StringIO
-from datetime import datetime
+
+CAO_HOLIDAY_URL = "https://www8.cao.go.jp/chosei/shukujitsu/syukujitsu.csv"
+# 内閣府の祝日CSVを保存しておく場所（あれば計算結果より優先する）
+HOLIDAY_CSV_PATH = "data/master/syukujitsu.csv"
+
+# (名前, 月, 日付の決め方, 施行年, 最終年)
+#   日付の決め方: 日にち / ("monday", n) = 第n月曜日（ハッピーマンデー） / "vernal"・"autumnal" = 春分・秋分
+HOLIDAY_RULES = [
+    ("元日", 1, 1, 1949, None),
+    ("成人の日", 1, 15, 1949, 1999),
+    ("成人の日", 1, ("monday", 2), 2000, None),
+    ("建国記念の日", 2, 11, 1967, None),
+    ("天皇誕生日", 2, 23, 2020, None),
+    ("春分の日", 3, "vernal", 1949, None),
+    ("天皇誕生日", 4, 29, 1949, 1988),
+    ("みどりの日", 4, 29, 1989, 2006),
+    ("昭和の日", 4, 29, 2007, None),
+    ("憲法記念日", 5, 3, 1949, None),
+    ("みどりの日", 5, 4, 2007, None),
+    ("こどもの日", 5, 5, 1949, None),
+    ("海の日", 7, 20, 1996, 2002),
+    ("海の日", 7, ("monday", 3), 2003, None),
+    ("山の日", 8, 11, 2016, None),
+    ("敬老の日", 9, 15, 1966, 2002),
+    ("敬老の日", 9, ("monday", 3), 2003, None),
+    ("秋分の日", 9, "autumnal", 1948, None),
+    ("体育の日", 10, 10, 1966, 1999),
+    ("体育の日", 10, ("monday", 2), 2000, 2019),
+    ("スポーツの日", 10, ("monday", 2), 2020, None),
+    ("文化の日", 11, 3, 1948, None),
+    ("勤労感謝の日", 11, 23, 1948, None),
+    ("天皇誕生日", 12, 23, 1989, 2018),
+]
+
+# 東京オリンピック・パラリンピックの特措法で移動した祝日
+MOVED_HOLIDAYS = {
+    (2020, "海の日"): "2020-07-23",
+    (2020, "スポーツの日"): "2020-07-24",
+    (2020, "山の日"): "2020-08-10",
+    (2021, "海の日"): "2021-07-22",
+    (2021, "スポーツの日"): "2021-07-23",
+    (2021, "山の日"): "2021-08-08",
+}
+
+# 皇室行事などで1回限り設けられた祝日
+SPECIAL_HOLIDAYS = [
+    ("1959-04-10", "結婚の儀"),
+    ("1989-02-24", "大喪の礼"),
+    ("1990-11-12", "即位礼正殿の儀"),
+    ("1993-06-09", "結婚の儀"),
+    ("2019-05-01", "休日（祝日扱い）"),
+    ("2019-10-22", "休日（祝日扱い）"),
+]
+
+SUBSTITUTE_HOLIDAY_START = np.datetime64("1973-04-12")  # 振替休日の施行日
+CITIZENS_HOLIDAY_START = np.datetime64("1985-12-27")  # 国民の休日の施行日
+AMENDMENT_2007 = np.datetime64("2007-01-01")  # 振替休日・国民の休日の規定が改正された日
+# 内閣府のCSVでは振替休日・国民の休日はどちらも「休日」
+SUBSTITUTE_HOLIDAY_NAME = "休日"
+
+# 春分・秋分の近似式の係数（1900-1979年, 1980-2099年, 2100-2150年）
+EQUINOX_BASES = {"vernal": (20.8357, 20.8431, 21.8510), "autumnal": (23.2588, 23.2488, 24.2488)}
+
+
+def _weekday(days):
+    """datetime64[D] の曜日（月曜=0, 日曜=6）"""
+    return (days.astype(np.int64) + 3) % 7
+
+
+def _month_start(years, month):
+    return ((years - 1970) * 12 + (month - 1)).astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _equinox_day(years, kind):
+    before_1980, before_2100, after_2100 = EQUINOX_BASES[kind]
+    base = np.select([years < 1980, years < 2100], [before_1980, before_2100], after_2100)
+    # 近似式の int() は0方向への切り捨てのため、1979年以前（負の値）も floor ではなく trunc を使う
+    leap_offset = np.where(years < 1980, np.trunc((years - 1983) / 4), np.trunc((years - 1980) / 4))
+    return np.floor(base + 0.242194 * (years - 1980) - leap_offset).astype(np.int64)
+
+
+def _rule_dates(years, month, day_rule):
+    first = _month_start(years, month)
+    if isinstance(day_rule, tuple):
+        _, nth = day_rule
+        return first + (7 - _weekday(first)) % 7 + 7 * (nth - 1)
+    if isinstance(day_rule, str):
+        return first + (_equinox_day(years, day_rule) - 1)
+    return first + (day_rule - 1)
+
+
+@lru_cache(maxsize=None)
+def holiday_table(start_year, end_year):
+    """start_year〜end_year の祝日・振替休日・国民の休日を規則から計算する
+
+    年の配列に対して規則ごとに日付をまとめて求める。
+    戻り値は日付の昇順の (datetime64[D] の配列, 名前のタプル)。
+    """
+    all_years = np.arange(start_year, end_year + 1)
+    dates, names = [], []
+    for name, month, day_rule, first_year, last_year in HOLIDAY_RULES:
+        years = all_years[(all_years >= first_year) & (all_years <= (last_year or end_year))]
+        if not len(years):
+            continue
+        rule_dates = _rule_dates(years, month, day_rule)
+        for i, year in enumerate(years):
+            moved = MOVED_HOLIDAYS.get((int(year), name))
+            if moved:
+                rule_dates[i] = np.datetime64(moved)
+        dates.append(rule_dates)
+        names.extend([name] * len(years))
+    for special_date, name in SPECIAL_HOLIDAYS:
+        if start_year <= int(special_date[:4]) <= end_year:
+            dates.append(np.array([special_date], dtype="datetime64[D]"))
+            names.append(name)
+
+    national = np.concatenate(dates) if dates else np.array([], dtype="datetime64[D]")
+    order = np.argsort(national, kind="stable")
+    national, names = national[order], [names[i] for i in order]
+
+    # 国民の休日: 前日と翌日が祝日の平日（2006年までは日曜日を除く）
+    between = national[:-1][np.diff(national).astype(np.int64) == 2] + 1
+    between = between[
+        (between >= CITIZENS_HOLIDAY_START)
+        & ~np.isin(between, national)
+        & ((between >= AMENDMENT_2007) | (_weekday(between) != 6))
+    ]
+
+    # 振替休日: 日曜日の祝日の翌日（2007年以降は祝日でない最も近い日まで送る）
+    sundays = national[(_weekday(national) == 6) & (national >= SUBSTITUTE_HOLIDAY_START)]
+    substitutes = sundays + 1
+    for _ in range(7):
+        shift = np.isin(substitutes, national) & (substitutes >= AMENDMENT_2007)
+        if not shift.any():
+            break
+        substitutes = substitutes + shift
+    substitutes = substitutes[~np.isin(substitutes, national) & ~np.isin(substitutes, between)]
+
+    rest_days = np.concatenate([between, substitutes])
+    all_dates = np.concatenate([national, rest_days])
+    all_names = names + [SUBSTITUTE_HOLIDAY_NAME] * len(rest_days)
+    order = np.argsort(all_dates, kind="stable")
+    return all_dates[order], tuple(all_names[i] for i in order)
+
+
+def load_holiday_csv(csv_path=HOLIDAY_CSV_PATH):
+    """内閣府形式（Shift-JIS, 「国民の祝日・休日月日,国民の祝日・休日名称」）の祝日CSVを読み込む"""
+    if not csv_path or not os.path.exists(csv_path):
+        return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Name": pd.Series(dtype=object)})
+    df = pd.read_csv(csv_path, header=None, names=["Date", "Name"], skiprows=1, encoding="shift_jis")
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y/%m/%d")
+    return df
+
+
+def download_holiday_csv(url=CAO_HOLIDAY_URL, csv_path=HOLIDAY_CSV_PATH):
+    """内閣府の祝日CSVをダウンロードして保存する（カレンダー生成時には通信しない）"""
+    response = requests.get(url)
+    response.raise_for_status()
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    with open(csv_path, "wb") as f:
+        f.write(response.content)
+    print(f"✅ 祝日CSVを {csv_path} に保存しました。")
+    return csv_path
+
+
+def validate_holiday_csv(csv_path=HOLIDAY_CSV_PATH):
+    """祝日CSVと規則による計算結果を比較し、食い違う日の (日付, CSVの名前, 計算の名前) を返す"""
+    df = load_holiday_csv(csv_path)
+    if df.empty:
+        return []
+    csv_names = dict(zip(df["Date"].dt.date, df["Name"]))
+    dates, names = holiday_table(min(csv_names).year, max(csv_names).year)
+    rule_names = dict(zip(dates.astype(object), names))
+    return [
+        (day, csv_names.get(day), rule_names.get(day))
+        for day in sorted(set(csv_names) | set(rule_names))
+        if csv_names.get(day) != rule_names.get(day)
+    ]
+
 
 class HolidayParser:
-    def __init__(self, url="https://www8.cao.go.jp/chosei/shukujitsu/syukujitsu.csv"):
-        self.url = url
-        self.holidays = self._fetch_holidays()
-
-    def _fetch_holidays(self):
-        """内閣府の祝日CSVをダウンロードし、DataFrameとして読み込む"""
-        try:
-            response = requests.get(self.url)
-            response.raise_for_status()  # HTTPエラーがあれば例外を発生させる
-            # Shift-JISでデコード
-            csv_data = response.content.decode('shift_jis')
-            df = pd.read_csv(StringIO(csv_data), header=None, names=['Date', 'Name'], skiprows=1)
-            df['Date'] = pd.to_datetime(df['Date'])
-            return df
-        except requests.exceptions.RequestException as e:
-            print(f"祝日データのダウンロード中にエラーが発生しました: {e}")
-            return pd.DataFrame()
-        except Exception as e:
-            print(f"祝日データの解析中にエラーが発生しました: {e}")
-            return pd.DataFrame()
+    """日本の祝日を判定する
+
+    祝日は規則（固定日・ハッピーマンデー・春分/秋分・振替休日・国民の休日）から年単位で計算し、
+    祝日CSV（HOLIDAY_CSV_PATH）がある年はその内容で上書きする。
+    判定は日付をキーにした辞書で行う。
+    """
+
+    def __init__(self, csv_path=HOLIDAY_CSV_PATH):
+        self.csv_path = csv_path
+        self.overrides = load_holiday_csv(csv_path)
+        self._override_years = set(self.overrides["Date"].dt.year)
+        self._names = {}
+        self._years = set()
+        self._sorted_dates = np.array([], dtype="datetime64[D]")
+
+    def _ensure_years(self, start_year, end_year):
+        missing = [year for year in range(start_year, end_year + 1) if year not in self._years]
+        if not missing:
+            return
+        dates, names = holiday_table(missing[0], missing[-1])
+        for day, name in zip(dates.astype(object), names):
+            if day.year not in self._override_years:
+                self._names[day] = name
+        for day, name in zip(self.overrides["Date"].dt.date, self.overrides["Name"]):
+            if missing[0] <= day.year <= missing[-1]:
+                self._names[day] = name
+        self._years.update(range(missing[0], missing[-1] + 1))
+        self._sorted_dates = np.array(sorted(self._names), dtype="datetime64[D]")
+
+    @staticmethod
+    def _to_date(date_obj):
+        if isinstance(date_obj, datetime):
+            return date_obj.date()
+        if isinstance(date_obj, date):
+            return date_obj
+        return pd.Timestamp(date_obj).date()
 
     def is_holiday(self, date_obj):
         """指定された日付が祝日かどうかを判定する"""
-        if self.holidays.empty:
-            return False
-        return date_obj in self.holidays['Date'].dt.date.values
+        return self.get_holiday_name(date_obj) is not None
 
     def get_holiday_name(self, date_obj):
         """指定された日付の祝日名を取得する"""
-        if self.holidays.empty:
-            return None
-        holiday_row = self.holidays[self.holidays['Date'].dt.date == date_obj]
-        if not holiday_row.empty:
-            return holiday_row.iloc[0]['Name']
-        return None
+        date_obj = self._to_date(date_obj)
+        if date_obj.year not in self._years:
+            self._ensure_years(date_obj.year, date_obj.year)
+        return self._names.get(date_obj)
 
     def get_holidays_in_range(self, start_date, end_date):
         """指定された期間内の祝日リストを取得する"""
-        if self.holidays.empty:
-            return []
-        mask = (self.holidays['Date'] >= pd.to_datetime(start_date)) & (self.holidays['Date'] <= pd.to_datetime(end_date))
-        return self.holidays[mask].to_dict('records')
+        start, end = self._to_date(start_date), self._to_date(end_date)
+        self._ensure_years(start.year, end.year)
+        lo = np.searchsorted(self._sorted_dates, np.datetime64(start), side="left")
+        hi = np.searchsorted(self._sorted_dates, np.datetime64(end), side="right")
+        return [
+            {"Date": pd.Timestamp(day), "Name": self._names[day]}
+            for day in self._sorted_dates[lo:hi].astype(object)
+        ]
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="日本の祝日の判定")
+    parser.add_argument("--update", action="store_true", help="内閣府の祝日CSVをダウンロードして保存する")
+    parser.add_argument("--validate", action="store_true", help="祝日CSVと規則による計算結果を比較する")
+    args = parser.parse_args()
+
+    if args.update:
+        download_holiday_csv()
+    if args.update or args.validate:
+        differences = validate_holiday_csv()
+        for day, csv_name, rule_name in differences:
+            print(f"⚠️ {day}: CSV={csv_name}, 計算={rule_name}")
+        print(f"✅ 祝日CSVとの差異: {len(differences)}件")
+
     holiday_parser = HolidayParser()
 
     # 例: 今日の日付が祝日かどうかを確認
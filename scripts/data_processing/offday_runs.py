@@ -0,0 +1,72 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+
+def compute_offday_runs(is_off):
+    """休日フラグ配列から連休の長さ・連休内の位置（1始まり）・飛び石（挟まれた平日）フラグを求める"""
+    is_off = np.asarray(is_off, dtype=bool)
+    n = len(is_off)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int16)
+        return empty, empty, np.zeros(0, dtype=bool)
+
+    positions = np.arange(n)
+    starts = is_off & ~np.concatenate(([False], is_off[:-1]))
+    run_ids = np.cumsum(starts)
+    run_sizes = np.bincount(run_ids, weights=is_off).astype(np.int16)
+    run_starts = np.zeros(len(run_sizes), dtype=np.int64)
+    run_starts[run_ids[starts]] = positions[starts]
+
+    run_length = np.where(is_off, run_sizes[run_ids], 0).astype(np.int16)
+    run_position = np.where(is_off, positions - run_starts[run_ids] + 1, 0).astype(np.int16)
+
+    # 前後の日がともに休日の平日（例: 祝日と土曜に挟まれた金曜）
+    prev_off = np.concatenate(([False], is_off[:-1]))
+    next_off = np.concatenate((is_off[1:], [False]))
+    is_bridge = ~is_off & prev_off & next_off
+    return run_length, run_position, is_bridge
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.to_datetime(value).date()
+
+
+class OffDayRunIndex:
+    """祝日と土日から作る連休インデックス。日付ごとの連休情報を O(1) で返す"""
+
+    def __init__(self, start_date, is_holiday):
+        self.start_date = _to_date(start_date)
+        is_holiday = np.asarray(is_holiday, dtype=bool)
+        weekday_of_start = self.start_date.weekday()
+        weekdays = (np.arange(len(is_holiday)) + weekday_of_start) % 7
+        self.is_off = is_holiday | (weekdays >= 5)
+        self.run_length, self.run_position, self.is_bridge = compute_offday_runs(self.is_off)
+
+    @classmethod
+    def from_holiday_parser(cls, holiday_parser, start_date, end_date):
+        """HolidayParser の祝日一覧から期間分のインデックスを作成する"""
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        n_days = (end_date - start_date).days + 1
+        is_holiday = np.zeros(max(n_days, 0), dtype=bool)
+        for holiday in holiday_parser.get_holidays_in_range(start_date, end_date):
+            offset = (_to_date(holiday["Date"]) - start_date).days
+            if 0 <= offset < n_days:
+                is_holiday[offset] = True
+        return cls(start_date, is_holiday)
+
+    def lookup(self, date_obj):
+        """(連休の長さ, 連休内の位置, 飛び石フラグ) を返す。休日でない日は長さ・位置とも0"""
+        offset = (_to_date(date_obj) - self.start_date).days
+        if not 0 <= offset < len(self.is_off):
+            return 0, 0, False
+        return (
+            int(self.run_length[offset]),
+            int(self.run_position[offset]),
+            bool(self.is_bridge[offset]),
+        )
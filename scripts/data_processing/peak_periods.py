@@ -0,0 +1,128 @@
+import argparse
+import heapq
+import json
+from collections import deque
+
+import numpy as np
+
+CALENDAR_JSON = "data/processed/calendar_data.json"
+PEAK_PERIODS_PATH = "data/processed/peak_periods.json"
+DEFAULT_WINDOWS = [2, 3, 7]  # 連泊数（日数）
+DEFAULT_TOP_K = 10
+
+
+def rolling_sums(values, window):
+    """長さ window の区間和（累積和の差）。i 番目は values[i:i+window] の合計"""
+    prefix = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    return prefix[window:] - prefix[:-window]
+
+
+def rolling_max(values, window):
+    """長さ window の区間最大値。値が減少する順に添字を持つ両端キューで求める"""
+    result = np.empty(max(len(values) - window + 1, 0), dtype=np.float64)
+    candidates = deque()
+    for i, value in enumerate(values):
+        while candidates and values[candidates[-1]] <= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1:
+            result[i - window + 1] = values[candidates[0]]
+    return result
+
+
+def top_windows(sums, window, k):
+    """区間和の大きい順に、互いに重ならない区間の開始位置を最大 k 個選ぶ"""
+    heap = [(-total, start) for start, total in enumerate(sums.tolist())]
+    heapq.heapify(heap)
+    taken = np.zeros(len(sums) + window - 1, dtype=bool)
+    starts = []
+    while heap and len(starts) < k:
+        _, start = heapq.heappop(heap)
+        if taken[start : start + window].any():
+            continue
+        taken[start : start + window] = True
+        starts.append(start)
+    return starts
+
+
+def level_runs(levels, level="High"):
+    """指定した影響度が連続する区間 (開始, 終了) を1回の走査で求める"""
+    runs = []
+    run_start = None
+    for i, value in enumerate(levels):
+        if value == level:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            runs.append((run_start, i - 1))
+            run_start = None
+    if run_start is not None:
+        runs.append((run_start, len(levels) - 1))
+    return runs
+
+
+def analyze_peaks(calendar_data, windows=DEFAULT_WINDOWS, top_k=DEFAULT_TOP_K):
+    """日別スコアから連泊期間ごとの上位の期間とHigh日の連続区間をまとめる"""
+    dates = sorted(calendar_data)
+    scores = np.array([calendar_data[d]["demand_score"] for d in dates], dtype=np.float64)
+    levels = [calendar_data[d]["impact_level"] for d in dates]
+
+    def period(start, end, total, peak):
+        return {
+            "start": dates[start],
+            "end": dates[end],
+            "days": end - start + 1,
+            "total": round(float(total), 2),
+            "mean": round(float(total) / (end - start + 1), 2),
+            "max": round(float(peak), 2),
+        }
+
+    result = {"windows": {}, "high_runs": []}
+    for window in windows:
+        if not 0 < window <= len(dates):
+            continue
+        sums = rolling_sums(scores, window)
+        maxima = rolling_max(scores, window)
+        result["windows"][str(window)] = [
+            period(start, start + window - 1, sums[start], maxima[start])
+            for start in top_windows(sums, window, top_k)
+        ]
+
+    prefix = np.concatenate(([0.0], np.cumsum(scores)))
+    result["high_runs"] = [
+        period(start, end, prefix[end + 1] - prefix[start], scores[start : end + 1].max())
+        for start, end in level_runs(levels, "High")
+    ]
+    return result
+
+
+def run_peak_periods(
+    calendar_json_path=CALENDAR_JSON, output_path=PEAK_PERIODS_PATH, windows=DEFAULT_WINDOWS, top_k=DEFAULT_TOP_K
+):
+    with open(calendar_json_path, "r", encoding="utf-8") as f:
+        calendar_data = json.load(f)
+    peaks = analyze_peaks(calendar_data, windows, top_k)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(peaks, f, ensure_ascii=False, separators=(",", ":"))
+    print(
+        f"✅ 需要ピーク期間（{'・'.join(f'{w}日' for w in peaks['windows'])}の上位、"
+        f"High日の連続 {len(peaks['high_runs'])}区間）を {output_path} に出力しました。"
+    )
+    return peaks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="需要スコアの高い連泊期間とHigh日の連続区間を求める")
+    parser.add_argument("--calendar", default=CALENDAR_JSON)
+    parser.add_argument("--output", default=PEAK_PERIODS_PATH)
+    parser.add_argument("--windows", type=int, nargs="+", default=DEFAULT_WINDOWS, help="期間の日数（複数可）")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K, help="日数ごとに出力する期間の数")
+    args = parser.parse_args()
+
+    peaks = run_peak_periods(args.calendar, args.output, args.windows, args.top)
+    for window, periods in peaks["windows"].items():
+        print(f"\n{window}日間の上位:")
+        for rank, p in enumerate(periods, 1):
+            print(f"  {rank}. {p['start']}〜{p['end']} 合計 {p['total']}（最大 {p['max']}）")
@@ -0,0 +1,214 @@
+import calendar
+import json
+import re
+import sys
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from calendar_records import CompactCalendar
+from scoring import calculate_event_score
+from region_index import get_default_region_index
+
+DEFAULT_PENDING_FILES = [
+    "data/processed/r7-con_pending.json",
+    "data/processed/r7-ev_pending.json",
+]
+DEFAULT_SAMPLES = 10000
+DEFAULT_SEED = 20250401  # 同じ入力からは同じ結果になるよう乱数シードを固定する
+
+# 旬ごとの日の範囲（下旬の終わりは月末）
+_PERIOD_DAYS = {"上旬": (1, 10), "中旬": (11, 20), "下旬": (21, None)}
+_PART_PATTERN = re.compile(
+    r"(?:(\d{4})年)?\s*(\d{1,2})月\s*(?:(\d{1,2})日|(上旬|中旬|下旬))?"
+)
+
+
+def _fiscal_year_from_path(path):
+    """ファイル名（例: r7-con_pending.json）から年度の開始年（西暦）を求める"""
+    match = re.search(r"r(\d+)-", os.path.basename(path))
+    return 2018 + int(match.group(1)) if match else None
+
+
+def _part_window(part, fiscal_year):
+    """日付表現の一部（例: 「12月上旬」「2月28日（土）」）を取り得る日付の範囲にする"""
+    match = _PART_PATTERN.search(part)
+    if not match:
+        return None
+    year_str, month_str, day_str, period = match.groups()
+    month = int(month_str)
+    if not 1 <= month <= 12:
+        return None
+    if year_str:
+        year = int(year_str)
+    elif fiscal_year is not None:
+        year = fiscal_year if month >= 4 else fiscal_year + 1  # 4月始まりの年度
+    else:
+        return None
+    last_day = calendar.monthrange(year, month)[1]
+
+    if day_str:
+        day = min(int(day_str), last_day)
+        return date(year, month, day), date(year, month, day)
+    if period:
+        first, last = _PERIOD_DAYS[period]
+        return date(year, month, first), date(year, month, last or last_day)
+    # 「7月未定」「7月頃」などは月全体
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def parse_pending_window(original_date, fiscal_year):
+    """日程未定の日付表現から (開始日の範囲, 終了日の範囲) を返す。解釈できなければNone
+
+    期間指定のない単日開催の場合、終了日の範囲はNone（開始日と同日）になる。
+    """
+    text = str(original_date or "")
+    text = re.sub(r"令和\s*(\d+)", lambda m: str(2018 + int(m.group(1))), text)
+    text = text.replace("(予定)", "").replace("（予定）", "")
+    parts = [p for p in re.split(r"[～〜]", text) if p.strip()]
+
+    windows = [_part_window(part, fiscal_year) for part in parts]
+    windows = [w for w in windows if w is not None]
+    if not windows:
+        # 「未定」のみの場合は年度全体のどこかで開催されるものとする
+        if fiscal_year is None:
+            return None
+        return (date(fiscal_year, 4, 1), date(fiscal_year + 1, 3, 31)), None
+    if len(windows) == 1:
+        return windows[0], None
+    return windows[0], windows[-1]
+
+
+def load_pending_events(pending_paths):
+    """日程未定イベントJSONを読み込み、(イベント, 年度開始年) のリストを返す"""
+    pending = []
+    for path in pending_paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                events = json.load(f)
+        except FileNotFoundError:
+            print(f"Warning: {path} not found. Skipping pending events.")
+            continue
+        fiscal_year = _fiscal_year_from_path(path)
+        pending.extend((event, fiscal_year) for event in events)
+    return pending
+
+
+def simulate_pending_demand(
+    pending,
+    horizon_start,
+    n_days,
+    n_samples=DEFAULT_SAMPLES,
+    seed=DEFAULT_SEED,
+    region=None,
+    scoring_config=None,
+):
+    """日程未定イベントの開催日をモンテカルロ法でサンプリングし、日別スコアの期待値とP10/P90を返す
+
+    全イベント×全サンプルの開始日・終了日を一括で生成し、差分配列への加算と累積和で
+    サンプルごとの日別スコアを求める（サンプル単位のPythonループは使わない）。
+    """
+    region_index = get_default_region_index()
+    region = region or region_index.default.id
+    starts_lo, starts_hi, ends_lo, ends_hi, single_day, points = [], [], [], [], [], []
+    for event, fiscal_year in pending:
+        # 確定イベントと同様に、対象地域で開催されるイベントだけを扱う
+        if not region_index.in_region(region, event.get("location"), event.get("subject")):
+            continue
+        window = parse_pending_window(event.get("original_date"), fiscal_year)
+        if window is None:
+            continue
+        (start_lo, start_hi), end_window = window
+        # 単日開催はサンプリング後に終了日を開始日に揃える
+        single_day.append(end_window is None)
+        end_lo, end_hi = end_window or (start_lo, start_hi)
+        starts_lo.append((start_lo - horizon_start).days)
+        starts_hi.append((start_hi - horizon_start).days)
+        ends_lo.append((end_lo - horizon_start).days)
+        ends_hi.append((end_hi - horizon_start).days)
+        # 参加者数が不明なため、スコアは 期間全体の点数 / 開催日数 で日割りになる
+        points.append(
+            calculate_event_score(
+                event.get("event_type"), event.get("subject", ""), 0, 1, scoring_config
+            )
+        )
+
+    zeros = np.zeros(n_days)
+    if not points:
+        return zeros, zeros, zeros, 0
+
+    rng = np.random.default_rng(seed)
+    shape = (len(points), n_samples)
+    starts_lo = np.array(starts_lo)[:, None]
+    starts_hi = np.array(starts_hi)[:, None]
+    ends_lo = np.array(ends_lo)[:, None]
+    ends_hi = np.array(ends_hi)[:, None]
+    single_day = np.array(single_day)[:, None]
+    points = np.array(points, dtype=np.float64)[:, None]
+
+    starts = starts_lo + rng.integers(0, starts_hi - starts_lo + 1, size=shape)
+    ends = ends_lo + rng.integers(0, ends_hi - ends_lo + 1, size=shape)
+    ends = np.where(single_day, starts, np.maximum(ends, starts))
+    per_day = np.broadcast_to(points, shape) / (ends - starts + 1)
+
+    # サンプルごとに長さ n_days+1 の差分配列を並べ、開始日に +、終了日の翌日に - を加える
+    row_offset = np.arange(n_samples)[None, :] * (n_days + 1)
+    start_index = row_offset + np.clip(starts, 0, n_days)
+    stop_index = row_offset + np.clip(ends + 1, 0, n_days)
+    diff = np.bincount(
+        np.concatenate((start_index.ravel(), stop_index.ravel())),
+        weights=np.concatenate((per_day.ravel(), -per_day.ravel())),
+        minlength=n_samples * (n_days + 1),
+    ).reshape(n_samples, n_days + 1)
+    daily = np.cumsum(diff, axis=1)[:, :n_days]
+
+    expected = daily.mean(axis=0)
+    p10, p90 = np.percentile(daily, [10, 90], axis=0)
+    return expected, p10, p90, len(points)
+
+
+def apply_pending_demand(
+    calendar_data,
+    pending_paths=None,
+    n_samples=DEFAULT_SAMPLES,
+    seed=DEFAULT_SEED,
+    region=None,
+    scoring_config=None,
+    verbose=True,
+):
+    """カレンダーデータの各日に日程未定イベントの期待スコアとP10/P90の帯を追加する"""
+    pending = load_pending_events(pending_paths or DEFAULT_PENDING_FILES)
+    dates = sorted(calendar_data)
+    if not dates:
+        return calendar_data
+    horizon_start = date.fromisoformat(dates[0])
+    n_days = (date.fromisoformat(dates[-1]) - horizon_start).days + 1
+
+    started = time.perf_counter()
+    expected, p10, p90, n_events = simulate_pending_demand(
+        pending, horizon_start, n_days, n_samples, seed, region, scoring_config
+    )
+    elapsed = time.perf_counter() - started
+
+    if isinstance(calendar_data, CompactCalendar):
+        # 配列のまま列として持ち、丸めは書き出し時に行う
+        calendar_data.add_column("pending_expected_score", expected, digits=4)
+        calendar_data.add_column("pending_p10", p10, digits=4)
+        calendar_data.add_column("pending_p90", p90, digits=4)
+    else:
+        for date_str in dates:
+            offset = (date.fromisoformat(date_str) - horizon_start).days
+            daily_data = calendar_data[date_str]
+            daily_data["pending_expected_score"] = round(float(expected[offset]), 4)
+            daily_data["pending_p10"] = round(float(p10[offset]), 4)
+            daily_data["pending_p90"] = round(float(p90[offset]), 4)
+
+    if not verbose:
+        return calendar_data
+    print(
+        f"✅ 日程未定イベント {n_events}件 × {n_samples}サンプルの期待スコアを算出しました。({elapsed:.2f}秒)"
+    )
+    return calendar_data
@@ -0,0 +1,199 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from calendar_generator import build_calendar, load_events, load_monthly_trends
+from holiday_parser import HolidayParser
+from pending_demand import DEFAULT_PENDING_FILES, apply_pending_demand
+from region_index import get_default_region_index
+from scoring import load_scoring_config
+
+REGIONS_OUTPUT_DIR = "data/processed/regions"
+
+# 共有メモリに置く文字列列（UTF-8を連結したバイト列とオフセット配列で持つ）
+STRING_COLUMNS = ["EventType", "Subject", "Location", "ImpactLevel"]
+
+
+def region_calendar_path(region_id, output_dir=REGIONS_OUTPUT_DIR):
+    return os.path.join(output_dir, region_id, "calendar_data.json")
+
+
+def _encode_strings(values):
+    encoded = [value.encode("utf-8") if isinstance(value, str) else b"" for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded) or b"\0", dtype=np.uint8), offsets
+
+
+class SharedEventStore:
+    """読み込み済みのイベントを共有メモリ上の配列として保持する
+
+    ワーカーには共有メモリの名前・形状・型（descriptor）だけを渡し、
+    イベント本体をワーカーごとにpickleしない。
+    """
+
+    def __init__(self, arrays):
+        self._blocks = []
+        self.descriptor = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._blocks.append(block)
+            self.descriptor[name] = (block.name, array.shape, array.dtype.str)
+
+    @classmethod
+    def from_events(cls, df_events, region_index):
+        """イベントの日付・参加者数・文字列列と、イベント×地域の所属行列を共有メモリに載せる"""
+        arrays = {
+            "StartDate": df_events["StartDate"].to_numpy("datetime64[ns]").view(np.int64),
+            "EndDate": df_events["EndDate"].to_numpy("datetime64[ns]").view(np.int64),
+            "EstimatedAttendees": pd.to_numeric(df_events["EstimatedAttendees"], errors="coerce")
+            .fillna(0)
+            .to_numpy(np.float64),
+            "membership": region_index.membership(df_events["Location"], df_events["Subject"]),
+        }
+        for column in STRING_COLUMNS:
+            arrays[column + ".data"], arrays[column + ".offsets"] = _encode_strings(df_events[column])
+        return cls(arrays)
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_store(descriptor):
+    """ワーカー側で共有メモリを開き、コピーせずにnumpy配列として参照する"""
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in descriptor.items():
+        # ワーカーは作成側と同じリソーストラッカーを共有するため、解放は作成側の unlink に任せる
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def events_frame(arrays, rows):
+    """共有メモリ上の配列から指定行のイベントを DataFrame に組み立てる"""
+    data = {
+        "StartDate": arrays["StartDate"][rows].view("datetime64[ns]"),
+        "EndDate": arrays["EndDate"][rows].view("datetime64[ns]"),
+        "EstimatedAttendees": arrays["EstimatedAttendees"][rows],
+    }
+    for column in STRING_COLUMNS:
+        blob = arrays[column + ".data"]
+        offsets = arrays[column + ".offsets"]
+        data[column] = [
+            bytes(blob[offsets[i] : offsets[i + 1]]).decode("utf-8") or None for i in rows
+        ]
+    return pd.DataFrame(data)
+
+
+_worker_state = {}
+
+
+def _init_worker(descriptor, holiday_parser):
+    _worker_state["blocks"], _worker_state["arrays"] = attach_store(descriptor)
+    _worker_state["holiday_parser"] = holiday_parser
+
+
+def _region_file(path, default_path):
+    # 地域専用のファイルが無い場合は既定の地域（釧路市）のものを使う
+    return path if path and os.path.exists(path) else default_path
+
+
+def _generate_region(task):
+    region_id, start_year, end_year, output_path, pending_paths = task
+    started = time.perf_counter()
+    region_index = get_default_region_index()
+    region = region_index.get(region_id)
+    default = region_index.default
+
+    arrays = _worker_state["arrays"]
+    rows = np.flatnonzero(arrays["membership"][:, region_index.positions[region_id]])
+    df_events = events_frame(arrays, rows)
+
+    config = load_scoring_config(_region_file(region.scoring_config_path, default.scoring_config_path))
+    monthly_trends = load_monthly_trends(_region_file(region.trends_path, default.trends_path))
+    calendar_data = build_calendar(
+        df_events, start_year, end_year, config, _worker_state["holiday_parser"], monthly_trends,
+        verbose=False,
+    )
+    apply_pending_demand(
+        calendar_data, pending_paths, region=region_id, scoring_config=config, verbose=False
+    )
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    calendar_data.write_json(output_path)
+    return region_id, len(rows), time.perf_counter() - started
+
+
+def generate_region_calendars(
+    events_csv_path,
+    start_year,
+    end_year,
+    region_ids=None,
+    output_dir=REGIONS_OUTPUT_DIR,
+    pending_paths=None,
+    max_workers=None,
+    holiday_parser=None,
+):
+    """地域ごとのカレンダーをワーカープロセスで並列に生成する"""
+    region_index = get_default_region_index()
+    region_ids = region_ids or [region.id for region in region_index.regions]
+    holiday_parser = holiday_parser or HolidayParser()
+    pending_paths = pending_paths or DEFAULT_PENDING_FILES
+    df_events = load_events(events_csv_path)
+
+    started = time.perf_counter()
+    tasks = [
+        (region_id, start_year, end_year, region_calendar_path(region_id, output_dir), pending_paths)
+        for region_id in region_ids
+    ]
+    with SharedEventStore.from_events(df_events, region_index) as store:
+        # パイプラインでは他のステージのスレッドと同時に呼ばれるため、ロックを持ったまま複製されうる
+        # fork ではなく forkserver でワーカーを起動する（引数は共有メモリの記述子なので pickle できる）
+        with ProcessPoolExecutor(
+            max_workers=max_workers or min(len(tasks), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+            initargs=(store.descriptor, holiday_parser),
+        ) as executor:
+            results = list(executor.map(_generate_region, tasks))
+
+    for region_id, n_events, elapsed in results:
+        print(
+            f"✅ {region_index.get(region_id).name}のカレンダーを生成しました"
+            f"（イベント {n_events}件, {elapsed:.2f}秒）: {region_calendar_path(region_id, output_dir)}"
+        )
+    print(f"✅ {len(results)}地域のカレンダーを生成しました。({time.perf_counter() - started:.2f}秒)")
+    return [region_calendar_path(region_id, output_dir) for region_id in region_ids]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="地域ごとのカレンダーを並列に生成する")
+    parser.add_argument("--events", default="data/processed/combined_events.csv")
+    parser.add_argument("--start-year", type=int, default=2025)
+    parser.add_argument("--end-year", type=int, default=2026)
+    parser.add_argument("--regions", nargs="+", help="対象地域のID（省略時は全地域）")
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    generate_region_calendars(
+        args.events, args.start_year, args.end_year, args.regions, max_workers=args.jobs
+    )
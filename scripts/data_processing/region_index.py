@@ -0,0 +1,97 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_REGIONS_PATH = 'data/master/regions.csv'
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class Region:
+    """地域ごとの設定（識別子・表示名・地名キーワード・トレンド表・スコアリング設定）"""
+
+    def __init__(self, region_id, name, keywords, trends_path, scoring_config_path):
+        self.id = region_id
+        self.name = name
+        self.keywords = list(keywords)
+        self.trends_path = trends_path
+        self.scoring_config_path = scoring_config_path
+
+    def __repr__(self):
+        return f'Region({self.id!r})'
+
+
+def _normalize(text):
+    # PDFから抽出した会場名には途中に改行が入るため、空白を除いてから照合する
+    if not isinstance(text, str):
+        return ''
+    return _WHITESPACE_PATTERN.sub('', unicodedata.normalize('NFKC', text))
+
+
+class RegionIndex:
+    """開催場所の地名キーワードからイベントの地域を判定する
+
+    全キーワードを長い順に並べた1つの正規表現で走査するため、「釧路市阿寒町」のように
+    短いキーワード（釧路）を含む地名は長い方（阿寒）の地域として扱われる。
+    どのキーワードにも当たらない場合は最初の地域（既定の地域）とみなす。
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.default = self.regions[0]
+        self.positions = {region.id: i for i, region in enumerate(self.regions)}
+        self._keyword_regions = {}
+        for region in self.regions:
+            for keyword in region.keywords:
+                self._keyword_regions[_normalize(keyword)] = region.id
+        keywords = sorted(self._keyword_regions, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+        self._cache = {}
+
+    @classmethod
+    def from_csv(cls, csv_path=DEFAULT_REGIONS_PATH):
+        """Region,Name,Keywords,Trends,ScoringConfig 形式のCSVから読み込む（Keywordsは | 区切り）"""
+        df = pd.read_csv(csv_path, dtype=str).fillna('')
+        regions = [
+            Region(row.Region, row.Name, [k for k in row.Keywords.split('|') if k],
+                   row.Trends, row.ScoringConfig)
+            for row in df.itertuples(index=False)
+        ]
+        return cls(regions)
+
+    def get(self, region_id):
+        return self.regions[self.positions[region_id]]
+
+    def regions_for(self, location, subject=None):
+        """開催場所（無ければイベント名）から地域IDのタプルを返す"""
+        key = (location, subject)
+        if key not in self._cache:
+            matched = self._match(location) or self._match(subject) or (self.default.id,)
+            self._cache[key] = matched
+        return self._cache[key]
+
+    def _match(self, text):
+        text = _normalize(text)
+        if not text or self._pattern is None:
+            return ()
+        found = {self._keyword_regions[m.group(0)] for m in self._pattern.finditer(text)}
+        return tuple(region.id for region in self.regions if region.id in found)
+
+    def membership(self, locations, subjects):
+        """イベント×地域の所属行列（bool）を作る"""
+        matrix = np.zeros((len(locations), len(self.regions)), dtype=bool)
+        for i, (location, subject) in enumerate(zip(locations, subjects)):
+            for region_id in self.regions_for(location, subject):
+                matrix[i, self.positions[region_id]] = True
+        return matrix
+
+    def in_region(self, region_id, location, subject=None):
+        return region_id in self.regions_for(location, subject)
+
+
+@lru_cache(maxsize=None)
+def get_default_region_index():
+    return RegionIndex.from_csv()
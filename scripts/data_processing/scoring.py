@@ -0,0 +1,187 @@
+import copy
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SCORING_CONFIG_PATH = "data/processed/scoring_config.json"
+
+# イベントタイプごとのデフォルトスコア（参加者数0の場合）
+DEFAULT_EVENT_SCORES = {
+    "大会": 200,
+    "クルーズ": 50,
+    "コンサート": 100,
+    "イベント": 300,  # 霧フェスのような大規模イベント向け
+}
+
+# 日別スコア = intercept + Σ weights[特徴量] × 特徴量 で計算する
+FEATURE_NAMES = [
+    "holiday",  # 祝日なら1
+    "weekend",  # 土日なら1
+    "trend",  # 月ごとの観光トレンドスコア
+    "attendees",  # 推定参加者数 / 開催日数（クルーズ以外）
+    "cruise_attendees",  # 推定乗客数 / 開催日数（クルーズ）
+    "default_event",  # 参加者数不明のイベントのデフォルトスコア / 開催日数
+    "tournament_multiday",  # 複数日開催の大会: 参加者数 × (開催日数 - 1)
+    "national_tournament",  # 全国大会・500人以上の大会: 1 / 開催日数
+    "kiri_festival",  # 霧フェス: 1 / 開催日数
+    "long_weekend",  # 3連休以上の休日（最終日を除く）: min(連休日数 - 2, 5)
+    "bridge_day",  # 休日に挟まれた平日なら1
+]
+EVENT_FEATURE_NAMES = FEATURE_NAMES[3:9]
+
+DEFAULT_SCORING_CONFIG = {
+    "weights": {
+        "holiday": 50,  # 祝日は固定で50点
+        "weekend": 20,  # 土日は20点
+        "trend": 2,
+        "attendees": 1 / 5,
+        "cruise_attendees": 1 / 50,  # クルーズ船のウェイトを1/10に（宿泊客への影響少ない）
+        "default_event": 1,
+        "tournament_multiday": 1 / 10,
+        "national_tournament": 50,
+        "kiri_festival": 200,  # 霧フェスは特別に200点を日割り加算
+        "long_weekend": 15,  # 連休1日あたり15点（最大75点）
+        "bridge_day": 30,
+    },
+    "intercept": 0,
+    "thresholds": {"high": 1000, "medium": 300},
+}
+
+LONG_WEEKEND_MAX_UNITS = 5
+
+
+def load_scoring_config(path=DEFAULT_SCORING_CONFIG_PATH):
+    """スコアリング設定を読み込む（ファイルが無い・項目が欠けている場合は既定値で補う）"""
+    config = copy.deepcopy(DEFAULT_SCORING_CONFIG)
+    if path is None:
+        return config
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+    except FileNotFoundError:
+        return config
+    config["weights"].update(loaded.get("weights", {}))
+    config["thresholds"].update(loaded.get("thresholds", {}))
+    config["intercept"] = loaded.get("intercept", config["intercept"])
+    return config
+
+
+def weight_vector(config, names=FEATURE_NAMES):
+    return np.array([config["weights"][name] for name in names], dtype=np.float64)
+
+
+def event_components(event_type, subject, attendees, duration):
+    """イベント1件が開催期間中の各日に加える特徴量（EVENT_FEATURE_NAMES の順）"""
+    subject = subject if isinstance(subject, str) else ""
+    is_cruise = event_type == "クルーズ"
+    is_tournament = event_type == "大会"
+    default_score = DEFAULT_EVENT_SCORES.get(event_type, 100) / duration
+    return [
+        attendees / duration if attendees > 0 and not is_cruise else 0.0,
+        attendees / duration if attendees > 0 and is_cruise else 0.0,
+        0.0 if attendees > 0 else (default_score / 10 if is_cruise else default_score),
+        attendees * (duration - 1) if is_tournament and duration > 1 else 0.0,
+        1 / duration if is_tournament and ("全国" in subject or attendees >= 500) else 0.0,
+        1 / duration if "霧フェス" in subject or "KUSHIRO KIRI FESTIVAL" in subject else 0.0,
+    ]
+
+
+def calculate_event_score(event_type, subject, attendees, duration, config=None):
+    """イベント1件が開催期間中の1日あたりに加算するスコアを求める"""
+    config = config or DEFAULT_SCORING_CONFIG
+    components = event_components(event_type, subject, attendees, duration)
+    return float(np.dot(components, weight_vector(config, EVENT_FEATURE_NAMES)))
+
+
+def classify_impact(scores, config):
+    """スコア配列を High / Medium / Low に判定する"""
+    thresholds = config["thresholds"]
+    scores = np.asarray(scores)
+    return np.where(
+        scores >= thresholds["high"],
+        "High",
+        np.where(scores >= thresholds["medium"], "Medium", "Low"),
+    )
+
+
+class EventIntervalIndex:
+    """イベントを開催期間（期間先頭からの日数オフセット）と特徴量ベクトルの配列で保持する"""
+
+    def __init__(self, df_events, horizon_start, n_days):
+        self.horizon_start = horizon_start
+        self.n_days = n_days
+        self.events = df_events.reset_index(drop=True)
+
+        start_dates = self.events["StartDate"].dt.normalize()
+        end_dates = self.events["EndDate"].dt.normalize()
+        horizon = pd.Timestamp(horizon_start)
+        self.start = (start_dates - horizon).dt.days.to_numpy(dtype=np.int64)
+        self.end = (end_dates - horizon).dt.days.to_numpy(dtype=np.int64)
+        self.duration = self.end - self.start + 1
+
+        attendees = self.events["EstimatedAttendees"].fillna(0).to_numpy()
+        self.components = np.array(
+            [
+                event_components(event_type, subject, att, duration)
+                for event_type, subject, att, duration in zip(
+                    self.events["EventType"], self.events["Subject"], attendees, self.duration
+                )
+            ],
+            dtype=np.float64,
+        ).reshape(len(self.events), len(EVENT_FEATURE_NAMES))
+
+    def __len__(self):
+        return len(self.events)
+
+    def daily_components(self, mask=None):
+        """各日の（開催中イベントの）特徴量合計。差分配列と累積和で求める"""
+        start, end, components = self.start, self.end, self.components
+        if mask is not None:
+            start, end, components = start[mask], end[mask], components[mask]
+        diff = np.zeros((self.n_days + 1, components.shape[1]))
+        np.add.at(diff, np.clip(start, 0, self.n_days), components)
+        np.add.at(diff, np.clip(end + 1, 0, self.n_days), -components)
+        return np.cumsum(diff, axis=0)[: self.n_days]
+
+    def event_day_pairs(self):
+        """(日オフセット, イベント番号) の組を日付順・CSV行順に返す"""
+        clipped_start = np.clip(self.start, 0, self.n_days)
+        clipped_end = np.clip(self.end + 1, 0, self.n_days)
+        lengths = np.maximum(clipped_end - clipped_start, 0)
+        event_ids = np.repeat(np.arange(len(self.events)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        days = np.repeat(clipped_start, lengths) + offsets
+        order = np.lexsort((event_ids, days))
+        return days[order], event_ids[order]
+
+
+def build_calendar_features(event_index, holiday_dates, monthly_trends, offday_index):
+    """日×特徴量の設計行列（FEATURE_NAMES の列順）を作成する"""
+    n_days = event_index.n_days
+    dates = [event_index.horizon_start + timedelta(days=i) for i in range(n_days)]
+
+    features = np.zeros((n_days, len(FEATURE_NAMES)))
+    features[:, 0] = [d in holiday_dates for d in dates]
+    features[:, 1] = [d.weekday() >= 5 for d in dates]
+    features[:, 2] = [monthly_trends.get(d.strftime("%Y-%m"), 0) for d in dates]
+    features[:, 3:9] = event_index.daily_components()
+
+    run_length = offday_index.run_length[:n_days].astype(np.int64)
+    run_position = offday_index.run_position[:n_days]
+    long_weekend = (run_length >= 3) & (run_position < run_length)
+    features[:, 9] = np.where(
+        long_weekend, np.minimum(run_length - 2, LONG_WEEKEND_MAX_UNITS), 0
+    )
+    features[:, 10] = offday_index.is_bridge[:n_days]
+    return features
+
+
+def score_features(features, config):
+    return features @ weight_vector(config) + config.get("intercept", 0)
+
+
+def horizon_dates(start_year, end_year):
+    start = date(start_year, 1, 1)
+    return start, (date(end_year, 12, 31) - start).days + 1
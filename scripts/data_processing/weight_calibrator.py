@@ -0,0 +1,254 @@
+import argparse
+import json
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from calendar_generator import (
+    build_scoring_inputs,
+    filter_region,
+    load_events,
+    load_monthly_trends,
+)
+from holiday_parser import HolidayParser
+from scoring import (
+    DEFAULT_SCORING_CONFIG,
+    DEFAULT_SCORING_CONFIG_PATH,
+    FEATURE_NAMES,
+    weight_vector,
+)
+
+DEFAULT_REPORT_PATH = "data/processed/calibration_report.json"
+DEFAULT_ALPHAS = [0.0, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0]
+
+
+def load_occupancy(occupancy_csv_path, target_column="occupancy"):
+    """日別の稼働実績CSV（date, occupancy[, adr] 列）を読み込む"""
+    df = pd.read_csv(occupancy_csv_path)
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+    df = df.dropna(subset=["date", target_column])
+    target = df[target_column].astype(float)
+    # 稼働率が % 表記の場合は 0〜1 に揃える
+    if target_column == "occupancy" and target.max() > 1.5:
+        target = target / 100
+    return pd.Series(target.to_numpy(), index=df["date"].dt.date).groupby(level=0).mean()
+
+
+def _standardize(features):
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def fit_ridge_path(features, target, alphas):
+    """全ての正則化係数について一度の固有値分解でリッジ回帰を解く（切片は正則化しない）
+
+    戻り値は (元の特徴量スケールの重み [alpha × 特徴量], 切片 [alpha])。
+    """
+    mean, scale = _standardize(features)
+    standardized = (features - mean) / scale
+    target_mean = target.mean()
+    centered_target = target - target_mean
+
+    eigenvalues, eigenvectors = np.linalg.eigh(standardized.T @ standardized)
+    projected = eigenvectors.T @ (standardized.T @ centered_target)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    # 固有値が0の方向（常に0の特徴量など）は解を0にする
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shrink = np.where(
+            eigenvalues[None, :] + alphas[:, None] > 1e-12,
+            1.0 / (eigenvalues[None, :] + alphas[:, None]),
+            0.0,
+        )
+    standardized_weights = (shrink * projected[None, :]) @ eigenvectors.T
+    weights = standardized_weights / scale[None, :]
+    intercepts = target_mean - weights @ mean
+    return weights, intercepts
+
+
+def _fold_errors(args):
+    """1つのCVフォールドについて、全alphaの検証二乗誤差平均を返す（プロセスプールで実行）"""
+    features, target, train_mask, alphas = args
+    weights, intercepts = fit_ridge_path(features[train_mask], target[train_mask], alphas)
+    predictions = features[~train_mask] @ weights.T + intercepts[None, :]
+    residuals = predictions - target[~train_mask][:, None]
+    return (residuals ** 2).mean(axis=0)
+
+
+def cross_validate(features, target, alphas, n_folds=5, max_workers=None, seed=0):
+    """K分割交差検証。各フォールドはプロセスプールで並列に計算する"""
+    rng = np.random.default_rng(seed)
+    fold_ids = rng.permutation(len(target)) % n_folds
+    tasks = [(features, target, fold_ids != fold, alphas) for fold in range(n_folds)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        fold_errors = np.array(list(executor.map(_fold_errors, tasks)))
+    return fold_errors.mean(axis=0)
+
+
+def best_threshold(scores, labels):
+    """ラベルの F1 が最大となるスコア閾値（score >= 閾値 を陽性とする）を返す"""
+    if not labels.any():
+        return float(scores.max()) + 1.0, 0.0
+    order = np.argsort(-scores)
+    sorted_scores = scores[order]
+    true_positives = np.cumsum(labels[order])
+    predicted_positives = np.arange(1, len(scores) + 1)
+    f1 = 2 * true_positives / (predicted_positives + labels.sum())
+    # 同じスコアが続く場合はその最後の位置でしか区切れない
+    valid = np.append(sorted_scores[1:] < sorted_scores[:-1], True)
+    f1 = np.where(valid, f1, -1)
+    best = int(np.argmax(f1))
+    return float(sorted_scores[best]), float(f1[best])
+
+
+def _spearman(a, b):
+    rank_a = pd.Series(a).rank().to_numpy()
+    rank_b = pd.Series(b).rank().to_numpy()
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return 0.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def calibrate(
+    features,
+    target,
+    alphas=DEFAULT_ALPHAS,
+    n_folds=5,
+    high_quantile=0.9,
+    medium_quantile=0.6,
+    max_workers=None,
+):
+    """設計行列と実績から重み・閾値を推定し、(スコアリング設定, 適合レポート) を返す"""
+    started = time.perf_counter()
+    # 全日で0の特徴量（期間内に霧フェスが無い等）は推定できないため既定の重みを換算して残す
+    active = features.std(axis=0) > 0
+    active_features = features[:, active]
+
+    cv_errors = cross_validate(active_features, target, alphas, n_folds, max_workers)
+    best_alpha = float(alphas[int(np.argmin(cv_errors))])
+    weights, intercepts = fit_ridge_path(active_features, target, [best_alpha])
+    weights, intercept = weights[0], float(intercepts[0])
+    predictions = active_features @ weights + intercept
+
+    # 実績の上位 high_quantile / medium_quantile を High / Medium とみなして閾値を決める
+    high_labels = target >= np.quantile(target, high_quantile)
+    medium_labels = target >= np.quantile(target, medium_quantile)
+    high_threshold, high_f1 = best_threshold(predictions, high_labels)
+    medium_threshold, medium_f1 = best_threshold(predictions, medium_labels)
+    medium_threshold = min(medium_threshold, high_threshold)
+
+    # 実績の単位（稼働率など）のままだと既存の表示と桁が合わないため、High 閾値が
+    # 既定の1000点になるようにスコア全体を拡大する
+    default_high = DEFAULT_SCORING_CONFIG["thresholds"]["high"]
+    scale = default_high / high_threshold if high_threshold > 0 else 1.0
+
+    # 推定できなかった特徴量の既定の重みは既定のスコアの単位のままなので、学習期間の
+    # 既定スコアと推定後スコアの散らばりの比で推定後のスコアの単位に換算する
+    default_scores = features @ weight_vector(DEFAULT_SCORING_CONFIG)
+    default_spread = default_scores.std()
+    default_weight_scale = float((predictions * scale).std() / default_spread) if default_spread > 0 else 1.0
+
+    tuned_weights = {
+        name: float(weight * default_weight_scale) for name, weight in DEFAULT_SCORING_CONFIG["weights"].items()
+    }
+    for name, weight in zip(np.array(FEATURE_NAMES)[active], weights):
+        tuned_weights[name] = float(weight * scale)
+    config = {
+        "weights": tuned_weights,
+        "intercept": intercept * scale,
+        "thresholds": {
+            "high": default_high if high_threshold > 0 else high_threshold,
+            "medium": medium_threshold * scale,
+        },
+    }
+
+    residuals = predictions - target
+    total_variance = ((target - target.mean()) ** 2).sum()
+    report = {
+        "n_days": int(len(target)),
+        "n_features": int(active.sum()),
+        "fixed_features": [name for name, used in zip(FEATURE_NAMES, active) if not used],
+        "alphas": [float(a) for a in alphas],
+        "cv_mse": [float(e) for e in cv_errors],
+        "best_alpha": best_alpha,
+        "r2": float(1 - (residuals ** 2).sum() / total_variance) if total_variance > 0 else 0.0,
+        "rmse": float(np.sqrt((residuals ** 2).mean())),
+        "spearman": _spearman(predictions, target),
+        "high_f1": high_f1,
+        "medium_f1": medium_f1,
+        "score_scale": scale,
+        "default_weight_scale": default_weight_scale,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    return config, report
+
+
+def run_calibration(
+    occupancy_csv_path,
+    events_csv_path="data/processed/combined_events.csv",
+    target_column="occupancy",
+    config_path=DEFAULT_SCORING_CONFIG_PATH,
+    report_path=DEFAULT_REPORT_PATH,
+    n_folds=5,
+    max_workers=None,
+):
+    """実績CSVに対して重みを推定し、スコアリング設定と適合レポートを書き出す"""
+    occupancy = load_occupancy(occupancy_csv_path, target_column)
+    if occupancy.empty:
+        print("❌ 実績データがありません。")
+        return None
+
+    start_year, end_year = min(occupancy.index).year, max(occupancy.index).year
+    _, _, _, features = build_scoring_inputs(
+        filter_region(load_events(events_csv_path)),
+        start_year,
+        end_year,
+        HolidayParser(),
+        load_monthly_trends(),
+    )
+    # 設計行列は期間全体で一度だけ作り、実績のある日の行を取り出す
+    offsets = np.array(
+        [(d - pd.Timestamp(start_year, 1, 1).date()).days for d in occupancy.index]
+    )
+    config, report = calibrate(
+        features[offsets], occupancy.to_numpy(), n_folds=n_folds, max_workers=max_workers
+    )
+
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+    print(
+        f"✅ 重みを推定しました（{report['n_days']}日, alpha={report['best_alpha']}, "
+        f"R²={report['r2']:.3f}, {report['elapsed_seconds']}秒）。"
+    )
+    print(f"   スコアリング設定: {config_path} / 適合レポート: {report_path}")
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="稼働実績に合わせてスコアの重みと閾値を推定する")
+    parser.add_argument("occupancy_csv", help="date, occupancy[, adr] 列を持つ日別実績CSV")
+    parser.add_argument("--target", default="occupancy", help="目的変数の列名（occupancy, adr など）")
+    parser.add_argument("--events", default="data/processed/combined_events.csv")
+    parser.add_argument("--config", default=DEFAULT_SCORING_CONFIG_PATH)
+    parser.add_argument("--report", default=DEFAULT_REPORT_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    run_calibration(
+        args.occupancy_csv,
+        args.events,
+        args.target,
+        args.config,
+        args.report,
+        args.folds,
+        args.jobs,
+    )
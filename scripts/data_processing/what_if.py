@@ -0,0 +1,381 @@
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from calendar_generator import build_scoring_inputs, filter_region, load_events, load_monthly_trends
+from holiday_parser import HolidayParser
+from scoring import (
+    EVENT_FEATURE_NAMES,
+    FEATURE_NAMES,
+    classify_impact,
+    event_components,
+    load_scoring_config,
+    weight_vector,
+)
+
+EVENTS_CSV = "data/processed/combined_events.csv"
+DEFAULT_PORT = 8765
+EVENT_FIELDS = ["event_type", "subject", "start", "end", "attendees", "location"]
+
+
+class WhatIfSession:
+    """イベントごとの1日あたりスコアと基礎スコア（祝日・土日・トレンド・連休）をメモリに保持し、
+    イベントの追加・削除・移動・期間変更を、そのイベントが掛かる日だけの更新で反映する"""
+
+    def __init__(self, df_events, start_year, end_year, config=None, holiday_parser=None, monthly_trends=None):
+        self.config = config or load_scoring_config()
+        event_index, _, _, features = build_scoring_inputs(
+            df_events,
+            start_year,
+            end_year,
+            holiday_parser or HolidayParser(),
+            monthly_trends if monthly_trends is not None else load_monthly_trends(),
+        )
+        self.horizon_start = event_index.horizon_start
+        self.n_days = event_index.n_days
+        self.event_weights = weight_vector(self.config, EVENT_FEATURE_NAMES)
+
+        is_event_feature = np.isin(FEATURE_NAMES, EVENT_FEATURE_NAMES)
+        weights = weight_vector(self.config)
+        self.base_scores = features[:, ~is_event_feature] @ weights[~is_event_feature]
+        self.base_scores += self.config.get("intercept", 0)
+        self.base_scores.setflags(write=False)
+        self.scores = features @ weights + self.config.get("intercept", 0)
+        self.impact = classify_impact(self.scores, self.config).astype(object)
+
+        # イベントの属性と1日あたりのスコア（開催期間中は毎日同じ値）
+        events = event_index.events
+        daily_scores = event_index.components @ self.event_weights
+        self.events = [
+            {
+                "event_type": str(event_type),
+                "subject": subject if isinstance(subject, str) else "",
+                "start": int(start),
+                "end": int(end),
+                "attendees": int(attendees),
+                "location": location if isinstance(location, str) else "",
+                "daily_score": float(daily_score),
+                "active": True,
+            }
+            for event_type, subject, start, end, attendees, location, daily_score in zip(
+                events["EventType"].astype(object),
+                events["Subject"].astype(object),
+                event_index.start,
+                event_index.end,
+                events["EstimatedAttendees"].fillna(0).to_numpy(),
+                events["Location"].astype(object),
+                daily_scores,
+            )
+        ]
+        self._journal = []  # 元に戻すための (イベント番号, 変更前の状態)
+
+    def date_at(self, offset):
+        return self.horizon_start + timedelta(days=offset)
+
+    def offset_of(self, value):
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        return (value - self.horizon_start).days
+
+    def _clip(self, start, end):
+        return max(start, 0), min(end + 1, self.n_days)
+
+    def _daily_score(self, event):
+        duration = event["end"] - event["start"] + 1
+        components = event_components(event["event_type"], event["subject"], event["attendees"], duration)
+        return float(np.dot(components, self.event_weights))
+
+    def _replace(self, event_id, new_event, record=True):
+        """イベントの状態を置き換える。戻り値は変化し得る日の {日: (変更前のスコア, 変更前の影響度)}"""
+        old_event = self.events[event_id] if event_id < len(self.events) else None
+        deltas = []  # (開始, 終了+1, 加算する値)
+        if old_event is not None and old_event["active"]:
+            deltas.append((*self._clip(old_event["start"], old_event["end"]), -old_event["daily_score"]))
+        new_event["daily_score"] = self._daily_score(new_event)
+        if new_event["active"]:
+            deltas.append((*self._clip(new_event["start"], new_event["end"]), new_event["daily_score"]))
+
+        before = {}
+        for lo, hi, _ in deltas:
+            for offset in range(lo, hi):
+                before.setdefault(offset, (float(self.scores[offset]), self.impact[offset]))
+        for lo, hi, delta in deltas:
+            self.scores[lo:hi] += delta
+        # 影響度は変化した日だけ判定し直す
+        for lo, hi, _ in deltas:
+            self.impact[lo:hi] = classify_impact(self.scores[lo:hi], self.config)
+
+        if old_event is None:
+            self.events.append(new_event)
+        else:
+            self.events[event_id] = new_event
+        if record:
+            self._journal.append((event_id, old_event))
+        return before
+
+    def add_event(self, event_type, subject, start, end, attendees=0, location=""):
+        event = {
+            "event_type": event_type,
+            "subject": subject,
+            "start": self.offset_of(start),
+            "end": self.offset_of(end),
+            "attendees": int(attendees),
+            "location": location,
+            "active": True,
+        }
+        if event["end"] < event["start"]:
+            raise ValueError("終了日が開始日より前です")
+        return len(self.events), self._replace(len(self.events), event)
+
+    def update_event(self, event_id, **changes):
+        """イベントの属性（種別・件名・開始日・終了日・参加者数・場所・有効/無効）を変更する"""
+        event = dict(self._event(event_id))
+        for field, value in changes.items():
+            if field in ("start", "end"):
+                value = self.offset_of(value)
+            elif field == "attendees":
+                value = int(value)
+            elif field not in EVENT_FIELDS and field != "active":
+                raise ValueError(f"変更できない項目です: {field}")
+            event[field] = value
+        if event["end"] < event["start"]:
+            raise ValueError("終了日が開始日より前です")
+        return self._replace(event_id, event)
+
+    def remove_event(self, event_id):
+        return self.update_event(event_id, active=False)
+
+    def move_event(self, event_id, days):
+        event = self._event(event_id)
+        return self.update_event(
+            event_id, start=self.date_at(event["start"] + days), end=self.date_at(event["end"] + days)
+        )
+
+    def resize_event(self, event_id, start=None, end=None):
+        event = self._event(event_id)
+        return self.update_event(
+            event_id,
+            start=start if start is not None else self.date_at(event["start"]),
+            end=end if end is not None else self.date_at(event["end"]),
+        )
+
+    def _event(self, event_id):
+        if not 0 <= event_id < len(self.events):
+            raise KeyError(f"イベント番号 {event_id} はありません")
+        return self.events[event_id]
+
+    def undo(self):
+        """最後の変更を取り消す"""
+        event_id, old_event = self._journal.pop()
+        if old_event is None:
+            self._replace(event_id, {**self.events[event_id], "active": False}, record=False)
+            self.events.pop()
+        else:
+            self._replace(event_id, old_event, record=False)
+
+    def apply(self, operation):
+        """{"op": "add" | "remove" | "move" | "resize" | "update", ...} の形の操作を適用する"""
+        operation = dict(operation)
+        op = operation.pop("op")
+        if op == "add":
+            _, before = self.add_event(**operation)
+            return before
+        event_id = int(operation.pop("event"))
+        if op == "remove":
+            return self.remove_event(event_id)
+        if op == "move":
+            return self.move_event(event_id, int(operation["days"]))
+        if op == "resize":
+            return self.resize_event(event_id, operation.get("start"), operation.get("end"))
+        if op == "update":
+            return self.update_event(event_id, **operation)
+        raise ValueError(f"不明な操作です: {op}")
+
+    def evaluate(self, operations, keep=False):
+        """操作をまとめて適用し、スコアか影響度が変わった日の一覧を返す（keep=False なら適用後に元に戻す）"""
+        started = time.perf_counter()
+        journal_size = len(self._journal)
+        before = {}
+        try:
+            for operation in operations:
+                for offset, state in self.apply(operation).items():
+                    before.setdefault(offset, state)
+            changes = [
+                {
+                    "date": self.date_at(offset).strftime("%Y-%m-%d"),
+                    "score_before": round(score, 2),
+                    "score": round(float(self.scores[offset]), 2),
+                    "impact_before": impact,
+                    "impact": self.impact[offset],
+                }
+                for offset, (score, impact) in sorted(before.items())
+                if abs(self.scores[offset] - score) > 1e-9 or self.impact[offset] != impact
+            ]
+        finally:
+            if not keep:
+                while len(self._journal) > journal_size:
+                    self.undo()
+        return {"changes": changes, "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def day(self, offset):
+        return {
+            "date": self.date_at(offset).strftime("%Y-%m-%d"),
+            "score": round(float(self.scores[offset]), 2),
+            "base_score": round(float(self.base_scores[offset]), 2),
+            "impact": self.impact[offset],
+            "events": self.events_on(offset),
+        }
+
+    def days(self, start, end):
+        lo, hi = self._clip(self.offset_of(start), self.offset_of(end))
+        return [self.day(offset) for offset in range(lo, hi)]
+
+    def events_on(self, offset):
+        return [
+            event_id
+            for event_id, event in enumerate(self.events)
+            if event["active"] and event["start"] <= offset <= event["end"]
+        ]
+
+    def event(self, event_id):
+        event = self._event(event_id)
+        return {
+            "id": event_id,
+            "event_type": event["event_type"],
+            "subject": event["subject"],
+            "start": self.date_at(event["start"]).strftime("%Y-%m-%d"),
+            "end": self.date_at(event["end"]).strftime("%Y-%m-%d"),
+            "attendees": event["attendees"],
+            "location": event["location"],
+            "daily_score": round(event["daily_score"], 2),
+            "active": event["active"],
+        }
+
+    def find(self, query=""):
+        return [
+            self.event(event_id)
+            for event_id, event in enumerate(self.events)
+            if event["active"] and query in event["subject"]
+        ]
+
+
+def load_session(events_csv_path=EVENTS_CSV, start_year=2025, end_year=2026, region=None):
+    """カレンダー生成と同じイベント（対象地域・有効な日付のもの）でセッションを作る"""
+    return WhatIfSession(filter_region(load_events(events_csv_path), region), start_year, end_year)
+
+
+def make_handler(session):
+    """1つのセッションを共有するHTTPハンドラ（変更は /what-if の応答後に元に戻す）"""
+    lock = threading.Lock()
+
+    class WhatIfHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                with lock:
+                    if url.path == "/events":
+                        payload = session.find(query.get("q", ""))
+                    elif url.path == "/days":
+                        payload = session.days(query["start"], query["end"])
+                    else:
+                        self._send_json(404, {"error": f"{url.path} はありません"})
+                        return
+            except (KeyError, ValueError) as e:
+                self._send_json(400, {"error": str(e.args[0]) if e.args else str(e)})
+                return
+            self._send_json(200, payload)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/what-if":
+                self._send_json(404, {"error": f"{self.path} はありません"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                operations = request.get("operations", [])
+                with lock:
+                    payload = session.evaluate(operations)
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json(400, {"error": str(e.args[0]) if e.args else str(e)})
+                return
+            self._send_json(200, payload)
+
+    return WhatIfHandler
+
+
+def serve(session, host="127.0.0.1", port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), make_handler(session))
+    print(f"✅ what-if API を http://{host}:{port} で起動しました（Ctrl+C で終了）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _operations_from_args(args):
+    operations = []
+    for event_id in args.remove or []:
+        operations.append({"op": "remove", "event": event_id})
+    for event_id, days in args.move or []:
+        operations.append({"op": "move", "event": int(event_id), "days": int(days)})
+    for event_id, start, end in args.resize or []:
+        operations.append({"op": "resize", "event": int(event_id), "start": start, "end": end})
+    for event_type, subject, start, end, attendees in args.add or []:
+        operations.append(
+            {"op": "add", "event_type": event_type, "subject": subject, "start": start, "end": end,
+             "attendees": int(attendees)}
+        )
+    return operations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="イベントを追加・削除・移動したときのスコアの変化を求める")
+    parser.add_argument("--events", default=EVENTS_CSV)
+    parser.add_argument("--start-year", type=int, default=2025)
+    parser.add_argument("--end-year", type=int, default=2026)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    find_parser = subparsers.add_parser("find", help="件名でイベントを探す（イベント番号を表示）")
+    find_parser.add_argument("query", nargs="?", default="")
+
+    run_parser = subparsers.add_parser("run", help="操作を適用して変化した日を表示する")
+    run_parser.add_argument("--remove", type=int, action="append", metavar="ID")
+    run_parser.add_argument("--move", nargs=2, action="append", metavar=("ID", "DAYS"))
+    run_parser.add_argument("--resize", nargs=3, action="append", metavar=("ID", "START", "END"))
+    run_parser.add_argument("--add", nargs=5, action="append", metavar=("TYPE", "SUBJECT", "START", "END", "ATTENDEES"))
+
+    serve_parser = subparsers.add_parser("serve", help="ローカルのHTTP APIとして起動する")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    what_if_session = load_session(args.events, args.start_year, args.end_year)
+    if args.command == "find":
+        for event in what_if_session.find(args.query):
+            print(f"[{event['id']}] {event['start']}〜{event['end']} {event['event_type']} "
+                  f"{event['subject']} ({event['daily_score']}点/日)")
+    elif args.command == "run":
+        result = what_if_session.evaluate(_operations_from_args(args))
+        for change in result["changes"]:
+            print(f"{change['date']}: {change['score_before']} → {change['score']} "
+                  f"({change['impact_before']} → {change['impact']})")
+        print(f"{len(result['changes'])}日が変化しました（{result['elapsed_ms']}ms）")
+    else:
+        serve(what_if_session, args.host, args.port)
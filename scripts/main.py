@@ -1,44 +1,217 @@
 import sys
 import os
 import json
+import argparse
 
 # 親ディレクトリをパスに追加
 sys.path.append(os.path.join(os.path.dirname(__file__), 'data_processing'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'data_collection'))
 
+from pipeline import Stage, Pipeline
+from watcher import watch
 from tourism_trends_processor import process_tourism_trends
 from combine_csv import run_combine_csv
 from calendar_generator import generate_calendar_data
+from pending_demand import apply_pending_demand
+from feature_builder import run_feature_builder, default_feature_table_path
+from calendar_renderer import run_calendar_renderer, INDEX_HTML_PATH, CALENDAR_DETAILS_PATH
+from scoring import DEFAULT_SCORING_CONFIG_PATH
+from backtest import take_snapshot, SNAPSHOT_INDEX
+from calendar_history import record_calendar_version, HISTORY_DIR
+from region_index import get_default_region_index, DEFAULT_REGIONS_PATH
+from holiday_parser import HOLIDAY_CSV_PATH
+from region_calendars import generate_region_calendars, region_calendar_path
+from event_search import build_search_index, SEARCH_INDEX_PATH
+from event_loader import default_quarantine_path
+from peak_periods import run_peak_periods, PEAK_PERIODS_PATH
+from asset_publisher import publish_assets, PUBLISHED_ASSETS, MANIFEST_PATH
+from calendar_tables import export_calendar_tables, arrow_table_paths, has_pyarrow, ARROW_DIR, SHARED_CALENDAR_NAME
+
+# 入出力ファイル
+TOURISM_TRENDS_RAW = 'data/raw/tourism_trends_raw_data.txt'
+CONCERT_RAW = 'data/raw/concert_raw_data.txt'
+MONTHLY_TRENDS_JSON = 'data/processed/monthly_tourism_trends.json'
+CRUISE_CSV = 'data/processed/r7-cruise_converted.csv'
+CON_CSV = 'data/processed/r7-con_converted.csv'
+EV_CSV = 'data/processed/r7-ev_converted.csv'
+CONCERT_CSV = 'data/processed/r7-concert_converted.csv'
+CON_PENDING_JSON = 'data/processed/r7-con_pending.json'
+EV_PENDING_JSON = 'data/processed/r7-ev_pending.json'
+COMBINED_EVENTS_CSV = 'data/processed/combined_events.csv'
+COMBINED_QUARANTINE_CSV = default_quarantine_path(COMBINED_EVENTS_CSV)
+CALENDAR_JSON = 'data/processed/calendar_data.json'
+FEATURE_TABLE = default_feature_table_path()
+# weight_calibrator.py で推定したスコアリング設定（無ければ既定の重みを使う）
+SCORING_CONFIG_JSON = DEFAULT_SCORING_CONFIG_PATH
+CALENDAR_HISTORY_LOG = os.path.join(HISTORY_DIR, 'versions.jsonl')
+# 開催場所から地域（釧路市・阿寒・弟子屈）を判定するための地名キーワードと地域ごとの設定
+REGIONS_CSV = DEFAULT_REGIONS_PATH
+
+WATCH_DIRS = ['data/raw', 'data/processed']
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CRUISE_URL = "https://www.city.kushiro.lg.jp/sangyou/umisora/1006541/1006592/1006593.html"
+# 年度ごとの入港予定ページ（取得した行は (船名, 入港日) ごとに CRUISE_CSV へ反映される）
+CRUISE_URLS = [CRUISE_URL]
+START_YEAR = 2025
+END_YEAR = 2026
+# 需要ピーク期間: 上位を求める連泊の日数と、日数ごとの件数
+PEAK_WINDOWS = [2, 3, 7]
+PEAK_TOP_K = 10
+
+
+def run_tourism_trends():
+    monthly_tourism_trends = process_tourism_trends(TOURISM_TRENDS_RAW)
+    if not monthly_tourism_trends:
+        print("❌ 月ごとの観光トレンドデータを取得できませんでした。")
+        return False
+    with open(MONTHLY_TRENDS_JSON, 'w', encoding='utf-8') as f:
+        json.dump(monthly_tourism_trends, f, ensure_ascii=False, indent=4)
+    print(f"✅ 月ごとの観光トレンドデータを {MONTHLY_TRENDS_JSON} に保存しました。")
+
+
+def run_concert():
+    from concert_processor import run_concert_processor
+    run_concert_processor(CONCERT_RAW, CONCERT_CSV)
+
+
+def run_cruise():
+    from cruise_scraper import crawl_cruise_schedules
+    return crawl_cruise_schedules(CRUISE_URLS, CRUISE_CSV) is not None
+
+
+def run_generate_calendar(shm_name=None):
+    calendar_output = generate_calendar_data(COMBINED_EVENTS_CSV, START_YEAR, END_YEAR)
+    # 日程未定イベントの期待スコアとP10/P90の帯を各日に追加
+    apply_pending_demand(calendar_output, [CON_PENDING_JSON, EV_PENDING_JSON])
+    calendar_output.write_json(CALENDAR_JSON)
+    print(f"✅ カレンダーデータを {CALENDAR_JSON} に生成しました。")
+    # 価格エンジンなど別プロセスの利用者が JSON を解析せずに読めるよう、日・イベントの表も書き出す
+    export_calendar_tables(calendar_output, ARROW_DIR, shm_name)
+
+
+def run_region_calendars():
+    generate_region_calendars(COMBINED_EVENTS_CSV, START_YEAR, END_YEAR,
+                              pending_paths=[CON_PENDING_JSON, EV_PENDING_JSON])
+
+
+def run_snapshot():
+    # バックテスト用に、統合イベントCSVとその入力の版を保存する
+    take_snapshot([COMBINED_EVENTS_CSV, CRUISE_CSV, CON_CSV, EV_CSV, CONCERT_CSV,
+                   CON_PENDING_JSON, EV_PENDING_JSON, MONTHLY_TRENDS_JSON])
+
+
+def source(*relative_paths):
+    """ステージの処理を定義するソースファイルのパス（変更検知用）"""
+    return [os.path.relpath(os.path.join(SCRIPTS_DIR, path)) for path in relative_paths]
+
+
+def build_pipeline(collect=False, shm_name=None):
+    """パイプラインのステージ定義（入力と出力からDAGを組み立てる）"""
+    regions = get_default_region_index()
+    # 地域ごとのトレンド表・スコアリング設定（無い地域は釧路市のものを使う）
+    region_settings = sorted({path for region in regions.regions
+                              for path in (region.trends_path, region.scoring_config_path)})
+    stages = [
+        Stage('trends', run_tourism_trends,
+              inputs=[TOURISM_TRENDS_RAW], outputs=[MONTHLY_TRENDS_JSON],
+              code=source('data_processing/tourism_trends_processor.py')),
+        Stage('concert', run_concert,
+              inputs=[CONCERT_RAW], outputs=[CONCERT_CSV],
+              code=source('data_collection/concert_processor.py', 'data_processing/capacity_registry.py')),
+        Stage('combine', run_combine_csv,
+              inputs=[CRUISE_CSV, CON_CSV, EV_CSV, CONCERT_CSV],
+              outputs=[COMBINED_EVENTS_CSV, COMBINED_QUARANTINE_CSV],
+              code=source('data_processing/combine_csv.py', 'data_processing/capacity_registry.py',
+                          'data_processing/event_loader.py')),
+        Stage('generate', lambda: run_generate_calendar(shm_name),
+              inputs=[COMBINED_EVENTS_CSV, MONTHLY_TRENDS_JSON, CON_PENDING_JSON, EV_PENDING_JSON,
+                      SCORING_CONFIG_JSON, REGIONS_CSV, HOLIDAY_CSV_PATH],
+              # Arrow IPC ファイルは pyarrow がある場合のみ出力される
+              outputs=[CALENDAR_JSON] + (arrow_table_paths(ARROW_DIR) if has_pyarrow() else []),
+              params={'start_year': START_YEAR, 'end_year': END_YEAR, 'shm': shm_name},
+              code=source('data_processing/calendar_generator.py', 'data_processing/holiday_parser.py',
+                          'data_processing/offday_runs.py', 'data_processing/pending_demand.py',
+                          'data_processing/scoring.py', 'data_processing/region_index.py',
+                          'data_processing/event_loader.py', 'data_processing/calendar_records.py',
+                          'data_processing/calendar_tables.py')),
+        Stage('regions', run_region_calendars,
+              inputs=[COMBINED_EVENTS_CSV, CON_PENDING_JSON, EV_PENDING_JSON, REGIONS_CSV, HOLIDAY_CSV_PATH]
+                     + region_settings,
+              outputs=[region_calendar_path(region.id) for region in regions.regions],
+              params={'start_year': START_YEAR, 'end_year': END_YEAR},
+              code=source('data_processing/region_calendars.py', 'data_processing/calendar_generator.py',
+                          'data_processing/pending_demand.py', 'data_processing/scoring.py',
+                          'data_processing/region_index.py', 'data_processing/event_loader.py',
+                          'data_processing/calendar_records.py')),
+        Stage('features', lambda: run_feature_builder(CALENDAR_JSON, FEATURE_TABLE),
+              inputs=[CALENDAR_JSON], outputs=[FEATURE_TABLE],
+              code=source('data_processing/feature_builder.py', 'data_processing/offday_runs.py')),
+        Stage('render', lambda: run_calendar_renderer(CALENDAR_JSON, INDEX_HTML_PATH, CALENDAR_DETAILS_PATH),
+              inputs=[CALENDAR_JSON], outputs=[INDEX_HTML_PATH, CALENDAR_DETAILS_PATH],
+              code=source('data_processing/calendar_renderer.py')),
+        Stage('peaks', lambda: run_peak_periods(CALENDAR_JSON, PEAK_PERIODS_PATH, PEAK_WINDOWS, PEAK_TOP_K),
+              inputs=[CALENDAR_JSON], outputs=[PEAK_PERIODS_PATH],
+              params={'windows': PEAK_WINDOWS, 'top_k': PEAK_TOP_K},
+              code=source('data_processing/peak_periods.py')),
+        Stage('search', lambda: build_search_index(COMBINED_EVENTS_CSV, SEARCH_INDEX_PATH),
+              inputs=[COMBINED_EVENTS_CSV, REGIONS_CSV], outputs=[SEARCH_INDEX_PATH],
+              code=source('data_processing/event_search.py', 'data_processing/calendar_generator.py',
+                          'data_processing/region_index.py', 'data_processing/event_loader.py')),
+        # GitHub Pages で配信するデータを最小化・圧縮し、内容ハッシュ付きのファイル名で書き出す
+        Stage('publish', publish_assets,
+              inputs=list(PUBLISHED_ASSETS.values()), outputs=[MANIFEST_PATH],
+              code=source('data_processing/asset_publisher.py')),
+        Stage('history', lambda: record_calendar_version(CALENDAR_JSON, HISTORY_DIR),
+              inputs=[CALENDAR_JSON], outputs=[CALENDAR_HISTORY_LOG],
+              code=source('data_processing/calendar_history.py')),
+        Stage('snapshot', run_snapshot,
+              inputs=[COMBINED_EVENTS_CSV, CRUISE_CSV, CON_CSV, EV_CSV, CONCERT_CSV,
+                      CON_PENDING_JSON, EV_PENDING_JSON, MONTHLY_TRENDS_JSON],
+              outputs=[SNAPSHOT_INDEX],
+              code=source('data_processing/backtest.py', 'data_processing/event_loader.py')),
+    ]
+    if collect:
+        # Webからの収集はネットワークに依存するため、明示的に指定した場合のみ実行する
+        stages.append(Stage('cruise', run_cruise, outputs=[CRUISE_CSV], params={'urls': CRUISE_URLS},
+                            code=source('data_collection/cruise_scraper.py',
+                                        'data_processing/capacity_registry.py',
+                                        'data_processing/event_loader.py'),
+                            always_run=True))
+    return Pipeline(stages)
+
 
 def main():
+    parser = argparse.ArgumentParser(description="釧路宿泊需要予測カレンダーのデータ処理パイプライン")
+    parser.add_argument('--force', action='store_true', help="入力に変更がなくても全ステージを再実行する")
+    parser.add_argument('--collect', action='store_true', help="クルーズ客船情報のスクレイピングも実行する")
+    parser.add_argument('--only', nargs='+', help="指定したステージ（と必要な上流ステージ）のみ実行する")
+    parser.add_argument('--jobs', type=int, default=None, help="並列実行数")
+    parser.add_argument('--watch', action='store_true',
+                        help="実行後も data/raw と data/processed を監視し、変更のあった下流ステージを再実行する")
+    parser.add_argument('--shm', nargs='?', const=SHARED_CALENDAR_NAME, default=None, metavar='NAME',
+                        help=f"生成したカレンダーを共有メモリに公開する（既定の名前: {SHARED_CALENDAR_NAME}）")
+    args = parser.parse_args()
+
     print("データ処理を開始します...\n")
+    pipeline = build_pipeline(collect=args.collect, shm_name=args.shm)
+    unknown = [name for name in args.only or [] if name not in pipeline.stages]
+    if unknown:
+        parser.error(
+            f"不明なステージです: {', '.join(unknown)}（指定できるステージ: {', '.join(pipeline.stages)}）"
+        )
+    results = pipeline.run(force=args.force, only=args.only, max_workers=args.jobs)
 
-    # 1. 観光トレンドデータの処理
-    raw_data_file = 'data/raw/tourism_trends_raw_data.txt'
-    output_json_file = 'data/processed/monthly_tourism_trends.json'
-    monthly_tourism_trends = process_tourism_trends(raw_data_file)
-    if monthly_tourism_trends:
-        with open(output_json_file, 'w', encoding='utf-8') as f:
-            json.dump(monthly_tourism_trends, f, ensure_ascii=False, indent=4)
-        print(f"✅ 月ごとの観光トレンドデータを {output_json_file} に保存しました。\n")
-    else:
-        print("❌ 月ごとの観光トレンドデータを取得できませんでした。\n")
+    if args.watch:
+        # プロセスを起動したまま監視するため、pandas などの読み込みは最初の1回だけで済む
+        watch(pipeline, WATCH_DIRS, max_workers=args.jobs)
         return
 
-    # 2. イベントデータの結合
-    run_combine_csv()
-    print("\n")
-
-    # 3. カレンダーデータの生成
-    events_csv = 'data/processed/combined_events.csv'
-    start_year = 2025
-    end_year = 2026
-    output_calendar_json_file = 'data/processed/calendar_data.json'
-    calendar_output = generate_calendar_data(events_csv, start_year, end_year)
-    with open(output_calendar_json_file, 'w', encoding='utf-8') as f:
-        json.dump(calendar_output, f, ensure_ascii=False, indent=4)
-    print(f"✅ カレンダーデータを {output_calendar_json_file} に生成しました。\n")
-
-    print("データ処理が完了しました。")
+    if any(status in ('failed', 'blocked') for status in results.values()):
+        print("\n❌ 一部のステージが失敗しました。")
+        sys.exit(1)
+    print("\nデータ処理が完了しました。")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_STATE_FILE = 'data/processed/.pipeline_state.json'
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """ファイル内容のSHA-256ハッシュを返す（存在しない場合はNone）"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Stage:
+    """パイプラインの1ステージ（入力ファイル・出力ファイルと処理関数の組）"""
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, code=(), always_run=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # ファイル以外の入力（URLや対象年など）。変更されたら再実行する
+        self.params = params or {}
+        # 処理内容を定義するソースファイル。ロジックを変更したら再実行する
+        self.code = list(code)
+        # 入力ファイルを持たないWebからの収集など、前回から変わったか判定できないステージは毎回実行する
+        self.always_run = always_run
+
+
+class Pipeline:
+    """入出力ファイルから依存関係を解決し、変更のあったステージだけを並列実行する"""
+
+    def __init__(self, stages, state_file=DEFAULT_STATE_FILE):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.dependencies = self._resolve_dependencies()
+
+    def _resolve_dependencies(self):
+        """あるステージの入力が別ステージの出力であれば依存関係とみなす"""
+        producers = {}
+        for stage in self.stages.values():
+            for path in stage.outputs:
+                if path in producers:
+                    raise ValueError(f"出力ファイル {path} が複数のステージで生成されています。")
+                producers[path] = stage.name
+
+        dependencies = {}
+        for stage in self.stages.values():
+            dependencies[stage.name] = {
+                producers[path] for path in stage.inputs if path in producers
+            }
+
+        # 循環依存のチェック
+        visited, in_progress = set(), set()
+
+        def visit(name):
+            if name in in_progress:
+                raise ValueError(f"ステージ {name} に循環依存があります。")
+            if name in visited:
+                return
+            in_progress.add(name)
+            for dep in dependencies[name]:
+                visit(dep)
+            in_progress.discard(name)
+            visited.add(name)
+
+        for name in dependencies:
+            visit(name)
+        return dependencies
+
+    def downstream_of(self, paths):
+        """指定ファイルを（直接・間接に）入力とするステージ名の集合を返す"""
+        paths = set(paths)
+        affected = {
+            stage.name for stage in self.stages.values()
+            if paths.intersection(stage.inputs)
+        }
+        changed = True
+        while changed:
+            changed = False
+            for name, deps in self.dependencies.items():
+                if name not in affected and deps & affected:
+                    affected.add(name)
+                    changed = True
+        return affected
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.state_file)
+
+    def _fingerprint(self, stage):
+        return {
+            'inputs': {path: file_fingerprint(path) for path in stage.inputs},
+            'params': stage.params,
+            'code': {path: file_fingerprint(path) for path in stage.code},
+        }
+
+    def _is_up_to_date(self, stage, fingerprint, previous, always_run=True):
+        if (always_run and stage.always_run) or not previous:
+            return False
+        if previous.get('inputs') != fingerprint['inputs']:
+            return False
+        if previous.get('params') != fingerprint['params']:
+            return False
+        if previous.get('code', {}) != fingerprint['code']:
+            return False
+        # 出力が削除・手動編集されていれば再実行する
+        for path in stage.outputs:
+            if file_fingerprint(path) != previous.get('outputs', {}).get(path):
+                return False
+        return True
+
+    def _execute(self, stage):
+        result = stage.func()
+        if result is False:
+            raise RuntimeError(f"ステージ {stage.name} が失敗しました。")
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            raise RuntimeError(f"ステージ {stage.name} の出力が生成されていません: {missing}")
+
+    def run(self, force=False, only=None, max_workers=None, rerun_upstream=True):
+        """ステージを依存順に実行する。戻り値は {ステージ名: 'ran'|'skipped'|'failed'|'blocked'}
+
+        rerun_upstream=False のときは、対象の上流として加えた always_run のステージ（Webからの収集など）も
+        他のステージと同じく入力・出力の変更で判定し、前回の出力が使えれば実行しない。
+        """
+        state = self._load_state()
+        targets = set(self.stages) if only is None else set(only)
+        # 対象ステージの上流も必要に応じて実行できるように含める
+        pending = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in pending:
+                continue
+            pending.add(name)
+            stack.extend(self.dependencies[name])
+
+        results = {}
+        running = {}
+
+        def ready(name):
+            return all(dep in results for dep in self.dependencies[name])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name in sorted(n for n in pending if ready(n)):
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    if any(results[dep] in ('failed', 'blocked') for dep in self.dependencies[name]):
+                        results[name] = 'blocked'
+                        print(f"⏭️  {name}: 上流ステージの失敗によりスキップしました。")
+                        continue
+                    fingerprint = self._fingerprint(stage)
+                    always_run = rerun_upstream or name in targets
+                    if not force and self._is_up_to_date(stage, fingerprint, state.get(name), always_run):
+                        results[name] = 'skipped'
+                        print(f"⏭️  {name}: 入力に変更がないためスキップしました。")
+                        continue
+                    print(f"▶️  {name}: 実行します...")
+                    running[executor.submit(self._execute, stage)] = (name, fingerprint)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, fingerprint = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        results[name] = 'failed'
+                        state.pop(name, None)
+                        print(f"❌ {name}: {e}")
+                        continue
+                    fingerprint['outputs'] = {path: file_fingerprint(path) for path in stage.outputs}
+                    state[name] = fingerprint
+                    results[name] = 'ran'
+                    print(f"✅ {name}: 完了しました。")
+                self._save_state(state)
+
+        self._save_state(state)
+        return results
@@ -0,0 +1,140 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# inotify のイベント（書き込み完了・リネームによる置き換え）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """inotify でディレクトリ内のファイル更新を待つ（Linuxのみ）"""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify を初期化できませんでした。")
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"{directory} を監視できませんでした。")
+            self.directories[wd] = directory
+
+    def wait(self, timeout=None):
+        """更新されたファイルのパスの集合を返す（timeout 秒以内に無ければ空集合）"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name and wd in self.directories:
+                changed.add(os.path.normpath(os.path.join(self.directories[wd], os.fsdecode(name))))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """inotify が使えない環境向けに、更新時刻とサイズを定期的に比較する"""
+
+    def __init__(self, directories, interval=0.5):
+        self.directories = list(directories)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[os.path.normpath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path, stat in current.items() if self.snapshot.get(path) != stat}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(deadline - time.monotonic(), 0)))
+
+    def close(self):
+        pass
+
+
+def create_watcher(directories):
+    try:
+        return InotifyWatcher(directories)
+    except (OSError, AttributeError):
+        # inotify の無いOS（macOS・Windows）ではポーリングで代用する
+        print("⚠️ inotify を利用できないため、ポーリングでファイルの変更を監視します。")
+        return PollingWatcher(directories)
+
+
+def watch(pipeline, directories, debounce=0.3, max_workers=None):
+    """監視ディレクトリのファイルが更新されたら、その下流のステージだけを再実行し続ける
+
+    連続した書き込みは debounce 秒間更新が止まるまでまとめてから実行する。
+    パイプライン自身が書き出した出力ファイルの通知は無視する。
+    """
+    inputs = {
+        os.path.normpath(path): path
+        for stage in pipeline.stages.values() for path in stage.inputs
+    }
+    watcher = create_watcher(directories)
+    print(f"👀 {', '.join(directories)} を監視しています（Ctrl+C で終了）。")
+    carried = set()
+    try:
+        while True:
+            changed = carried or watcher.wait()
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            paths = [inputs[path] for path in sorted(changed) if path in inputs]
+            if not paths:
+                carried = set()
+                continue
+            targets = pipeline.downstream_of(paths)
+            print(f"\n🔄 変更を検知しました: {', '.join(paths)} → {', '.join(sorted(targets))}")
+            started = time.perf_counter()
+            # 上流のWebからの収集（always_run）は、ファイルの更新のたびに実行し直さない
+            results = pipeline.run(only=targets, max_workers=max_workers, rerun_upstream=False)
+            elapsed = time.perf_counter() - started
+
+            # 実行中に自分で書き出した出力ファイルの通知は読み捨て、それ以外の更新は次の回で処理する
+            written = {
+                os.path.normpath(path)
+                for name, status in results.items() if status == 'ran'
+                for path in pipeline.stages[name].outputs
+            }
+            carried = {path for path in watcher.wait(0) - written if path in inputs}
+            if any(status in ('failed', 'blocked') for status in results.values()):
+                print(f"❌ 一部のステージが失敗しました（{elapsed:.2f}秒）。")
+            else:
+                print(f"✅ 更新が完了しました（{elapsed:.2f}秒）。")
+    except KeyboardInterrupt:
+        print("\n監視を終了しました。")
+    finally:
+        watcher.close()
@@ -0,0 +1,114 @@
+// 内容ハッシュ付きのデータ（data/published/<名前>.<ハッシュ>.json[.gz|.br]）は内容が変わらないためキャッシュを優先し、
+// ページの表示（HTML）は常に最新を取得してオフライン時のみキャッシュを使い、それ以外（manifest.json・script.js など）は
+// キャッシュから返しつつ裏で再検証する。再訪時にデータの通信を待たずに表示でき、更新は次回の表示から反映される。
+const CACHE_NAME = 'kushiro-calendar-v1';
+const MANIFEST_PATH = 'data/published/manifest.json';
+const HASHED_ASSET = /\/data\/published\/[^/]+\.[0-9a-f]{12}\.json(\.gz|\.br)?$/;
+
+self.addEventListener('install', () => {
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names.filter(name => name !== CACHE_NAME).map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+async function cacheFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+function manifestUrls(manifest, urls) {
+    Object.values(manifest.assets).forEach(asset => {
+        const url = new URL(asset.path, self.registration.scope).href;
+        [url, `${url}.gz`, `${url}.br`].forEach(variant => urls.add(variant));
+    });
+    return urls;
+}
+
+// manifest が更新されたら、新旧どちらの manifest からも参照されない古い版のデータをキャッシュから削除する
+// （直前に返した古い manifest を使っているページが、まだその版のデータを読み込むため）
+async function pruneHashedAssets(cache, previousResponse, manifestResponse) {
+    const current = manifestUrls(await manifestResponse.json(), new Set());
+    if (previousResponse) {
+        manifestUrls(await previousResponse.json(), current);
+    }
+    const requests = await cache.keys();
+    await Promise.all(
+        requests
+            .filter(request => HASHED_ASSET.test(new URL(request.url).pathname) && !current.has(request.url))
+            .map(request => cache.delete(request))
+    );
+}
+
+async function updateCache(cache, request, response) {
+    if (!response.ok) {
+        return;
+    }
+    if (new URL(request.url).pathname.endsWith(MANIFEST_PATH)) {
+        const previous = await cache.match(request);
+        await cache.put(request, response.clone());
+        await pruneHashedAssets(cache, previous, response.clone());
+        return;
+    }
+    await cache.put(request, response.clone());
+}
+
+// ページの表示はネットワークを優先し、オフラインのときだけキャッシュから返す
+async function networkFirst(request) {
+    const cache = await caches.open(CACHE_NAME);
+    try {
+        const response = await fetch(request);
+        await updateCache(cache, request, response);
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+// キャッシュがあればすぐに返し、裏で取得し直して次回の表示に備える
+async function staleWhileRevalidate(event, request) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(request);
+    const network = fetch(request).then(async response => {
+        await updateCache(cache, request, response);
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || new URL(request.url).origin !== self.location.origin) {
+        return;
+    }
+    if (HASHED_ASSET.test(new URL(request.url).pathname)) {
+        event.respondWith(cacheFirst(request));
+        return;
+    }
+    if (request.mode === 'navigate') {
+        event.respondWith(networkFirst(request));
+        return;
+    }
+    event.respondWith(staleWhileRevalidate(event, request));
+});
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts", "data_collection"))
+from cruise_scraper import CRUISE_COLUMNS, get_impact_level, merge_cruise_rows, parse_schedule_html
+from event_loader import CRUISE_STATUS_CANCELLED, CRUISE_STATUS_SCHEDULED
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "fixtures", "cruise")
+TERMINAL = "耐震旅客船ターミナル East Port earthquake-proof cruise ship terminal"
+
+
+def _parse(name, today="2025-08-01"):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+        return parse_schedule_html(f.read(), today)
+
+
+def _ship(row):
+    # 件名は「日本語名\n英語名入港」
+    return row["Subject"].split("\n")[0]
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        (
+            "r7",
+            [
+                ("シーボーン・クエスト", "2025-04-10", TERMINAL, CRUISE_STATUS_SCHEDULED),
+                ("ダイヤモンド・プリンセス", "2025-06-03", TERMINAL, CRUISE_STATUS_SCHEDULED),
+                ("にっぽん丸", "2025-09-21", "中央ふ頭", CRUISE_STATUS_SCHEDULED),
+                # 1〜3月は年度の翌年
+                ("飛鳥Ⅱ", "2026-02-14", "中央ふ頭", CRUISE_STATUS_SCHEDULED),
+            ],
+        ),
+        (
+            "r8",
+            [
+                ("ぱしふぃっくびいなす", "2026-05-12", TERMINAL, CRUISE_STATUS_SCHEDULED),
+                ("セブンシーズ・エクスプローラー", "2027-03-02", TERMINAL, CRUISE_STATUS_CANCELLED),
+                # 入港日が未定の行は取り込まない
+            ],
+        ),
+    ],
+)
+def test_parse_schedule_html(name, expected):
+    rows = _parse(name)
+    assert [(_ship(r), r["StartDate"], r["Location"], r["Status"]) for r in rows] == expected
+    for row in rows:
+        assert row["Subject"].endswith("入港")
+        assert row["EndDate"] == row["StartDate"]
+        assert row["EventType"] == "クルーズ"
+        assert row["LastUpdated"] == "2025-08-01"
+        assert row["EstimatedAttendees"] > 0
+        assert row["ImpactLevel"] == get_impact_level(row["EstimatedAttendees"])
+
+
+def test_parse_schedule_html_without_fiscal_year():
+    assert parse_schedule_html("<html><body><h1>入港予定</h1></body></html>") is None
+
+
+def test_merge_cruise_rows_applies_revision():
+    empty = pd.DataFrame(columns=CRUISE_COLUMNS)
+    existing, counts = merge_cruise_rows(empty, _parse("r7") + _parse("r8"), "2025-08-01")
+    assert counts == {"added": 5, "updated": 0, "cancelled": 1}
+
+    merged, counts = merge_cruise_rows(existing, _parse("r7_revised", "2025-09-01"), "2025-09-01")
+    assert counts == {"added": 0, "updated": 1, "cancelled": 1}
+    by_ship = {_ship(row): row for row in merged.to_dict("records")}
+
+    # 寄港中止になった寄港は行を残し、Status を更新する
+    assert by_ship["ダイヤモンド・プリンセス"]["Status"] == CRUISE_STATUS_CANCELLED
+    assert by_ship["ダイヤモンド・プリンセス"]["LastUpdated"] == "2025-09-01"
+    # 岸壁が変わった寄港は内容と LastUpdated を更新する
+    assert by_ship["にっぽん丸"]["Location"] == "耐震旅客船ターミナル"
+    assert by_ship["にっぽん丸"]["LastUpdated"] == "2025-09-01"
+    # 変わっていない寄港と、改訂版のページに無い別年度の寄港は LastUpdated を保つ
+    for ship in ["シーボーン・クエスト", "飛鳥Ⅱ", "ぱしふぃっくびいなす", "セブンシーズ・エクスプローラー"]:
+        assert by_ship[ship]["LastUpdated"] == "2025-08-01"
+    assert len(merged) == 6
+    assert merged["StartDate"].tolist() == sorted(merged["StartDate"])
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts", "data_collection"))
+from event2csv import fix_date_columns, fix_existing_csv
+
+
+def test_fix_date_columns_all_blank_end_date():
+    df = pd.DataFrame(
+        {
+            "Subject": ["a", "b"],
+            "Start Date": ["2025年7月1日", "2025年7月2日"],
+            "End Date": [np.nan, np.nan],
+        }
+    )
+    fixed = fix_date_columns(df)
+    assert fixed["Start Date"].tolist() == ["2025-07-01", "2025-07-02"]
+    assert fixed["End Date"].isna().all()
+
+
+def test_fix_date_columns_all_blank_start_and_end():
+    df = pd.DataFrame({"Subject": ["a"], "Start Date": [np.nan], "End Date": [""]})
+    fixed = fix_date_columns(df)
+    assert pd.isna(fixed["Start Date"].iloc[0])
+    assert fixed["End Date"].iloc[0] == ""
+
+
+def test_fix_existing_csv_mixed_chunks(tmp_path):
+    source = tmp_path / "events.csv"
+    pd.DataFrame(
+        {
+            "Subject": ["a", "b", "c", "d"],
+            "Start Date": ["2025年7月1日", "2025年7月2日", "2025年8月1日", "2025年8月3日"],
+            "End Date": ["", "", "", "2025年5日"],
+        }
+    ).to_csv(source, index=False)
+
+    # 1チャンク目は End Date がすべて空欄、2チャンク目は空欄と値が混在する
+    output = fix_existing_csv(str(source), chunksize=2)
+    fixed = pd.read_csv(output, dtype=str, encoding="utf-8-sig")
+    assert fixed["Start Date"].tolist() == ["2025-07-01", "2025-07-02", "2025-08-01", "2025-08-03"]
+    assert fixed["End Date"].isna().tolist() == [True, True, True, False]
+    assert fixed["End Date"].iloc[3] == "2025-08-05"
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts", "data_processing"))
+from holiday_parser import holiday_table
+
+
+def _holiday_date(year, name):
+    dates, names = holiday_table(year, year)
+    return str(dates[names.index(name)])
+
+
+# 近似式の各係数の範囲（1900-1979年, 1980-2099年, 2100-2150年）から既知の春分・秋分を確かめる
+@pytest.mark.parametrize(
+    "year, vernal, autumnal",
+    [
+        (1950, "1950-03-21", "1950-09-23"),
+        (1960, "1960-03-20", "1960-09-23"),
+        (1970, "1970-03-21", "1970-09-23"),
+        (1979, "1979-03-21", "1979-09-24"),
+        (1980, "1980-03-20", "1980-09-23"),
+        (2012, "2012-03-20", "2012-09-22"),
+        (2024, "2024-03-20", "2024-09-22"),
+        (2025, "2025-03-20", "2025-09-23"),
+        (2100, "2100-03-20", "2100-09-23"),
+    ],
+)
+def test_equinox_holidays(year, vernal, autumnal):
+    assert _holiday_date(year, "春分の日") == vernal
+    assert _holiday_date(year, "秋分の日") == autumnal
+
+
+def test_holiday_table_is_sorted():
+    dates, names = holiday_table(1950, 2030)
+    assert len(dates) == len(names)
+    assert np.all(dates[1:] >= dates[:-1])